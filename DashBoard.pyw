@@ -6,7 +6,6 @@ Created on Sun Jul 20 22:41:30 2025
 """
 import os
 import sys
-import configparser
 from PySide6.QtGui import QFont, QColor, QScreen, QAction, QIcon
 from PySide6.QtWidgets import QMainWindow, QMenu, QApplication, QWidget
 # from bin.main_window import App
@@ -14,6 +13,7 @@ from bin import GenerateTabViewClass
 from bin import GenerateGridWidgetClass
 from bin.settings_dialog import SettingsDialog
 from bin import constant as const_
+from bin.app_state import SETTINGS
 """
 Главный модуль приложения "Планерка".
 
@@ -193,6 +193,7 @@ class MyApp(QMainWindow):
     
         # 3. Перерисовка
         if hasattr(self, 'tabWidgets') and self.tabWidgets:
+            self.tabWidgets.invalidate_tabs()
             self.tabWidgets.create_grid()
             if hasattr(self.tabWidgets, '_special_groups_dialog') and self.tabWidgets._special_groups_dialog:
                 self.tabWidgets._special_groups_dialog._build_ui()
@@ -204,7 +205,7 @@ class MyApp(QMainWindow):
 
         Действия
         --------
-        1. Читает файл конфигурации.
+        1. Берёт разобранный файл конфигурации (`app_state.SETTINGS`).
         2. Извлекает настройки шрифта и цветов.
         3. Создает словарь `settings` с объектами `QFont` и `QColor`.
         4. Вызывает `apply_settings` для применения загруженных настроек.
@@ -213,21 +214,19 @@ class MyApp(QMainWindow):
         ----------
         Если файл или какие-либо ключи отсутствуют, используются значения по умолчанию.
         """
-        config = configparser.ConfigParser()
-        config.read('bin/setting.ini', encoding='utf-8')
         settings = {}
     
-        if config.has_option('ui', 'font_family'):
-            family = config.get('ui', 'font_family')
-            size = config.getint('ui', 'font_size', fallback=9)
+        if SETTINGS.has_option('ui', 'font_family'):
+            family = SETTINGS.get('ui', 'font_family')
+            size = SETTINGS.getint('ui', 'font_size', fallback=9)
             settings['font'] = QFont(family, size)
         else:
             settings['font'] = QFont()
     
         color_keys = list(const_.COLOR_MAPPING.keys())
         for key in color_keys:
-            if config.has_option('ui', key):
-                hex_color = config.get('ui', key)
+            if SETTINGS.has_option('ui', key):
+                hex_color = SETTINGS.get('ui', key)
                 settings[key] = QColor(hex_color)
             else:
                 settings[key] = QColor(const_.DEFAULT_COLORS[key])
@@ -245,30 +244,25 @@ class MyApp(QMainWindow):
 
         Действия
         --------
-        1. Читает существующий файл конфигурации (если есть).
-        2. Обновляет секцию `[ui]` значениями из `settings`.
-        3. Записывает обновленный конфигурационный файл в кодировке UTF-8.
+        1. Обновляет секцию `[ui]` значениями из `settings` в памяти.
+        2. Файл конфигурации перезаписывается с задержкой, атомарно,
+           только если значения изменились.
         """
-        config = configparser.ConfigParser()
-        config.read('bin/setting.ini', encoding='utf-8')
-    
-        if not config.has_section('ui'):
-            config.add_section('ui')
-    
+        values = {}
         font = settings.get('font')
         if font and hasattr(font, 'family'):
             print(font.family(), font.pointSize())
-            config.set('ui', 'font_family', font.family())
-            config.set('ui', 'font_size', str(font.pointSize()))
+            values['font_family'] = font.family()
+            values['font_size'] = font.pointSize()
     
         color_keys = list(const_.COLOR_MAPPING.keys())
         for key in color_keys:
             color = settings.get(key)
             if color:
-                config.set('ui', key, color.name())
+                values[key] = color.name()
     
-        with open('bin/setting.ini', 'w', encoding='utf-8') as f:
-            config.write(f)
+        # Запись в файл — отложенная и атомарная (app_state.SETTINGS)
+        SETTINGS.update('ui', values)
             
     def _update_widget_fonts(self, parent, font):
         """
@@ -6,11 +6,11 @@ Created on Tue Jul 22 20:35:25 2025
 @author: Professional
 """
 import os
+from pathlib import Path
 import pandas as pd
-import configparser
 from datetime import datetime 
 from PySide6.QtCore import Signal as QtSignal, Qt, QLocale
-from PySide6.QtCore import QTimer,  QObject
+from PySide6.QtCore import QObject
 from PySide6.QtGui import  QAction, QPixmap, QPainter, QPageLayout
 from PySide6.QtPrintSupport import QPrinter, QPrintDialog
 from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QGridLayout, QMenu
@@ -21,7 +21,16 @@ from bin.helpers import FileWatcherHelper
 from bin.export_excel import export_full_dashboard
 from bin.get_data import Get_Data
 from bin.get_data import Get_Files
+from bin.parse_cache import PARSE_CACHE
+from bin.snapshot_diff import SnapshotTracker
+from bin.warm_loader import WARM_LOADER
+from bin.app_state import SETTINGS, TARGET_PERCENT
+from bin.workers import DataLoader
+from bin.prefetch import TabPrefetcher
 from bin.column_manager import ColumnLayout
+from bin import schema
+from bin import readers
+from bin import query
 
 
 class GenerateWidgets(QObject):
@@ -32,6 +41,8 @@ class GenerateWidgets(QObject):
     а также за автоматическую подстройку размера главного окна.
     """
     special_groups_update_requested = QtSignal()
+    # Изменился требуемый процент (испускается из потока, где он задан)
+    target_percent_changed = QtSignal(float)
     def __init__(self, root):
         super().__init__()
         """
@@ -67,6 +78,8 @@ class GenerateWidgets(QObject):
         -------
         create_grid()
             Создаёт и наполняет сетку виджетов данными активной вкладки.
+        invalidate_tabs()
+            Требует полной перерисовки вкладок при следующем показе.
         show_special_groups_window()
             Открывает окно со спецгруппами текущего менеджера.
         add_obj_manager(cut_manager=None)
@@ -100,6 +113,24 @@ class GenerateWidgets(QObject):
         
         # Менеджер колонок
         self.column_manager = ColumnLayout()
+        # Последние отображённые данные вкладок (для сравнения при обновлении)
+        self.snapshot_tracker = SnapshotTracker()
+        # Отрисованные вкладки: индекс -> параметры запроса их данных
+        self._rendered_views = {}
+        # Фоновые вкладки, файлы которых обновились после отрисовки
+        self._stale_tabs = set()
+        # Фоновая загрузка данных вкладок (устаревшие запросы отменяются)
+        self.data_loader = DataLoader(self)
+        self.data_loader.loaded.connect(self._on_data_loaded)
+        # Предзагрузка вкладок, которые вероятно откроют следующими
+        self.prefetcher = TabPrefetcher(
+            tab_names=lambda: [self.root.tabs.tabText(i)
+                               for i in range(self.root.tabs.count())],
+            view_params=self._view_params,
+            is_busy=lambda: self.data_loader.busy,
+            max_tabs=const_.CACHE_PREFETCH_TABS,
+            idle_ms=const_.CACHE_PREFETCH_IDLE_MS,
+            parent=self)
         
         # === Инициализация FileWatcher ===
         network_dir = self._get_network_dir()
@@ -108,9 +139,17 @@ class GenerateWidgets(QObject):
             local_base="files",
             network_dir=network_dir
         )
+        # Подписки на изменения настроек и требуемого процента
+        self.target_percent_changed.connect(self._on_target_percent_changed)
+        TARGET_PERCENT.subscribe(self.target_percent_changed.emit)
+        SETTINGS.subscribe(self._on_setting_changed)
 
         self._start_auto_refresh_timer()
         self._check_and_refresh_files()
+        # Разбираем все источники в фоне, пока открыта первая вкладка
+        WARM_LOADER.warm()
+        if const_.CACHE_PREFETCH:
+            self.prefetcher.start(self.active_tab_index)
         self.widgets = {}
         self._update_main_window_title()
        
@@ -146,7 +185,7 @@ class GenerateWidgets(QObject):
              
     def _get_network_dir(self):
         """
-        Получает путь к сетевому каталогу с данными из файла bin/setting.ini.
+        Получает путь к сетевому каталогу из настроек (app_state.SETTINGS).
         
         Returns
         -------
@@ -154,42 +193,106 @@ class GenerateWidgets(QObject):
             Путь к сетевому калалогу.
 
         """
-        config_path = os.path.join("bin", "setting.ini")
-        if os.path.exists(config_path):            
-            config = configparser.ConfigParser()
-            config.read(config_path, encoding='utf-8')
-            if config.has_option('setting', 'w_disk'):
-                return config.get('setting', 'w_disk')
-        return None
+        return SETTINGS.get('setting', 'w_disk')
+
+    def _on_target_percent_changed(self, value):
+        """
+        Слот: требуемый процент изменился (сигнал из любого потока).
+
+        Вкладки, цвета которых зависят от процента, помечаются устаревшими
+        (активная перерисовывается, если её данные изменились), открытое
+        окно спецгрупп перекрашивается.
+        """
+        self._update_main_window_title()
+        tab_names = [self.root.tabs.tabText(i)
+                     for i in range(self.root.tabs.count())]
+        affected = (set(readers.percent_dependent_tabs(tab_names))
+                    & set(self._rendered_views))
+        self._stale_tabs |= affected
+        if self.active_tab_index in affected:
+            self.create_grid(only_if_changed=True)
+        dialog = getattr(self, '_special_groups_dialog', None)
+        if dialog is not None:
+            dialog.target_percent = float(value or 0)
+            self.special_groups_update_requested.emit()
+
+    def _on_setting_changed(self, section, option, value):
+        """Применяет изменённый путь к сетевому каталогу."""
+        if (section, option) == ('setting', 'w_disk'):
+            self.file_watcher.network_dir = Path(value) if value else None
 
     def _start_auto_refresh_timer(self):
         """
-        Таймер - вызывает метод проверки на наличие новыз данных каждые 5 сек.
+        Запускает наблюдение за сетевой папкой: проверка наличия новых
+        данных вызывается по сигналу `FileWatcherHelper.files_changed`
+        (события ОС и адаптивный опрос, с окном объединения событий).
 
         Returns
         -------
         None.
 
         """
-        self.refresh_timer = QTimer(self.win_roots)
-        self.refresh_timer.timeout.connect(self._check_and_refresh_files)
-        self.refresh_timer.start(5_000)  
+        self.file_watcher.files_changed.connect(self._check_and_refresh_files)
+        self.file_watcher.sync_finished.connect(self._on_sync_finished)
+        self.file_watcher.sync_failed.connect(self._on_sync_failed)
+        self.file_watcher.start_watching()
+        # Пулы потоков останавливаются до завершения интерпретатора:
+        # иначе он дожидается их задач (и зависших обращений к сети)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.file_watcher.shutdown)
+            app.aboutToQuit.connect(WARM_LOADER.shutdown)
 
     def _check_and_refresh_files(self):
         """
         Метод проверки наличия более свежих данных в сетевом каталоге.
 
+        Синхронизация выполняется в фоновом потоке; результат обрабатывает
+        `_on_sync_finished`.
+
         Returns
         -------
         None.
 
         """                   
-        if self.file_watcher.sync_all_outdated_files():
-            # Хотя бы один файл обновлён — перерисовываем всё
-            self.create_grid()
-            if (hasattr(self, '_special_groups_dialog')
-                        and self._special_groups_dialog):
+        self.file_watcher.sync_async()
+
+    def _on_sync_failed(self, message):
+        """Слот: ошибки синхронизации или недоступность сетевой папки."""
+        print(f"[SYNC] {message}")
+
+    def _on_sync_finished(self, updated):
+        """
+        Слот: синхронизация завершена.
+
+        Parameters
+        ----------
+        updated : list
+            Имена обновлённых файлов.
+        """
+        if updated:
+            # Обновлённые файлы разбираются параллельно в фоне; активная
+            # вкладка дождётся своего файла через PARSE_CACHE
+            WARM_LOADER.warm(updated)
+            # Обновляем только вкладки, которые читают обновлённые файлы:
+            # фоновые помечаются устаревшими и перерисуются при показе
+            tab_names = [self.root.tabs.tabText(i)
+                         for i in range(self.root.tabs.count())]
+            affected = set(readers.dependent_tabs(updated, tab_names))
+            self._stale_tabs |= affected & set(self._rendered_views)
+            if self.active_tab_index in affected:
+                # Перерисовываем активную вкладку, только если её данные
+                # действительно изменились (проверка — в _on_data_loaded)
+                self.create_grid(only_if_changed=True)
+            else:
+                print("[SYNC] Файлы активной вкладки не обновлялись")
+            # Окно спецгрупп — по его собственному файлу (вкладка, с которой
+            # оно открыто, может быть уже не активной)
+            dialog = getattr(self, '_special_groups_dialog', None)
+            if dialog is not None and dialog.source_file in updated:
                 self.special_groups_update_requested.emit()
+            print(f"[CACHE] {PARSE_CACHE.report()}")
+            print(f"[SYNC] {self.file_watcher.engine.report()}")
         self._update_main_window_title()
 
 
@@ -236,7 +339,9 @@ class GenerateWidgets(QObject):
     ########### Правильное оформление текста в виджетах #########
     def value_format(self, values):
         """ Форматирует данные в удобно читаемый вид."""
-        if isinstance(values, (int, float)) and not isinstance(values, bool):
+        if isinstance(values, float) and pd.isna(values):
+            value = ''
+        elif isinstance(values, (int, float)) and not isinstance(values, bool):
             value = self._app_locale.toString(float(values), 'f', 0)
         elif isinstance(values, str):
             try:
@@ -255,7 +360,7 @@ class GenerateWidgets(QObject):
             return str(val)  
     ######## END: Правильное оформление текста в виджетах ########
 
-    def add_obj_brand_manager(self, manager_filter=None):
+    def add_obj_brand_manager(self, manager_filter=None, data=None):
         """
         Отрисовывает таблицу данных менеджеров для вкладок "Бренд менеджеры".
         
@@ -274,6 +379,9 @@ class GenerateWidgets(QObject):
         manager_filter : TYPE, optional
             DESCRIPTION. The default is None.
             Если задан, отображаются только данные этого менеджера.
+        data : pd.DataFrame, optional
+            Уже загруженные данные вкладки. Если не заданы, читаются
+            через `Get_Data.get_data()`.
 
         Returns
         -------
@@ -284,9 +392,10 @@ class GenerateWidgets(QObject):
         col_index = 0
         name = None
         # DataFrame с данными
-        data = Get_Data.get_data(self.root.tabs,
-                                 self.active_tab_index, 
-                                 manager_filter=manager_filter)
+        if data is None:
+            data = Get_Data.get_data(self.root.tabs,
+                                     self.active_tab_index,
+                                     manager_filter=manager_filter)
         if data.empty:
             return
         
@@ -306,7 +415,7 @@ class GenerateWidgets(QObject):
             'percent': 'group_percent'
         }
 
-        for row in data.itertuples():
+        for row in schema.iter_rows_with_header(data):
             if name == row.manager:
                 pass
             else:
@@ -340,11 +449,12 @@ class GenerateWidgets(QObject):
                     if col_id in manager_fields:
                         field_name = manager_fields[col_id]
                         if field_name == 'manager_percent':
-                            value = getattr(row, field_name)
+                            value = schema.format_percent(
+                                getattr(row, field_name))
                         else:
                             value = self.value_format(getattr(row, field_name))
                         
-                        obj = QLabel(str(formatted_value))
+                        obj = QLabel(str(value))
                         obj.setStyleSheet(self._get_plan_label_style())
                         obj.setSizePolicy(QSizePolicy.Expanding,
                                           QSizePolicy.Expanding)
@@ -388,7 +498,7 @@ class GenerateWidgets(QObject):
                 if col_id in group_fields:
                     field_name = group_fields[col_id]
                     if field_name == 'group_percent':
-                        value = getattr(row, field_name)
+                        value = schema.format_percent(getattr(row, field_name))
                     else:
                         value = self.value_format(getattr(row, field_name))
                     
@@ -442,7 +552,7 @@ class GenerateWidgets(QObject):
                 self.filtered_cut_manager = cut_manager
         self.create_grid()
         
-    def add_obj_brand_manager_farban(self, manager_filter=None):
+    def add_obj_brand_manager_farban(self, manager_filter=None, data=None):
         """
         Отрисовка данных для вкладки 'Бренд-менеджеры Farban'.
         
@@ -461,6 +571,9 @@ class GenerateWidgets(QObject):
         manager_filter : TYPE, optional
             DESCRIPTION. The default is None.
             Если задан, отображаются только данные этого менеджера.
+        data : pd.DataFrame, optional
+            Уже загруженные данные вкладки. Если не заданы, читаются
+            через `Get_Data.get_data()`.
 
         Returns
         -------
@@ -468,9 +581,10 @@ class GenerateWidgets(QObject):
         
         Две метрики: продажи и вес.
         """
-        data = Get_Data.get_data(self.root.tabs, 
-                                 self.active_tab_index,
-                                 manager_filter=manager_filter)
+        if data is None:
+            data = Get_Data.get_data(self.root.tabs,
+                                     self.active_tab_index,
+                                     manager_filter=manager_filter)
         if data.empty:
             return
     
@@ -499,7 +613,7 @@ class GenerateWidgets(QObject):
             'weight_percent': 'group_percent_weight'
         }
     
-        for row in data.itertuples():
+        for row in schema.iter_rows_with_header(data):
             if row.manager != name:
                 # Новая строка менеджера
                 name = row.manager
@@ -532,7 +646,8 @@ class GenerateWidgets(QObject):
                     if col_id in manager_fields:
                         field_name = manager_fields[col_id]
                         if 'percent' in col_id:
-                            value = f"{getattr(row, field_name)}"
+                            value = schema.format_percent(
+                                getattr(row, field_name))
                         else:
                             value = self.value_format(getattr(row, field_name))
                         
@@ -576,7 +691,8 @@ class GenerateWidgets(QObject):
                     if col_id in group_fields:
                         field_name = group_fields[col_id]
                         if 'percent' in col_id:
-                            value = f"{getattr(row, field_name)}"
+                            value = schema.format_percent(
+                                getattr(row, field_name))
                         else:
                             value = self.value_format(getattr(row, field_name))
                         
@@ -599,7 +715,7 @@ class GenerateWidgets(QObject):
     
                 col_index += 1
 
-    def add_obj_manager(self, cut_manager=None):
+    def add_obj_manager(self, cut_manager=None, data=None):
         """
         Отрисовывает таблицу данных менеджеров, вкладки "Менеджеры ОП / Home".
     
@@ -607,6 +723,9 @@ class GenerateWidgets(QObject):
         ----------
         cut_manager : str, optional
             Если задан, отображаются только данные этого менеджера.
+        data : pd.DataFrame, optional
+            Уже загруженные данные вкладки. Если не заданы, читаются
+            через `Get_Data.get_data()`.
     
         Notes
         -----
@@ -629,14 +748,15 @@ class GenerateWidgets(QObject):
             'realization_percent': 'realization_color',
         }
 
-        data = Get_Data.get_data(self.root.tabs,
-                                 self.active_tab_index, 
-                                 cut_manager=cut_manager)
+        if data is None:
+            data = Get_Data.get_data(self.root.tabs,
+                                     self.active_tab_index,
+                                     cut_manager=cut_manager)
 
         # Получаем порядок колонок для текущей вкладки
         column_order = self.column_manager.get_column_order(self.active_tab_index)
 
-        for row_index, row in enumerate(data.itertuples()):
+        for row_index, row in enumerate(schema.iter_rows_with_header(data)):
             # Добавляем кнопку с именем менеджера (всегда в колонке 0)
             manager_btn = QPushButton(row.manager)
             manager_btn.setSizePolicy(QSizePolicy.Expanding,
@@ -701,25 +821,82 @@ class GenerateWidgets(QObject):
                     # Добавляем в сетку
                     self.grid_layout.addWidget(label, row_index, col_position)
 
-    def create_grid(self, sheet=None):
+    @property
+    def active_kind(self):
+        """Вид источника активной вкладки (см. `readers`) или None."""
+        spec = readers.get_reader(
+            self.root.tabs.tabText(self.active_tab_index))
+        return spec.kind if spec else None
+
+    def _view_params(self, tab_index=None) -> dict:
+        """
+        Параметры запроса данных вкладки (по умолчанию активной)
+        с текущими фильтрами — те же, что отрисовывает `create_grid`.
         """
-        Генерирует сетку виджетов для активной вкладки.
+        if tab_index is None:
+            tab_index = self.active_tab_index
+        spec = readers.get_reader(self.root.tabs.tabText(tab_index))
+        kind = spec.kind if spec else None
+        if kind == readers.KIND_BRAND_MANAGERS:
+            return {'manager_filter': self.filtered_brand_manager}
+        if kind == readers.KIND_BRAND_MANAGERS_FARBAN:
+            return {'manager_filter': self.filtered_brand_manager_farban}
+        if kind == readers.KIND_MANAGERS:
+            return {'cut_manager': self.filtered_cut_manager}
+        return {}
+
+    def create_grid(self, sheet=None, only_if_changed=False):
+        """
+        Запускает загрузку данных активной вкладки и её перерисовку.
     
-        Загружает данные через `Get_Data.get_data()` и вызывает соответствующий
-        метод отрисовки в зависимости от индекса вкладки.
+        Данные читаются в пуле потоков (`workers.DataLoader`) через
+        `Get_Data.get_tab_data()`; пока они не готовы, на вкладке остаётся
+        прежняя сетка. Новый запрос отменяет предыдущий, поэтому при
+        быстрой смене вкладок или фильтров отрисовывается только последний.
     
         Parameters
         ----------
         sheet : str, optional
             Игнорируется (остаток от устаревшей логики).
-    
-        Notes
-        -----
-        - Вкладки 0 и 4 → `add_obj_manager` (Менеджеры).
-        - Вкладки 1 и 5 → `add_obj_brand_manager` (Brand-менеджеры).
-        - Вкладка 2 → `add_obj_brand_manager_farban` (Farban).
-        - Результат помещается в `QScrollArea` для прокрутки.
+        only_if_changed : bool, optional
+            Перерисовать, только если данные отличаются от отображённых
+            (после синхронизации файлов).
+        """
+        if self.active_kind is None:
+            # Вкладка без данных: очищаем сразу, отменяя начатые загрузки
+            self.data_loader.cancel()
+            self._clear_tab_window()
+            return
+
+        tab_name = self.root.tabs.tabText(self.active_tab_index)
+        params = self._view_params()
+        request = (self.active_tab_index,
+                   tuple(sorted(params.items())),
+                   only_if_changed)
+        self.data_loader.request(
+            request,
+            lambda: Get_Data.get_tab_data(tab_name, **params))
+
+    def _on_data_loaded(self, request, data):
         """
+        Слот `DataLoader.loaded`: отрисовывает загруженные данные,
+        если они относятся к текущему состоянию вкладки.
+        """
+        tab_index, params, only_if_changed = request
+        if (tab_index != self.active_tab_index
+                or params != tuple(sorted(self._view_params().items()))):
+            # Состояние сменилось без нового запроса — результат не нужен
+            return
+        if only_if_changed:
+            if not self.snapshot_tracker.changed(tab_index, data):
+                self._stale_tabs.discard(tab_index)
+                print("[SYNC] Данные активной вкладки не изменились")
+                return
+            print("[SYNC] Данные активной вкладки изменились, перерисовка")
+        self._render_grid(data)
+
+    def _clear_tab_window(self):
+        """Удаляет сетку активной вкладки."""
         # Очищаем существующий layout, если он есть
         if self.tab_window.layout():
             self.clear_layout(self.tab_window.layout())
@@ -730,27 +907,53 @@ class GenerateWidgets(QObject):
             # как только пропадет из области видимости
             QWidget().setLayout(self.tab_window.layout())
 
+    def _render_grid(self, data: pd.DataFrame):
+        """
+        Генерирует сетку виджетов для активной вкладки из готовых данных.
+    
+        Вызывает метод отрисовки в зависимости от вида источника вкладки
+        (`readers`).
+    
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Данные активной вкладки с текущими фильтрами.
+    
+        Notes
+        -----
+        - KIND_MANAGERS → `add_obj_manager` (Менеджеры ОП / Home).
+        - KIND_BRAND_MANAGERS → `add_obj_brand_manager` (Brand-менеджеры).
+        - KIND_BRAND_MANAGERS_FARBAN → `add_obj_brand_manager_farban`.
+        - Результат помещается в `QScrollArea` для прокрутки.
+        """
+        self._clear_tab_window()
+
         self.grid_layout = QGridLayout()
         self.grid_layout.setSpacing(4)
         self.grid_layout.setAlignment(Qt.AlignTop)
         
         # ← берём из состояния
         cut_manager = self.filtered_cut_manager  
-        if self.active_tab_index in [1, 5]:
+        if self.active_kind == readers.KIND_BRAND_MANAGERS:
             self.add_obj_brand_manager(
-                manager_filter=self.filtered_brand_manager)
+                manager_filter=self.filtered_brand_manager, data=data)
             stretch_cell = 1.5
             
-        elif self.active_tab_index == 2:
+        elif self.active_kind == readers.KIND_BRAND_MANAGERS_FARBAN:
             self.add_obj_brand_manager_farban(
-                manager_filter=self.filtered_brand_manager_farban)
+                manager_filter=self.filtered_brand_manager_farban, data=data)
             stretch_cell = 1.5
 
-        elif self.active_tab_index in [0, 4]:
-            self.add_obj_manager(cut_manager)
+        elif self.active_kind == readers.KIND_MANAGERS:
+            self.add_obj_manager(cut_manager, data=data)
             stretch_cell = 2
         else:
             return
+        # Запоминаем отображённые данные
+        self.snapshot_tracker.remember(self.active_tab_index, data)
+        self._rendered_views[self.active_tab_index] = tuple(
+            sorted(self._view_params().items()))
+        self._stale_tabs.discard(self.active_tab_index)
  
         # Устанавливаем layout для текущей вкладки
         # --- Обёртка в QScrollArea ---
@@ -806,13 +1009,13 @@ class GenerateWidgets(QObject):
 
 
         # проверяем и при необходимости изменяем высоту окна
-        if self.active_tab_index in [0, 4] and i < 5:
+        if self.active_kind == readers.KIND_MANAGERS and i < 5:
             # Сохраняем геометрию для ПРЕДЫДУЩЕЙ активной вкладки
             self.saved_geometries_manager = self.win_roots.geometry()
             self.saved_geometries[
                         self.active_tab_index] = self.saved_geometries_manager
             self.adjust_window_height(i)
-        elif self.active_tab_index in [0] and i > 5:
+        elif self.active_kind == readers.KIND_MANAGERS and i > 5:
             old_geometry = self.saved_geometries.get(self.active_tab_index)
             if old_geometry:
                 # Возвращаем прежние параметры геометрии окна
@@ -855,11 +1058,41 @@ class GenerateWidgets(QObject):
             # Возвращаем прежние параметры геометрии окна
             self.win_roots.resize(old_geometry.width(), old_geometry.height())
         
+        self.prefetcher.record_switch(self.active_tab_index, index)
         # Меняем индекс активной вкладки на новый
         self.active_tab_index = index
         self.tab_window = self.root.tabs.widget(self.active_tab_index)        
         self._check_and_refresh_files()
-        self.create_grid()
+        self._show_tab()
+
+    def _show_tab(self):
+        """
+        Показывает активную вкладку, перерисовывая её только при необходимости.
+
+        Сетка вкладки остаётся в её виджете, поэтому вкладка, отрисованная
+        с теми же фильтрами и не помеченная устаревшей, показывается как есть.
+        Устаревшая (её файл обновился, пока она была в фоне) перерисовывается,
+        если данные действительно изменились; прочие — полностью.
+        """
+        tab_index = self.active_tab_index
+        params = tuple(sorted(self._view_params().items()))
+        if self._rendered_views.get(tab_index) != params:
+            self.create_grid()
+        elif tab_index in self._stale_tabs:
+            self.create_grid(only_if_changed=True)
+        else:
+            # Сетка уже на вкладке — делаем её текущей
+            scroll_area = self.tab_window.findChild(QScrollArea)
+            if scroll_area is not None and scroll_area.widget() is not None:
+                self.grid_layout = scroll_area.widget().layout()
+
+    def invalidate_tabs(self):
+        """
+        Требует полной перерисовки всех вкладок при следующем показе
+        (после смены темы, шрифта и т.п.).
+        """
+        self._rendered_views.clear()
+        self._stale_tabs.clear()
 
     def adjust_window_height(self, row_count):
         """
@@ -886,8 +1119,8 @@ class GenerateWidgets(QObject):
         """Копирует данные менеджера в буфер обмена в человекочитаемом виде."""
         lines = []
     
-        # Для вкладки "Менеджеры" (индекс 0)
-        if self.active_tab_index == 0:
+        # Для вкладок "Менеджеры"
+        if self.active_kind == readers.KIND_MANAGERS:
             lines = [
                 f'Менеджер: {row_data.manager}',
                 f'План по деньгам: {self.value_format(row_data.money_plan)}',
@@ -907,20 +1140,22 @@ class GenerateWidgets(QObject):
                 f'Процент (продажи): {
                             self.value_format(row_data.realization_percent)}',
             ]
-        # Для вкладки 'Brand-менеджеры' (индексы 1, 5)
-        elif self.active_tab_index in (1, 5):
+        # Для вкладок 'Brand-менеджеры'
+        elif self.active_kind == readers.KIND_BRAND_MANAGERS:
             lines = [
                 f'Менеджер: {row_data.manager}',
                 f'План (все группы): {
                             self.value_format(row_data.manager_plan)}',
                 f'Выполнение (все группы): {
                             self.value_format(row_data.manager_realization)}',
-                f'Процент (все группы): {row_data.manager_percent}',
+                f'Процент (все группы): {
+                            schema.format_percent(row_data.manager_percent)}',
                 f'Группа: {row_data.group}',
                 f'План (группа): {self.value_format(row_data.group_plan)}',
                 f'Выполнение (группа): {
                             self.value_format(row_data.group_realization)}',
-                f'Процент (группа): {row_data.group_percent}',
+                f'Процент (группа): {
+                            schema.format_percent(row_data.group_percent)}',
             ]
     
         text = '\n'.join(lines)
@@ -929,6 +1164,8 @@ class GenerateWidgets(QObject):
     
     def print_main_window(self):
         """Печатает скриншот всего главного окна."""
+        # Дожидаемся отрисовки загружаемых данных
+        self.data_loader.wait()
         # Создаём pixmap всего окна
         pixmap = QPixmap(self.win_roots.size())
         self.win_roots.render(pixmap)
@@ -980,49 +1217,41 @@ class GenerateWidgets(QObject):
             return
     
 
-        self._special_groups_dialog = SpecialGroupsWindow(
-                                                df_sp,
-                                                target_percent=target_percent,
-                                                parent=self.win_roots,
-                                                generate_widgets = self,
-                                                last_modified=last_modified
-                                            )
-        # Подключаем сигнал к методу reload_data этого 
-        # конкретного экземпляра диалога
-        self.special_groups_update_requested.connect(
-                                    self._special_groups_dialog.reload_data)
+        spec = readers.get_reader(self.root.tabs.tabText(self.active_tab_index))
+        dialog = SpecialGroupsWindow(df_sp,
+                                     target_percent=target_percent,
+                                     parent=self.win_roots,
+                                     generate_widgets=self,
+                                     last_modified=last_modified,
+                                     tab_index=self.active_tab_index,
+                                     source_file=spec.file_name)
+        # Обновления получает только последнее открытое окно
+        previous = getattr(self, '_special_groups_dialog', None)
+        if previous is not None:
+            try:
+                self.special_groups_update_requested.disconnect(
+                                                previous.reload_data)
+            except (TypeError, RuntimeError):
+                pass  # Сигнал уже отключён
+        self._special_groups_dialog = dialog
+        # Окно перечитывает данные, когда обновился его файл
+        # (см. _on_sync_finished) или изменился требуемый процент
+        self.special_groups_update_requested.connect(dialog.reload_data)
+
         # Подключаем обработчик закрытия
         def on_dialog_finished():
-            if self._special_groups_dialog is not None:
-                try:
-                    self.special_groups_update_requested.disconnect(
-                                    self._special_groups_dialog.reload_data)
-                except (TypeError, RuntimeError):
-                    pass  # Сигнал уже отключён или не подключён
-            self._special_groups_dialog = None
-    
-        self._special_groups_dialog.finished.connect(on_dialog_finished)
+            try:
+                self.special_groups_update_requested.disconnect(
+                                                dialog.reload_data)
+            except (TypeError, RuntimeError):
+                pass  # Сигнал уже отключён или не подключён
+            if self._special_groups_dialog is dialog:
+                self._special_groups_dialog = None
+
+        dialog.finished.connect(on_dialog_finished)
         # Показываем диалог
-        self._special_groups_dialog.show()
-
-        # Отключаем сигнал, чтобы избежать проблем при повторном
-        # открытии или закрытии приложения
-        self.special_groups_update_requested.disconnect(
-                                    self._special_groups_dialog.reload_data)
+        dialog.show()
 
-        # Удаляем ссылку на диалог
-        del self._special_groups_dialog
- 
-        try:
-            self._special_groups_dialog = None
-        except AttributeError:
-            # Если атрибут уже был удалён, игнорируем
-            pass 
-        
-
-        
-    
-    
     def show_manager_context_menu(self, pos, button, row_data):
         """Показывает контекстное меню для конкретного менеджера."""
         menu = QMenu(button)
@@ -1031,7 +1260,7 @@ class GenerateWidgets(QObject):
         # --- 1. Копировать данные по менеджеру (человекочитаемо) ---
         def copy_manager_data():
             lines = []
-            if self.active_tab_index == 0:
+            if self.active_kind == readers.KIND_MANAGERS:
                 lines = [
                     f'Менеджер: {row_data.manager}',
                     f'План по деньгам: {
@@ -1053,45 +1282,51 @@ class GenerateWidgets(QObject):
                     f'Процент (продажи): {
                             self.value_format(row_data.realization_percent)}',
                 ]
-            elif self.active_tab_index in (1, 5):
+            elif self.active_kind == readers.KIND_BRAND_MANAGERS:
                 lines = [
                     f'Менеджер: {row_data.manager}',
                     f'План (все группы): {
                             self.value_format(row_data.manager_plan)}',
                     f'Выполнение (все группы): {
                             self.value_format(row_data.manager_realization)}',
-                    f'Процент (все группы): {row_data.manager_percent}',
+                    f'Процент (все группы): {
+                            schema.format_percent(row_data.manager_percent)}',
                     f'Группа: {row_data.group}',
                     f'План (группа): {
                             self.value_format(row_data.group_plan)}',
                     f'Выполнение (группа): {
                             self.value_format(row_data.group_realization)}',
-                    f'Процент (группа): {row_data.group_percent}',
+                    f'Процент (группа): {
+                            schema.format_percent(row_data.group_percent)}',
                 ]
-            elif self.active_tab_index == 2:  # Бренд-менеджеры Farban
+            elif self.active_kind == readers.KIND_BRAND_MANAGERS_FARBAN:
                 lines = [
                     f'Менеджер: {row_data.manager}',
                     f'План (продажи): {
                             self.value_format(row_data.manager_plan)}',
                     f'Факт (продажи): {
                             self.value_format(row_data.manager_fact)}',
-                    f'Процент (продажи): {row_data.manager_percent}',
+                    f'Процент (продажи): {
+                            schema.format_percent(row_data.manager_percent)}',
                     f'План (вес): {
                             self.value_format(row_data.manager_plan_weight)}',
                     f'Факт (вес): {
                             self.value_format(row_data.manager_fact_weight)}',
-                    f'Процент (вес): {row_data.manager_percent_weight}',
+                    f'Процент (вес): {
+                            schema.format_percent(row_data.manager_percent_weight)}',
                     f'Группа: {row_data.group}',
                     f'План (продажи, группа): {
                             self.value_format(row_data.group_plan)}',
                     f'Факт (продажи, группа): {
                             self.value_format(row_data.group_fact)}',
-                    f'Процент (продажи, группа): {row_data.group_percent}',
+                    f'Процент (продажи, группа): {
+                            schema.format_percent(row_data.group_percent)}',
                     f'План (вес, группа): {
                             self.value_format(row_data.group_plan_weight)}',
                     f'Факт (вес, группа): {
                             self.value_format(row_data.group_fact_weight)}',
-                    f'Процент (вес, группа): {row_data.group_percent_weight}',
+                    f'Процент (вес, группа): {
+                            schema.format_percent(row_data.group_percent_weight)}',
                 ]
                 
             QApplication.clipboard().setText("\n".join(lines))
@@ -1099,10 +1334,18 @@ class GenerateWidgets(QObject):
         
         action_copy = QAction("Копировать данные", self.win_roots)
         action_copy.triggered.connect(copy_manager_data)
+        # Группы бренд-менеджера с выполнением ниже требуемого (красные)
+        action_below = None
+        if self.active_kind in (readers.KIND_BRAND_MANAGERS,
+                                readers.KIND_BRAND_MANAGERS_FARBAN):
+            action_below = QAction("Копировать группы ниже плана",
+                                   self.win_roots)
+            action_below.triggered.connect(
+                lambda: self._copy_groups_below_plan(row_data.manager))
         
         action_settings = QAction("Настройки", self.win_roots)
-        # Новый пункт — только для вкладок 0 и 4
-        if self.active_tab_index in (0, 4):
+        # Новый пункт — только для вкладок "Менеджеры"
+        if self.active_kind == readers.KIND_MANAGERS:
             action_show_sp = QAction("Показать спецгруппы", self.win_roots)
             action_show_sp.triggered.connect(self.show_special_groups_window)
             menu.addAction(action_show_sp)
@@ -1111,6 +1354,8 @@ class GenerateWidgets(QObject):
     
         # --- Сборка меню ---
         menu.addAction(action_copy)
+        if action_below is not None:
+            menu.addAction(action_below)
         menu.addSeparator()
         
         # --- Создание пунктов меню ---
@@ -1119,7 +1364,7 @@ class GenerateWidgets(QObject):
         menu.addAction(action_print_window)
 
         # Новый пункт меню для управления колонками
-        if self.active_tab_index in [0, 1, 2, 4, 5]:
+        if self.active_kind is not None:
             action_manage_columns = QAction("Управление колонками", self.win_roots)
             action_manage_columns.triggered.connect(self._open_column_manager)
             menu.addAction(action_manage_columns)
@@ -1134,7 +1379,8 @@ class GenerateWidgets(QObject):
                 return Get_Data.get_data(self.root.tabs, tab_idx)
         
             def get_sp_data(tab_idx):
-                if tab_idx in [0, 4]:
+                spec = readers.get_reader(self.root.tabs.tabText(tab_idx))
+                if spec is not None and spec.special_groups:
                     return Get_Data.get_data(self.root.tabs,
                                              tab_idx, sp_group=True)
                 return pd.DataFrame()
@@ -1163,10 +1409,31 @@ class GenerateWidgets(QObject):
         # ✅ Правильное позиционирование
         menu.exec(button.mapToGlobal(pos))
         
+    def _copy_groups_below_plan(self, manager):
+        """
+        Копирует в буфер обмена группы менеджера (вкладки бренд-менеджеров),
+        выполнение которых ниже требуемого процента — красные ячейки.
+        """
+        tab_name = self.root.tabs.tabText(self.active_tab_index)
+        df = Get_Data.get_tab_data(tab_name, **self._view_params())
+        if df.empty or 'color_cell' not in df.columns:
+            return
+        rows = (query.by_color(df, 'color_cell', 'red')
+                .eq('manager', manager).exclude('group', '').frame())
+        lines = [f'Менеджер: {manager}',
+                 f'Группы ниже плана '
+                 f'({schema.format_percent(Get_Data.get_target_percent())}):']
+        for _, rec in rows.iterrows():
+            lines.append(f"  {rec['group']}: "
+                         f"{schema.format_percent(rec['group_percent'])}")
+        QApplication.clipboard().setText("\n".join(lines))
+
     def _open_column_manager(self):
         """Открывает диалог управления колонками."""
         if self.column_manager.show_column_editor_dialog(self.active_tab_index, self.win_roots):
             # Если порядок колонок был изменен, перерисовываем сетку
+            # (порядок общий для вкладок одного вида)
+            self.invalidate_tabs()
             self.create_grid()
         
 
@@ -1189,6 +1456,11 @@ class SpecialGroupsWindow(QDialog):
         Текущий фильтр по менеджеру.
     target_percent : float
         Требуемый процент выполнения (для расчёта цветов).
+    tab_index : int or None
+        Вкладка, с которой открыто окно (её данные перечитывает
+        `reload_data`).
+    source_file : str or None
+        Файл данных окна (по нему окно обновляется после синхронизации).
 
     Methods
     -------
@@ -1203,7 +1475,8 @@ class SpecialGroupsWindow(QDialog):
     """
     
     def __init__(self, df: pd.DataFrame, target_percent: float, parent=None,
-                 generate_widgets=None, last_modified: str = "неизвестно"):
+                 generate_widgets=None, last_modified: str = "неизвестно",
+                 tab_index=None, source_file=None):
         super().__init__(parent)
         self.setWindowTitle("Спецгруппы")
         self.resize(900, 600)
@@ -1213,6 +1486,8 @@ class SpecialGroupsWindow(QDialog):
         self.target_percent = target_percent
         self.generate_widgets = generate_widgets
         self.last_modified = last_modified
+        self.tab_index = tab_index
+        self.source_file = source_file
         self.aggregated = False
         # Состояние
         self.filtered_cut_manager = None
@@ -1267,12 +1542,12 @@ class SpecialGroupsWindow(QDialog):
         # Фильтрация, если задана
         if self.filtered_cut_manager is not None:
             # Выбираем строки с нужным cut_manager ИЛИ строку Общее по компании
-            df_to_show = self.df[
-                (self.df['cut_manager'] == self.filtered_cut_manager) |
-                (self.df['manager'] == 'Общее по компании')
-            ].copy()
+            selected = query.by_cut_manager(self.df, self.filtered_cut_manager)
         else:
-            df_to_show = self.df.copy()
+            selected = query.select(self.df)
+        df_to_show = selected.frame()
+        # Индексы self.df строятся один раз и служат для всех выборок
+        rows = query.index_for(self.df)
     
         
     
@@ -1302,14 +1577,14 @@ class SpecialGroupsWindow(QDialog):
         row += 1
         # === ДАННЫЕ ПО МЕНЕДЖЕРАМ ===
         # 1. Извлекаем строку "Общее по компании" из исходного df_to_show
-        company_mask = df_to_show['manager'] == 'Общее по компании'
-        company_row_df = df_to_show[company_mask]
+        company_row_df = selected.eq('manager', query.COMPANY).frame()
         
         # 2. Удаляем её из исходного DataFrame
-        df_without_company = df_to_show[~company_mask]
+        df_without_company = selected.exclude('manager',
+                                              query.COMPANY).frame()
         
         # 3. Группируем только "чистые" данные (без "Общее по компании")
-        grouped = df_without_company.groupby('manager')
+        grouped = df_without_company.groupby('manager', observed=True)
         
         # 4. Собираем все строки в правильном порядке:
         #    сначала обычные менеджеры, потом "Общее по компании"
@@ -1340,9 +1615,10 @@ class SpecialGroupsWindow(QDialog):
             # Значения по спецгруппам
             col = 1
             for grp in all_groups:
-                rec = group_df[group_df['special_group'] == grp]
-                if not rec.empty:
-                    r = rec.iloc[0]
+                rec = rows.positions(('manager', 'special_group'),
+                                     (manager, grp))
+                if len(rec):
+                    r = self.df.iloc[rec[0]]
                     # План
                     plan_lbl = QLabel(self._fmt(r['special_group_plan']))
                     plan_lbl.setStyleSheet(self._style('yellow'))
@@ -1397,7 +1673,9 @@ class SpecialGroupsWindow(QDialog):
         # Получаем текущие параметры
         gw = self.generate_widgets
         cut_manager = gw.filtered_cut_manager
-        active_tab_index = gw.active_tab_index
+        # Вкладка окна, а не активная (её могли переключить)
+        active_tab_index = (gw.active_tab_index if self.tab_index is None
+                            else self.tab_index)
         root_tabs = gw.root.tabs
     
         # Перечитываем данные с теми же параметрами
@@ -1451,7 +1729,8 @@ class SpecialGroupsWindow(QDialog):
         action_copy = QAction("Копировать данные", self)
         def copy_data():
             # Берём все спецгруппы этого менеджера из текущего DataFrame
-            manager_records = self.df[self.df['manager'] == manager]
+            manager_records = query.select(self.df).eq(
+                'manager', manager).frame()
             lines = [f"Менеджер: {manager}"]
             for _, rec in manager_records.iterrows():
                 if pd.isna(rec['special_group']) or rec['special_group'] == 'Все спецгруппы':
@@ -1467,6 +1746,22 @@ class SpecialGroupsWindow(QDialog):
             QApplication.clipboard().setText("\n".join(lines))
         action_copy.triggered.connect(copy_data)
         menu.addAction(action_copy)
+
+        # --- Копировать спецгруппы ниже требуемого процента ---
+        action_below = QAction("Копировать спецгруппы ниже плана", self)
+        def copy_below_target():
+            rows = query.below_target(
+                self.df, self.target_percent,
+                column='special_group_percent').exclude(
+                    'special_group', 'Все спецгруппы').frame()
+            lines = [f"Спецгруппы ниже плана "
+                     f"({schema.format_percent(self.target_percent)}):"]
+            for _, rec in rows.iterrows():
+                lines.append(f"  {rec['manager']} — {rec['special_group']}: "
+                             f"{schema.format_percent(rec['special_group_percent'])}")
+            QApplication.clipboard().setText("\n".join(lines))
+        action_below.triggered.connect(copy_below_target)
+        menu.addAction(action_below)
     
         
     
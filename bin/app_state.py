@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Состояние и настройки приложения, общие для читателей данных и интерфейса.
+
+Настройки bin/setting.ini разбираются один раз и хранятся в памяти
+(`SettingsStore`, общий экземпляр — `SETTINGS`); все модули читают их
+оттуда, а изменения записываются обратно одним файлом с задержкой
+(несколько изменений подряд — одна запись) и атомарно: во временный файл
+с последующим `os.replace`.
+
+Требуемый процент выполнения плана задаётся атрибутом "Проц" файла
+Plan_26BK.xml и нужен остальным вкладкам (Plan.xml, бренд-менеджеры).
+Значение хранится в памяти (`TARGET_PERCENT`); files/total_plan.txt
+читается один раз при первом обращении и перезаписывается только при
+изменении значения, чтобы процент сохранялся между запусками.
+
+Подписчики (`subscribe`) вызываются при каждом изменении значения —
+в том потоке, который его изменил.
+"""
+
+import io
+import os
+import abc
+import atexit
+import threading
+import configparser
+from typing import Callable, Dict, Optional
+
+# Файл настроек приложения
+SETTINGS_FILE = os.path.join('bin', 'setting.ini')
+# Файл, в котором сохраняется требуемый процент
+TARGET_PERCENT_FILE = os.path.join('files', 'total_plan.txt')
+# Задержка записи изменений в файл (с)
+SAVE_DELAY = 0.5
+
+
+def atomic_write(file_path: str, text: str):
+    """Записывает текст во временный файл и заменяет им `file_path`."""
+    tmp = f'{file_path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as ff:
+        ff.write(text)
+    os.replace(tmp, file_path)
+
+
+class ObservableState(abc.ABC):
+    """
+    Основа хранилищ состояния: подписчики и отложенная запись в файл.
+
+    Attributes
+    ----------
+    file_path : str
+        Файл для сохранения значений между запусками.
+    delay : float
+        Задержка записи (с); 0 — записывать сразу.
+    """
+
+    def __init__(self, file_path: str, delay: float = SAVE_DELAY):
+        self.file_path = file_path
+        self.delay = delay
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._timer = None
+        self._dirty = False
+
+    def subscribe(self, callback: Callable) -> Callable[[], None]:
+        """
+        Подписывает `callback` на изменения.
+
+        Returns
+        -------
+        Callable
+            Функция отмены подписки.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _notify(self, *args):
+        """Вызывает подписчиков (вне блокировки)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[ERROR] Ошибка обработчика изменения "
+                      f"{self.file_path}: {e}")
+
+    def _schedule_save(self):
+        """Откладывает запись: изменения за `delay` секунд пишутся разом."""
+        with self._lock:
+            self._dirty = True
+            if self.delay <= 0:
+                self.flush()
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Записывает несохранённые изменения немедленно."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            try:
+                atomic_write(self.file_path, self._dump())
+                self._dirty = False
+            except OSError as e:
+                print(f"[ERROR] Не удалось сохранить {self.file_path}: {e}")
+
+    @abc.abstractmethod
+    def _dump(self) -> str:
+        """Текст файла для сохранения."""
+
+
+class SettingsStore(ObservableState):
+    """
+    Настройки из ini-файла, разобранные один раз.
+
+    Подписчики вызываются как `callback(section, option, value)`.
+    """
+
+    def __init__(self, file_path: str = SETTINGS_FILE,
+                 delay: float = SAVE_DELAY):
+        super().__init__(file_path, delay)
+        self._config = None
+
+    @property
+    def config(self) -> configparser.ConfigParser:
+        """Разобранный файл настроек (читается при первом обращении)."""
+        with self._lock:
+            if self._config is None:
+                self._config = configparser.ConfigParser()
+                if os.path.exists(self.file_path):
+                    with open(self.file_path, encoding='utf-8') as fp:
+                        self._config.read_file(fp)
+            return self._config
+
+    def has_option(self, section: str, option: str) -> bool:
+        return self.config.has_option(section, option)
+
+    def get(self, section: str, option: str, fallback=None) -> Optional[str]:
+        return self.config.get(section, option, fallback=fallback)
+
+    def getint(self, section: str, option: str, fallback=None):
+        return self.config.getint(section, option, fallback=fallback)
+
+    def getfloat(self, section: str, option: str, fallback=None):
+        return self.config.getfloat(section, option, fallback=fallback)
+
+    def getboolean(self, section: str, option: str, fallback=None):
+        return self.config.getboolean(section, option, fallback=fallback)
+
+    def section(self, section: str) -> Dict[str, str]:
+        """Значения секции (пустой словарь, если секции нет)."""
+        with self._lock:
+            if not self.config.has_section(section):
+                return {}
+            return dict(self.config.items(section))
+
+    def set(self, section: str, option: str, value) -> bool:
+        """
+        Устанавливает значение и планирует запись файла.
+
+        Returns
+        -------
+        bool
+            True, если значение изменилось.
+        """
+        value = str(value)
+        with self._lock:
+            config = self.config
+            if not config.has_section(section):
+                config.add_section(section)
+            if config.get(section, option, fallback=None) == value:
+                return False
+            config.set(section, option, value)
+            self._schedule_save()
+        self._notify(section, option, value)
+        return True
+
+    def update(self, section: str, values: Dict[str, object]) -> bool:
+        """Устанавливает несколько значений секции; True — если что-то изменилось."""
+        changed = False
+        for option, value in values.items():
+            changed = self.set(section, option, value) or changed
+        return changed
+
+    def reload(self):
+        """Перечитывает файл (несохранённые изменения записываются до этого)."""
+        self.flush()
+        with self._lock:
+            self._config = None
+
+    def _dump(self) -> str:
+        buffer = io.StringIO()
+        self.config.write(buffer)
+        return buffer.getvalue()
+
+
+class TargetPercentState(ObservableState):
+    """
+    Требуемый процент выполнения плана.
+
+    Подписчики вызываются как `callback(value)`.
+    """
+
+    def __init__(self, file_path: str = TARGET_PERCENT_FILE,
+                 delay: float = SAVE_DELAY):
+        super().__init__(file_path, delay)
+        self._value = None
+
+    def _load(self) -> float:
+        """Читает сохранённое значение (0.0, если файла нет или он пуст)."""
+        try:
+            with open(self.file_path) as ff:
+                return float(ff.read().strip())
+        except (OSError, ValueError, TypeError):
+            return 0.0
+
+    def get(self) -> float:
+        """Возвращает требуемый процент."""
+        with self._lock:
+            if self._value is None:
+                self._value = self._load()
+            return self._value
+
+    def set(self, value) -> bool:
+        """
+        Устанавливает требуемый процент.
+
+        Parameters
+        ----------
+        value : float
+            Новое значение.
+
+        Returns
+        -------
+        bool
+            True, если значение изменилось (запись в файл — отложенная).
+        """
+        value = float(value)
+        with self._lock:
+            if self._value is None:
+                self._value = self._load()
+            if value == self._value:
+                return False
+            self._value = value
+            self._schedule_save()
+        self._notify(value)
+        return True
+
+    def reset(self):
+        """Сбрасывает значение в памяти — следующий `get` перечитает файл."""
+        self.flush()
+        with self._lock:
+            self._value = None
+
+    def _dump(self) -> str:
+        return str(self._value)
+
+
+_STORES: Dict[str, SettingsStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_settings(file_path: str = SETTINGS_FILE) -> SettingsStore:
+    """Возвращает общее хранилище настроек для ini-файла."""
+    key = os.path.abspath(file_path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = SettingsStore(file_path)
+        return store
+
+
+def flush_all():
+    """Записывает все несохранённые изменения (вызывается при выходе)."""
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+    for store in stores + [TARGET_PERCENT]:
+        store.flush()
+
+
+# Общие настройки и состояние приложения
+SETTINGS = get_settings()
+TARGET_PERCENT = TargetPercentState()
+atexit.register(flush_all)
@@ -4,10 +4,12 @@ Created on Mon Dec 29 2025
 
 @author: Assistant
 """
-import configparser
 from typing import Dict, List, Optional
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QListWidget, QListWidgetItem
 from PySide6.QtCore import Qt
+from bin import constant as const_
+from bin import readers
+from bin.app_state import SETTINGS_FILE, get_settings
 
 
 class ColumnLayout:
@@ -48,16 +50,14 @@ class ColumnLayout:
         ]
     }
     
-    # Маппинг индексов вкладок к типам
+    # Маппинг индексов вкладок к типам (вид источника из реестра readers)
     TAB_INDEX_TO_TYPE = {
-        0: 'managers',
-        1: 'brand_managers', 
-        4: 'managers',
-        5: 'brand_managers',
-        2: 'brand_managers_farban'
+        index: readers.kind_for_index(index)
+        for index in range(len(const_.LIST_NAME_TAB))
+        if readers.kind_for_index(index)
     }
     
-    def __init__(self, config_path: str = 'bin/setting.ini'):
+    def __init__(self, config_path: str = SETTINGS_FILE):
         """
         Инициализирует менеджер колонок.
         
@@ -67,19 +67,18 @@ class ColumnLayout:
             Путь к файлу конфигурации.
         """
         self.config_path = config_path
+        self.settings = get_settings(config_path)
         self.column_orders = {}
         self._load_settings()
     
     def _load_settings(self):
-        """Загружает настройки порядка колонок из файла конфигурации."""
-        config = configparser.ConfigParser()
-        config.read(self.config_path, encoding='utf-8')
-        
+        """Загружает настройки порядка колонок из общих настроек."""
         # Загружаем настройки для каждого типа вкладки
         for tab_type in self.TAB_COLUMN_DEFINITIONS.keys():
             section_name = f'columns_{tab_type}'
-            if config.has_section(section_name):
-                order_str = config.get(section_name, 'order', fallback='')
+            if self.settings.section(section_name):
+                order_str = self.settings.get(section_name, 'order',
+                                              fallback='')
                 if order_str:
                     self.column_orders[tab_type] = order_str.split(',')
                 else:
@@ -90,18 +89,9 @@ class ColumnLayout:
                 self.column_orders[tab_type] = [col['id'] for col in self.TAB_COLUMN_DEFINITIONS[tab_type]]
     
     def _save_settings(self):
-        """Сохраняет текущие настройки порядка колонок в файл конфигурации."""
-        config = configparser.ConfigParser()
-        config.read(self.config_path, encoding='utf-8')
-        
+        """Сохраняет текущие настройки порядка колонок (запись в файл — отложенная)."""
         for tab_type, order in self.column_orders.items():
-            section_name = f'columns_{tab_type}'
-            if not config.has_section(section_name):
-                config.add_section(section_name)
-            config.set(section_name, 'order', ','.join(order))
-        
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            config.write(f)
+            self.settings.set(f'columns_{tab_type}', 'order', ','.join(order))
     
     def get_column_order(self, tab_index: int) -> List[str]:
         """
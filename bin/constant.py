@@ -6,15 +6,9 @@ Created on Tue Dec 12 09:11:07 2023
 """
 
 import os
-import configparser as cfg
+from bin.app_state import SETTINGS as cfg_
 
-# Доработать возврат ошибки доступа
-cfg_ = cfg.ConfigParser()
-_path = os.getcwd()
-_file_setting = os.path.join(_path, 'bin', 'setting.ini')
-
-with open(_file_setting, encoding='utf-8') as fp:
-    cfg_.read_file(fp)
+# Настройки bin/setting.ini разбираются один раз (app_state.SETTINGS)
 
 # Сетевой ресурс
 W_DISK = os.path.normpath(cfg_.get('setting', 'w_disk'))
@@ -28,17 +22,53 @@ LIST_NAME_TAB = ["Менеджеры ОП",
                  "Менеджеры Home",
                  "Бренд-менеджеры Home",
                  "Отдел закупа Home",]
-# Перечень файлов, соответствующих вкладкам
-DICT_TO_TABS = {'Менеджеры ОП': 'Plan_26BK.xml',
-                'Менеджеры Home': 'Plan.xml',
-                'Бренд-менеджеры ОП': 'Brend_26BK.txt',
-                'Бренд-менеджеры Home': 'BrendOX.txt',
-                'Бренд-менеджеры Farban': 'Brend_Farben.xml'}
+# Файлы и читатели вкладок описаны в реестре bin/readers.py (READERS)
 
 if cfg_.has_option('setting', 'version'):
     VERSION = os.path.normpath(cfg_.get('setting', 'version'))
 else:
     VERSION = 0
+
+# Бюджет памяти кэша разобранных файлов (МБ) и проверка по хэшу содержимого
+CACHE_MEMORY_BUDGET_MB = cfg_.getfloat('cache', 'memory_budget_mb',
+                                       fallback=64)
+CACHE_CONTENT_HASH = cfg_.getboolean('cache', 'content_hash',
+                                     fallback=False)
+# Бинарные копии разобранных файлов (sidecar) и каталог для них
+CACHE_SIDECAR = cfg_.getboolean('cache', 'sidecar', fallback=True)
+CACHE_SIDECAR_DIR = os.path.normpath(
+    cfg_.get('cache', 'sidecar_dir', fallback='files/.cache'))
+# Число потоков фонового разбора файлов (прогрев кэша)
+CACHE_WARM_WORKERS = cfg_.getint('cache', 'warm_workers', fallback=4)
+# Предзагрузка вкладок в простое: включена, число вкладок, интервал (мс)
+CACHE_PREFETCH = cfg_.getboolean('cache', 'prefetch', fallback=True)
+CACHE_PREFETCH_TABS = cfg_.getint('cache', 'prefetch_tabs', fallback=2)
+CACHE_PREFETCH_IDLE_MS = cfg_.getint('cache', 'prefetch_idle_ms',
+                                     fallback=1500)
+
+# Наблюдение за сетевой папкой: окно объединения событий и границы
+# интервала опроса (мс)
+WATCH_DEBOUNCE_MS = cfg_.getint('watch', 'debounce_ms', fallback=1000)
+WATCH_POLL_MIN_MS = cfg_.getint('watch', 'poll_min_ms', fallback=5000)
+WATCH_POLL_MAX_MS = cfg_.getint('watch', 'poll_max_ms', fallback=60000)
+# Расписание опроса по истории выгрузок: редкий опрос (мс), полуширина окна
+# вокруг ожидаемой выгрузки (с), рабочие часы, файл истории
+WATCH_IDLE_MS = cfg_.getint('watch', 'idle_ms', fallback=600000)
+WATCH_LEAD_S = cfg_.getfloat('watch', 'lead_s', fallback=120)
+WATCH_WORK_START = cfg_.getint('watch', 'work_start', fallback=8)
+WATCH_WORK_END = cfg_.getint('watch', 'work_end', fallback=20)
+WATCH_HISTORY_FILE = os.path.join(CACHE_SIDECAR_DIR, 'poll_history.json')
+
+# Синхронизация с сетевой папкой: ограничения времени (с), окно проверки
+# завершённости выгрузки (с), число потоков копирования, автомат
+# отключения (неудач подряд, пауза и её предел, с)
+SYNC_TIMEOUT_S = cfg_.getfloat('sync', 'timeout_s', fallback=10)
+SYNC_COPY_TIMEOUT_S = cfg_.getfloat('sync', 'copy_timeout_s', fallback=120)
+SYNC_STABLE_S = cfg_.getfloat('sync', 'stable_s', fallback=2)
+SYNC_WORKERS = cfg_.getint('sync', 'workers', fallback=3)
+SYNC_BREAKER_THRESHOLD = cfg_.getint('sync', 'breaker_threshold', fallback=3)
+SYNC_BACKOFF_BASE_S = cfg_.getfloat('sync', 'backoff_base_s', fallback=5)
+SYNC_BACKOFF_MAX_S = cfg_.getfloat('sync', 'backoff_max_s', fallback=300)
     
 
 
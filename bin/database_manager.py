@@ -8,10 +8,10 @@
 
 import os
 import sqlite3
-import configparser
 from datetime import datetime, date
 from typing import Dict, List, Optional, Any
 from contextlib import contextmanager
+from bin.app_state import SETTINGS_FILE, get_settings
 
 
 class DatabaseManager:
@@ -21,7 +21,7 @@ class DatabaseManager:
     Обеспечивает доступ к данным в режиме ТОЛЬКО ЧТЕНИЕ.
     """
 
-    def __init__(self, config_path: str = 'bin/setting.ini'):
+    def __init__(self, config_path: str = SETTINGS_FILE):
         """
         Инициализирует менеджер базы данных.
         
@@ -43,11 +43,10 @@ class DatabaseManager:
         str
             Путь к файлу централизованной базы данных.
         """
-        config = configparser.ConfigParser()
-        config.read(self.config_path, encoding='utf-8')
+        settings = get_settings(self.config_path)
         
-        if config.has_option('database', 'central_db_path'):
-            db_path = config.get('database', 'central_db_path')
+        if settings.has_option('database', 'central_db_path'):
+            db_path = settings.get('database', 'central_db_path')
             # Нормализуем путь
             db_path = os.path.normpath(db_path)
             return db_path
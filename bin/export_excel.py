@@ -7,8 +7,10 @@ from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from PySide6.QtWidgets import QFileDialog, QMessageBox
 from PySide6.QtCore import QLocale
-from bin import constant as const_
+from bin import readers
 from bin.get_data import Get_Data
+from bin import schema
+from bin import query
 
 
 def export_full_dashboard(parent, get_data_func, get_special_groups_data,
@@ -39,7 +41,9 @@ def export_full_dashboard(parent, get_data_func, get_special_groups_data,
 
         for tab_idx in tab_order:
             tab_name = tab_texts[tab_idx]
-            if tab_idx in [0, 4]:
+            spec = readers.get_reader(tab_name)
+            kind = spec.kind if spec else None
+            if kind == readers.KIND_MANAGERS:
                 df = get_data_func(tab_idx)
                 if not df.empty:
                     if first_sheet:
@@ -57,7 +61,7 @@ def export_full_dashboard(parent, get_data_func, get_special_groups_data,
                     _export_special_groups_tab(ws_sp, df_sp,
                                                tab_name, target_percent)
 
-            elif tab_idx in [1, 5]:
+            elif kind == readers.KIND_BRAND_MANAGERS:
                 df = get_data_func(tab_idx)
                 if not df.empty:
                     if first_sheet:
@@ -69,7 +73,7 @@ def export_full_dashboard(parent, get_data_func, get_special_groups_data,
                     _export_brand_managers_tab(ws, df,
                                                tab_name, target_percent)
 
-            elif tab_idx == 2:
+            elif kind == readers.KIND_BRAND_MANAGERS_FARBAN:
                 df = get_data_func(tab_idx)
                 if not df.empty:
                     if first_sheet:
@@ -132,8 +136,8 @@ def _add_header_row(ws, tab_name, target_percent, start_col=1):
     """Добавляет строку 'По плану требуется... Данные на...' в начало листа."""
     styles = _get_common_styles()
 
-    file_rel = const_.DICT_TO_TABS.get(tab_name, "")
-    file_path = os.path.join("files", file_rel)
+    spec = readers.get_reader(tab_name)
+    file_path = os.path.join("files", spec.file_name if spec else "")
     last_modified = _get_file_last_modified(file_path)
     header_text = f"По плану требуется {target_percent} % Данные на: {last_modified}"
 
@@ -164,9 +168,7 @@ def _export_managers_tab(ws, df, tab_name, target_percent):
         cell.alignment = styles['align_center']
         cell.border = styles['thin_border']
 
-    for row_idx, row in df.iterrows():
-        if row['manager'] in ('Менеджер', 'Направление'):
-            continue
+    for row_idx, (_, row) in enumerate(df.iterrows(), data_start_row + 1):
         excel_row = [
             row['manager'],
             _format_number(row['money_plan']),
@@ -185,7 +187,7 @@ def _export_managers_tab(ws, df, tab_name, target_percent):
             'yellow', row['realization_color'], row['realization_color']
         ]
         for col_num, (value, color_key) in enumerate(zip(excel_row, colors), 1):
-            cell = ws.cell(row_idx + data_start_row, col_num, value)
+            cell = ws.cell(row_idx, col_num, value)
             cell.alignment = styles['align_left'] if col_num == 1 else styles['align_center']
             cell.border = styles['thin_border']
             if color_key and color_key in styles['color_map']:
@@ -213,14 +215,12 @@ def _export_brand_managers_tab(ws, df, tab_name, target_percent):
     current_manager = None
 
     for _, row in df.iterrows():
-        if row['manager'] in ('Менеджер', 'Направление'):
-            continue
         if row['manager'] != current_manager:
             excel_row = [
                 row['manager'],
                 _format_number(row['manager_plan']),
                 _format_number(row['manager_realization']),
-                row['manager_percent'],
+                schema.format_percent(row['manager_percent']),
                 "", "", "", ""
             ]
             for col_num, value in enumerate(excel_row, 1):
@@ -238,7 +238,7 @@ def _export_brand_managers_tab(ws, df, tab_name, target_percent):
                 row['group'],
                 _format_number(row['group_plan']),
                 _format_number(row['group_realization']),
-                row['group_percent']
+                schema.format_percent(row['group_percent'])
             ]
             colors = [None, None, None, None, None, 'yellow', row['color_cell'], row['color_cell']]
             for col_num, (value, color_key) in enumerate(zip(excel_row, colors), 1):
@@ -271,17 +271,15 @@ def _export_brand_managers_farban_tab(ws, df, tab_name, target_percent):
     current_manager = None
 
     for _, row in df.iterrows():
-        if row['manager'] in ('Менеджер', 'Направление'):
-            continue
         if row['manager'] != current_manager:
             excel_row = [
                 row['manager'],
                 _format_number(row['manager_plan']),
                 _format_number(row['manager_fact']),
-                row['manager_percent'],
+                schema.format_percent(row['manager_percent']),
                 _format_number(row['manager_plan_weight']),
                 _format_number(row['manager_fact_weight']),
-                row['manager_percent_weight']
+                schema.format_percent(row['manager_percent_weight'])
             ]
             colors = [None, 'yellow', None, None, 'yellow', None, None]
             for col_num, (value, color_key) in enumerate(zip(excel_row, colors), 1):
@@ -298,10 +296,10 @@ def _export_brand_managers_farban_tab(ws, df, tab_name, target_percent):
                 row['group'],
                 _format_number(row['group_plan']),
                 _format_number(row['group_fact']),
-                row['group_percent'],
+                schema.format_percent(row['group_percent']),
                 _format_number(row['group_plan_weight']),
                 _format_number(row['group_fact_weight']),
-                row['group_percent_weight']
+                schema.format_percent(row['group_percent_weight'])
             ]
             colors = [
                 None,
@@ -340,18 +338,23 @@ def _export_special_groups_tab(ws, df, tab_name, target_percent):
         cell.alignment = styles['align_center']
         cell.border = styles['thin_border']
 
-    grouped = df.groupby('manager')
-    for row_idx, (manager, group_df) in enumerate(grouped, data_start_row + 1):
+    # Порядок менеджеров — как у groupby (по категориям или по алфавиту)
+    managers = list(df['manager'].dropna().drop_duplicates().sort_values())
+    # Ячейки таблицы — по индексу (менеджер, спецгруппа) без перебора строк
+    cells = query.index_for(df)
+    for row_idx, manager in enumerate(managers, data_start_row + 1):
         col = 1
         cell = ws.cell(row_idx, col, manager)
         cell.alignment = styles['align_left']
         cell.border = styles['thin_border']
         col += 1
 
-        group_dict = {r['special_group']: r for r in group_df.to_dict('records')}
         for grp in all_groups:
-            rec = group_dict.get(grp)
-            if rec is not None:
+            found = cells.positions(('manager', 'special_group'),
+                                    (manager, grp))
+            if len(found):
+                # Последняя строка — как при сборке словаря по записям
+                rec = df.iloc[found[-1]]
                 plan_val = _format_number(rec['special_group_plan'])
                 fact_val = _format_number(rec['special_group_fact'])
                 pct_val = f"{rec['special_group_percent']:.1f} %" if pd.notna(rec['special_group_percent']) else "0.0 %"
@@ -390,7 +393,7 @@ def _export_special_groups_tab(ws, df, tab_name, target_percent):
 
     # Итоги по спецгруппам
     if not df.empty:
-        totals_row = len(grouped) + data_start_row + 1
+        totals_row = len(managers) + data_start_row + 1
         ws.cell(totals_row, 1, "Итого по спецгруппам").fill = styles['header_fill']
         ws.cell(totals_row, 1).font = styles['header_font']
         ws.cell(totals_row, 1).alignment = styles['align_center']
@@ -398,7 +401,7 @@ def _export_special_groups_tab(ws, df, tab_name, target_percent):
 
         col = 2
         for grp in all_groups:
-            group_data = df[df['special_group'] == grp]
+            group_data = query.by_special_group(df, grp).frame()
             plan = group_data['special_group_plan'].sum()
             fact = group_data['special_group_fact'].sum()
             percent = (fact / plan * 100) if plan != 0 else 0.0
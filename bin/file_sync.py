@@ -3,34 +3,314 @@
 Created on Tue Oct 21 21:36:07 2025
 
 @author: Professional
+
+Копирование файлов из сетевой папки в локальную.
+
+Файл копируется во временный файл рядом с локальным и подменяет его
+через `os.replace`, поэтому читатель никогда не видит недописанный файл.
+Во время копирования считается хэш содержимого; если он совпал с хэшем
+локального файла (1С выгрузила те же данные), временный файл удаляется
+и локальный остаётся нетронутым — без повторного разбора и перерисовки.
+Хэши локальных файлов кэшируются по (размер, mtime), а совпадение
+с сетевой версией запоминается, чтобы не читать её повторно.
+
+1С пишет выгрузку прямо в сетевую папку, поэтому перед копированием
+проверяется, что запись закончена: размер и mtime не меняются в течение
+окна `stable_s` (по двум замерам с интервалом в окно — mtime ставят часы
+сервера, и сравнивать его с местным временем нельзя), а файл завершён
+по формату (XML — закрывающим тегом
+корневого элемента, TXT — переводом строки в конце). Незаконченный файл
+не копируется (статус INCOMPLETE) и будет взят при следующей проверке.
 """
 
 # file_sync.py
 import os
+import re
+import time
 import shutil
+import hashlib
+import tempfile
+import threading
 from pathlib import Path
 
-def sync_files(local_dir: str, network_dir: str, filenames: list):
+# Размер блока при копировании и хэшировании
+CHUNK_SIZE = 1 << 20
+
+# Статусы синхронизации файла
+MISSING = 'missing'          # файла нет в сетевой папке
+UP_TO_DATE = 'up_to_date'    # локальный файл не старше сетевого
+IDENTICAL = 'identical'      # сетевой новее, но содержимое то же
+COPIED = 'copied'            # файл обновлён
+INCOMPLETE = 'incomplete'    # файл ещё выгружается
+
+# Сколько байт читать с начала и конца файла при проверке завершённости
+_PROBE_SIZE = 4096
+_XML_ENCODING = re.compile(rb'encoding=["\']([\w.-]+)["\']')
+_XML_ROOT = re.compile(r'<([^?!/\s>][^\s/>]*)')
+
+_lock = threading.Lock()
+# (путь, размер, mtime_ns) -> хэш содержимого
+_fingerprints = {}
+# локальный путь -> (mtime_ns, размер) сетевой версии с тем же содержимым
+_identical = {}
+# путь -> ((размер, mtime_ns), time.monotonic() первого замера этой версии)
+_first_seen = {}
+
+
+class IncompleteUpload(OSError):
+    """Файл изменился во время копирования или не завершён по формату."""
+
+
+class CopyCancelled(OSError):
+    """Копирование отменено (вызывающий перестал ждать его результат)."""
+
+
+class CancelToken:
+    """
+    Отмена копирования, которое вызывающий бросил по таймауту.
+
+    Проверка отмены и подмена локального файла выполняются под одной
+    блокировкой: после `cancel()` брошенное копирование уже не заменит
+    файл (и не столкнётся со следующей синхронизацией того же файла).
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise CopyCancelled("копирование отменено")
+
+    def replace(self, src, dst):
+        """`os.replace`, если копирование не отменено."""
+        with self._lock:
+            self.check()
+            os.replace(src, dst)
+
+
+def _new_digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def fingerprint(path) -> tuple:
+    """
+    Отпечаток файла: (размер, хэш содержимого).
+
+    Хэш считается потоково и кэшируется, пока не изменились размер и mtime.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        digest = _fingerprints.get(key)
+    if digest is None:
+        hasher = _new_digest()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        with _lock:
+            _fingerprints[key] = digest
+    return stat.st_size, digest
+
+
+def is_complete(path) -> bool:
+    """
+    Завершён ли файл по формату.
+
+    XML должен заканчиваться закрывающим тегом корневого элемента,
+    TXT — переводом строки. Файлы других типов считаются завершёнными.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in ('.xml', '.txt'):
+        return True
+    with open(path, 'rb') as f:
+        head = f.read(_PROBE_SIZE)
+        if not head:
+            return False
+        f.seek(max(0, os.fstat(f.fileno()).st_size - _PROBE_SIZE))
+        tail = f.read()
+    if suffix == '.txt':
+        return tail.endswith(b'\n')
+    found = _XML_ENCODING.search(head)
+    encoding = found.group(1).decode('ascii') if found else 'utf-8'
+    try:
+        root = _XML_ROOT.search(head.decode(encoding, errors='ignore'))
+        closing = f'</{root.group(1)}>'.encode(encoding) if root else None
+    except LookupError:
+        closing = None
+    if closing is None:
+        return tail.rstrip().endswith(b'>')
+    return tail.rstrip().endswith(closing)
+
+
+def is_stable(path, window: float, stat=None) -> bool:
+    """
+    Не менялся ли файл (размер и mtime) в течение `window` секунд.
+
+    Сравниваются два замера, разнесённые на `window` по местным часам;
+    mtime с часами компьютера не сравнивается (часы сервера могут
+    расходиться с местными). Если та же версия файла уже встречалась
+    при прежней проверке не меньше `window` назад, повторно не ждём.
+    """
+    if stat is None:
+        stat = os.stat(path)
+    if window <= 0:
+        return True
+    version = (stat.st_size, stat.st_mtime_ns)
+    key = os.path.abspath(path)
+    now = time.monotonic()
+    with _lock:
+        seen, since = _first_seen.get(key, (None, now))
+        if seen != version:
+            _first_seen[key] = (version, now)
+            since = now
+    waited = now - since
+    if waited >= window:
+        return True
+    time.sleep(window - waited)
+    again = os.stat(path)
+    return (again.st_size, again.st_mtime_ns) == version
+
+
+def copy_if_changed(src, dst, cancel: CancelToken = None) -> bool:
+    """
+    Копирует `src` в `dst` атомарно, если содержимое отличается.
+
+    `cancel` прерывает копирование между блоками и запрещает подмену
+    `dst` после отмены (исключение CopyCancelled, `dst` не тронут).
+
+    Returns
+    -------
+    bool
+        True — файл заменён, False — содержимое совпало, `dst` не тронут.
+
+    Raises
+    ------
+    IncompleteUpload
+        Исходный файл изменился во время копирования или скопированные
+        данные не завершены по формату; `dst` не тронут.
+    """
+    src, dst = Path(src), Path(dst)
+    before = os.stat(src)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=f'{dst.name}.',
+                               suffix='.part')
+    try:
+        hasher = _new_digest()
+        size = 0
+        with open(src, 'rb') as fsrc, os.fdopen(fd, 'wb') as fdst:
+            for chunk in iter(lambda: fsrc.read(CHUNK_SIZE), b''):
+                if cancel is not None:
+                    cancel.check()
+                hasher.update(chunk)
+                fdst.write(chunk)
+                size += len(chunk)
+        after = os.stat(src)
+        if ((after.st_size, after.st_mtime_ns)
+                != (before.st_size, before.st_mtime_ns)
+                or size != after.st_size or not is_complete(tmp)):
+            raise IncompleteUpload(f"{src}: файл ещё выгружается")
+        if dst.exists() and fingerprint(dst) == (size, hasher.hexdigest()):
+            os.remove(tmp)
+            return False
+        shutil.copystat(src, tmp)
+        if cancel is not None:
+            cancel.replace(tmp, dst)
+        else:
+            os.replace(tmp, dst)
+        stat = os.stat(dst)
+        with _lock:
+            _fingerprints[(os.path.abspath(dst), stat.st_size,
+                           stat.st_mtime_ns)] = hasher.hexdigest()
+        return True
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def sync_file(src, dst, src_stat=None, stable_s: float = 0.0,
+              cancel: CancelToken = None) -> str:
+    """
+    Обновляет `dst` из `src`, если сетевой файл новее и отличается.
+
+    Parameters
+    ----------
+    src, dst : str or Path
+        Сетевой и локальный файлы.
+    src_stat : os.stat_result, optional
+        Уже полученный stat сетевого файла.
+    stable_s : float
+        Окно (с), в течение которого файл не должен меняться.
+    cancel : CancelToken, optional
+        Отмена копирования (см. `copy_if_changed`).
+
+    Returns
+    -------
+    str
+        MISSING, UP_TO_DATE, IDENTICAL, INCOMPLETE или COPIED.
+    """
+    src, dst = Path(src), Path(dst)
+    if src_stat is None:
+        try:
+            src_stat = os.stat(src)
+        except FileNotFoundError:
+            return MISSING
+    local_mtime = dst.stat().st_mtime if dst.exists() else 0
+    if src_stat.st_mtime <= local_mtime:
+        return UP_TO_DATE
+    version = (src_stat.st_mtime_ns, src_stat.st_size)
+    key = os.path.abspath(dst)
+    with _lock:
+        if _identical.get(key) == version:
+            return IDENTICAL
+    if not is_stable(src, stable_s, src_stat) or not is_complete(src):
+        return INCOMPLETE
+    try:
+        changed = copy_if_changed(src, dst, cancel)
+    except IncompleteUpload:
+        return INCOMPLETE
+    if changed:
+        status = COPIED
+        version = None
+    else:
+        status = IDENTICAL
+    with _lock:
+        if version is None:
+            _identical.pop(key, None)
+        else:
+            _identical[key] = version
+    return status
+
+
+def sync_files(local_dir: str, network_dir: str, filenames: list,
+               stable_s: float = 0.0) -> list:
     """
     Сравнивает время изменения файлов в local_dir и network_dir.
-    Если файл в network_dir новее — копирует его в local_dir.
+    Если файл в network_dir новее и его содержимое отличается —
+    атомарно заменяет им файл в local_dir (через `sync_engine.SyncEngine`).
 
     Parameters:
         local_dir (str): Путь к локальной папке с файлами программы.
         network_dir (str): Путь к сетевой папке.
         filenames (list): Список имён файлов для синхронизации.
-    """
-    for filename in filenames:
-        local_path = Path(local_dir) / filename
-        network_path = Path(network_dir) / filename
-
-        if not network_path.exists():
-            continue  # Файл отсутствует в сетевой папке — пропускаем
+        stable_s (float): Окно проверки, что файл больше не пишется (с).
 
-        if not local_path.exists() or network_path.stat().st_mtime > local_path.stat().st_mtime:
-            try:
-                shutil.copy2(network_path, local_path)
-                print(f"[INFO] Обновлён файл: {local_path}")
-            except Exception as e:
-                print(f"[ERROR] Не удалось обновить {local_path}: {e}")
-                pass
\ No newline at end of file
+    Returns:
+        list: Имена обновлённых файлов.
+    """
+    from bin.sync_engine import SyncEngine  # sync_engine импортирует этот модуль
+    engine = SyncEngine(local_dir, network_dir, files=filenames,
+                        stable_s=stable_s)
+    try:
+        report = engine.sync()
+    finally:
+        engine.shutdown()
+    for error in report.errors:
+        print(f"[ERROR] {error}")
+    return report.updated
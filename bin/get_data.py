@@ -1,8 +1,8 @@
 # bin/get_data.py
 import os
 import pandas as pd
-from bin import read_brendOP, read_brendFarban, read_file_manager
-from bin import constant as const_
+from bin import readers
+from bin.app_state import TARGET_PERCENT
 
 
 class Get_Files:
@@ -15,21 +15,16 @@ class Get_Files:
 
     def get_files(self):
         """Возвращает словарь с путём к файлу и требуемым процентом."""
-        _file = const_.DICT_TO_TABS.get(self.name_tab)
-        _path_and_file = f'files/{_file}'
+        _spec = readers.get_reader(self.name_tab)
         _dct = {'file': None, 'percent': None}
+        if _spec is None:
+            return _dct
+        _path_and_file = _spec.file_path
 
-        # Обеспечиваем наличие файла total_plan.txt
-        _required_percent_file = 'files/total_plan.txt'
-        if not os.path.exists(_required_percent_file):
-            with open(_required_percent_file, 'w') as ff:
-                ff.write('0')
-
-        with open(_required_percent_file) as ff:
-            share_percent = ff.read().strip()
+        share_percent = str(TARGET_PERCENT.get())
 
         # Возвращаем данные, если файл существует
-        if _file and share_percent and os.path.exists(_path_and_file):
+        if os.path.exists(_path_and_file):
             _dct['file'] = _path_and_file
             _dct['percent'] = share_percent
 
@@ -43,13 +38,8 @@ class Get_Data:
 
     @staticmethod
     def get_target_percent():
-        """Метод получает требуемый процент выполнения из файла."""
-        try:
-            with open('files/total_plan.txt') as _file:
-                percent = float(_file.read().strip())
-                return percent
-        except (FileNotFoundError, ValueError, TypeError):
-            return 0.0
+        """Метод возвращает требуемый процент выполнения."""
+        return TARGET_PERCENT.get()
 
     @staticmethod
     def get_data(root_tabs, active_tab_index,
@@ -59,34 +49,40 @@ class Get_Data:
                  merge=False):
         """
         Возвращает данные для указанной вкладки.
+
+        Читатель вкладки берётся из реестра `readers.READERS`.
+        Результаты разбора берутся из `PARSE_CACHE`, пока файл вкладки
+        не изменился, а после перезапуска — из бинарной копии
+        (`sidecar.load_frame`). Возвращаемый DataFrame общий — не изменяйте его.
+        """
+        return Get_Data.get_tab_data(root_tabs.tabText(active_tab_index),
+                                     cut_manager=cut_manager,
+                                     sp_group=sp_group,
+                                     manager_filter=manager_filter,
+                                     merge=merge)
+
+    @staticmethod
+    def get_tab_data(tab_name,
+                     cut_manager=None,
+                     sp_group=False,
+                     manager_filter=None,
+                     merge=False):
+        """
+        Возвращает данные вкладки по её названию.
+
+        Не обращается к виджетам, поэтому может выполняться в фоновом
+        потоке (`workers.DataLoader`).
         """
         df = pd.DataFrame()
-        # Используем только что перенесённый класс
-        __get_datas = Get_Files(root_tabs, active_tab_index)
-        __dct = __get_datas.get_files()
-        if __dct and all(__dct.values()):
-            __file = __dct['file']
-            __target_percent = Get_Data.get_target_percent()
-            if active_tab_index in [0, 4]:
-                # Вкладки с менеджерами ОП и home
-                df = read_file_manager.parse_sales_plan(
-                    __file,
-                    manager=cut_manager,
-                    sp_group=sp_group,
-                    merge=merge
-                )
-            elif active_tab_index in [1, 5]:
-                # Вкладки с бренд-менеджерами ОП / Home
-                df = read_brendOP.read_files(
-                    __file,
-                    target_percent=__target_percent,
-                    filter_of_manager=manager_filter
-                )
-            elif active_tab_index == 2:
-                # Вкладка "Бренд-менеджеры Farban"
-                df = read_brendFarban.read_files(
-                    __file,
-                    target_percent=__target_percent,
-                    filter_of_manager=manager_filter
-                )
-        return df if not df.empty else pd.DataFrame()
\ No newline at end of file
+        __spec = readers.get_reader(tab_name)
+        if __spec is not None and os.path.exists(__spec.file_path):
+            # Читателю передаются только параметры из __spec.params
+            df = __spec.load(
+                __spec.file_path,
+                manager=cut_manager,
+                sp_group=sp_group,
+                merge=merge,
+                target_percent=Get_Data.get_target_percent(),
+                filter_of_manager=manager_filter
+            )
+        return df
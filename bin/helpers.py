@@ -1,40 +1,223 @@
 # bin/helpers.py
-import os
-import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from PySide6.QtCore import QObject, QTimer
+from PySide6.QtCore import QObject, QTimer, QFileSystemWatcher
+from PySide6.QtCore import Signal as QtSignal
 from bin import constant as const_
+from bin import readers
+from bin.poll_schedule import PollScheduler
+from bin.sync_engine import SyncEngine
+from bin.app_state import SETTINGS_FILE, get_settings
 
 
 class FileWatcherHelper(QObject):
     """Вспомогательный класс для отслеживания изменений файлов
-    и их синхронизации между локальной и сетевой папками."""
+    и их синхронизации между локальной и сетевой папками.
+
+    Изменения в сетевой папке отслеживаются по событиям
+    (QFileSystemWatcher: уведомления ОС об изменении каталога и файлов),
+    а на случай, если сетевой ресурс событий не присылает, — опросом
+    с адаптивным интервалом: после изменения опрос частый, дальше интервал
+    задаёт `PollScheduler` по истории выгрузок (частый опрос около
+    ожидаемой выгрузки, редкий между ними и вне рабочего времени; пока
+    истории нет — удвоение до `poll_max_ms`). Серия событий (1С пишет
+    файл частями) объединяется окном `debounce_ms`: сигнал `files_changed`
+    испускается один раз, когда события прекратились. Файл копируется,
+    только когда выгрузка завершена (см. `file_sync.sync_file`); иначе
+    синхронизация повторится при следующем опросе.
+
+    Все обращения к сетевой папке (опрос, синхронизация и проверка путей
+    для подписки на события) выполняются в фоновом потоке с ограничением
+    времени; результаты возвращаются в интерфейс сигналами.
+    """
+    # Файлы в сетевой папке изменились (после окна объединения событий)
+    files_changed = QtSignal()
+    # Синхронизация завершена: список обновлённых файлов
+    sync_finished = QtSignal(object)
+    # Ошибки синхронизации или недоступность сетевой папки
+    sync_failed = QtSignal(str)
+    # Результат фонового опроса: {имя файла: (mtime, размер)} или None
+    _polled = QtSignal(object)
+    # Пути для наблюдения, проверенные в фоне: (папка, список или None)
+    _watch_found = QtSignal(object)
 
     def __init__(self, parent=None, local_base="files", network_dir=None):
         super().__init__(parent)
         self.local_base = Path(local_base).resolve()
-        self.network_dir = Path(network_dir) if network_dir else None
         self.file_timestamps = {}  # {'files/Plan_26BK.xml': mtime}
         self.active_file_key = None  # текущий файл активной вкладки
+        self.last_updated = []  # файлы, обновлённые последней синхронизацией
+
+        # Наблюдение за сетевой папкой
+        self.debounce_ms = const_.WATCH_DEBOUNCE_MS
+        self.poll_min_ms = const_.WATCH_POLL_MIN_MS
+        self.poll_max_ms = const_.WATCH_POLL_MAX_MS
+        self._poll_interval = self.poll_min_ms
+        self._network_state = None  # {имя файла: (mtime, размер)}
+        self.scheduler = PollScheduler(const_.WATCH_HISTORY_FILE,
+                                       poll_min_ms=self.poll_min_ms,
+                                       poll_max_ms=self.poll_max_ms)
+        self._watcher = None
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.timeout.connect(self._on_debounced)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setSingleShot(True)
+        self._poll_timer.timeout.connect(self._poll)
+        self._polled.connect(self._on_polled)
+        self._watch_found.connect(self._on_watch_found)
+        self._watch_pending = False  # папка не ответила при подписке
+
+        # Фоновая синхронизация
+        self.engine = SyncEngine(self.local_base, network_dir)
+        self.breaker = self.engine.breaker
+        # Один поток — синхронизации и опросы не пересекаются
+        self._sync_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='sync')
+        self._sync_lock = threading.Lock()
+        self._sync_running = False
+        self._sync_again = False
+
+    @property
+    def network_dir(self):
+        """Сетевая папка с файлами 1С (или None)."""
+        return self.engine.network_dir
+
+    @network_dir.setter
+    def network_dir(self, value):
+        self.engine.network_dir = value
+        self._network_state = None
+        if self._watcher is not None:
+            self._watch_paths()
+            self._schedule_poll(self.poll_min_ms)
+            # Новая папка — сразу проверяем её файлы
+            self._debounce_timer.start(self.debounce_ms)
+
+    def start_watching(self):
+        """Запускает наблюдение за сетевой папкой (события + опрос)."""
+        if self._watcher is None:
+            self._watcher = QFileSystemWatcher(self)
+            self._watcher.directoryChanged.connect(self._on_fs_event)
+            self._watcher.fileChanged.connect(self._on_fs_event)
+        self._watch_paths()
+        self._schedule_poll(self.poll_min_ms)
+
+    def stop_watching(self):
+        """Останавливает наблюдение."""
+        self._poll_timer.stop()
+        self._debounce_timer.stop()
+        if self._watcher is not None:
+            paths = self._watcher.files() + self._watcher.directories()
+            if paths:
+                self._watcher.removePaths(paths)
+
+    def shutdown(self):
+        """
+        Останавливает наблюдение и фоновые потоки (при выходе из программы).
+
+        Выполняемые задачи не дожидаются, ожидающие отменяются.
+        """
+        self.stop_watching()
+        self._sync_executor.shutdown(wait=False, cancel_futures=True)
+        self.engine.shutdown()
+
+    def _watch_paths(self):
+        """
+        Подписывается на каталог и файлы источников в сетевой папке.
+
+        Существование путей проверяется в фоновом потоке с ограничением
+        времени (`SyncEngine.watch_paths`), подписка — в `_on_watch_found`:
+        недоступная папка не останавливает интерфейс.
+        """
+        if self._watcher is None:
+            return
+        network_dir = self.network_dir
+        self._sync_executor.submit(lambda: self._watch_found.emit(
+            (network_dir, self.engine.watch_paths())))
+
+    def _on_watch_found(self, result):
+        """Подписывается на пути, подтверждённые фоновой проверкой."""
+        network_dir, paths = result
+        if self._watcher is None or network_dir != self.network_dir:
+            return  # папку сменили, пока шла проверка
+        # Папка не ответила — подписка повторится после удачного опроса
+        self._watch_pending = paths is None
+        if paths is None:
+            return
+        current = self._watcher.files() + self._watcher.directories()
+        if current:
+            self._watcher.removePaths(current)
+        if paths:
+            self._watcher.addPaths(paths)
 
-    def get_network_dir_from_settings(self, settings_path="bin/setting.ini"):
-        """Читает путь к сетевой папке из setting.ini."""
-        if not os.path.exists(settings_path):
-            return None
-        import configparser
-        config = configparser.ConfigParser()
-        config.read(settings_path, encoding='utf-8')
-        if config.has_option('setting', 'w_disk'):
-            return config.get('setting', 'w_disk')
-        return None
+    def _on_fs_event(self, path):
+        """Событие ОС: перезапускает окно объединения событий."""
+        if (path == str(self.network_dir)
+                or path not in self._watcher.files()):
+            # В каталоге появились, исчезли или заменены файлы (заменённый
+            # файл выпадает из наблюдения) — подписка обновляется в фоне
+            self._watch_paths()
+        self._debounce_timer.start(self.debounce_ms)
+
+    def _on_debounced(self):
+        """События прекратились: сообщает (состояние папки запомнит синхронизация)."""
+        self.files_changed.emit()
+
+    def _read_network_state(self):
+        """(mtime, размер) файлов в сетевой папке; None — папка не ответила."""
+        return self.engine.read_network_state()
+
+    def _schedule_poll(self, interval):
+        self._poll_interval = interval
+        self._poll_timer.start(interval)
+
+    def _poll(self):
+        """Опрос сетевой папки в фоновом потоке (результат — `_on_polled`)."""
+        self._sync_executor.submit(
+            lambda: self._polled.emit(self._read_network_state()))
+
+    def _on_polled(self, state):
+        """Итог опроса: частый после изменений, редкий в покое."""
+        if state is not None and self._watch_pending:
+            # Папка снова отвечает — подписываемся на её пути
+            self._watch_paths()
+        if state is None:
+            # Папка недоступна — ждём окончания паузы автомата отключения
+            self._schedule_poll(max(int(self.breaker.retry_in() * 1000),
+                                    self.poll_max_ms))
+        elif self._network_state is None:
+            # Первый опрос: исходное состояние (синхронизация при запуске
+            # уже выполнена); mtime файлов пополняют историю выгрузок
+            self.scheduler.learn(None, state)
+            self._network_state = state
+            self._schedule_poll(self.poll_min_ms)
+        elif state != self._network_state:
+            # Изменение, не замеченное событиями (или ещё идёт запись)
+            self.scheduler.learn(self._network_state, state)
+            self._debounce_timer.start(self.debounce_ms)
+            self._schedule_poll(self.poll_min_ms)
+        else:
+            self._schedule_poll(self.scheduler.next_interval(
+                readers.source_files(),
+                min(self._poll_interval * 2, self.poll_max_ms)))
+
+    def poll_schedule(self) -> dict:
+        """Текущее расписание опроса и прогноз выгрузок (для просмотра)."""
+        return self.scheduler.schedule(readers.source_files())
+
+    def get_network_dir_from_settings(self, settings_path=SETTINGS_FILE):
+        """Возвращает путь к сетевой папке из настроек (setting.ini)."""
+        return get_settings(settings_path).get('setting', 'w_disk')
 
     def init_timestamps_from_tabs(self, tab_names):
         """Инициализирует временные метки для всех файлов из вкладок."""
         for tab_name in tab_names:
-            file_rel = const_.DICT_TO_TABS.get(tab_name)
-            if not file_rel:
+            spec = readers.get_reader(tab_name)
+            if spec is None:
                 continue
+            file_rel = spec.file_name
             local_path = self.local_base / file_rel
             key = f"files/{file_rel}"
             if local_path.exists():
@@ -46,35 +229,52 @@ class FileWatcherHelper(QObject):
         """Устанавливает текущий отслеживаемый файл (активная вкладка)."""
         self.active_file_key = file_key
 
-    def sync_all_outdated_files(self):
+    def sync_async(self):
         """
-        Проверяет ВСЕ файлы из DICT_TO_TABS на наличие более свежих версий
-        в сетевой папке и синхронизирует их при необходимости.
-        Возвращает True, если хотя бы один файл был обновлён.
+        Запускает синхронизацию в фоновом потоке и сразу возвращается.
+
+        Результат приходит сигналом `sync_finished` (или `sync_failed`).
+        Если синхронизация уже идёт, после неё будет выполнена ещё одна.
         """
-        if not self.network_dir:
-            return False
+        with self._sync_lock:
+            if self._sync_running:
+                self._sync_again = True
+                return
+            self._sync_running = True
+        self._sync_executor.submit(self._sync_job)
 
-        any_updated = False
-        for file_rel in const_.DICT_TO_TABS.values():
-            if not file_rel:
-                continue
-            local_path = self.local_base / file_rel
-            network_path = self.network_dir / file_rel
+    def _sync_job(self):
+        """Фоновая синхронизация (повторяется, если её запросили снова)."""
+        while True:
+            try:
+                self.sync_all_outdated_files()
+                self.sync_finished.emit(list(self.last_updated))
+            except Exception as e:
+                self.sync_failed.emit(f"Ошибка синхронизации: {e}")
+            with self._sync_lock:
+                if not self._sync_again:
+                    self._sync_running = False
+                    return
+                self._sync_again = False
 
-            if not network_path.exists():
-                continue
+    def sync_all_outdated_files(self):
+        """
+        Проверяет ВСЕ файлы из реестра readers.READERS на наличие более свежих версий
+        в сетевой папке и синхронизирует их при необходимости (`SyncEngine`).
+        Возвращает True, если хотя бы один файл был обновлён
+        (их список — в `last_updated`).
 
-            local_mtime = local_path.stat().st_mtime if local_path.exists() else 0
-            network_mtime = network_path.stat().st_mtime
-
-            if network_mtime > local_mtime:
-                try:
-                    local_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(network_path, local_path)
-                    self.file_timestamps[f"files/{file_rel}"] = local_path.stat().st_mtime
-                    print(f"[SYNC] Обновлён файл: {local_path}")
-                    any_updated = True
-                except Exception as e:
-                    print(f"[ERROR] Не удалось синхронизировать {local_path}: {e}")
-        return any_updated
\ No newline at end of file
+        Выполняется в вызывающем потоке (из интерфейса — через `sync_async`).
+        """
+        report = self.engine.sync()
+        self.last_updated = report.updated
+        for file_rel in report.updated:
+            local_path = self.local_base / file_rel
+            if local_path.exists():
+                self.file_timestamps[f"files/{file_rel}"] = local_path.stat().st_mtime
+        if report.state is not None:
+            self.scheduler.learn(self._network_state, report.state)
+            self._network_state = report.state
+        if report.errors:
+            self.sync_failed.emit("; ".join(report.errors))
+        return bool(report.updated)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Обращения к сетевой папке с ограничением времени и автоматом отключения.
+
+Операции с SMB-ресурсом (stat, копирование) могут зависнуть на десятки
+секунд, если сервер недоступен. `run_with_timeout` выполняет операцию
+в отдельном потоке и перестаёт ждать по истечении времени (сам
+системный вызов прервать нельзя — поток досидит его в фоне). Поток
+фоновый (daemon), поэтому зависшее обращение не задерживает выход
+из программы.
+
+`CircuitBreaker` после нескольких неудач подряд перестаёт обращаться
+к ресурсу на время, которое удваивается с каждым следующим отказом
+(до `max_backoff`); первая удачная попытка после паузы сбрасывает его.
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable
+
+
+class NetworkTimeout(OSError):
+    """Операция с сетевой папкой не уложилась в отведённое время."""
+
+
+def run_with_timeout(fn: Callable, *args, timeout: float = 10.0, **kwargs):
+    """
+    Выполняет `fn(*args, **kwargs)` и ждёт результат не дольше `timeout` с.
+
+    Каждый вызов — в своём фоновом потоке: потоки пула при выходе из
+    программы дожидаются, а зависший вызов может не вернуться никогда
+    (число зависших потоков ограничивает автомат отключения).
+
+    Raises
+    ------
+    NetworkTimeout
+        Время истекло.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='net-io', daemon=True).start()
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise NetworkTimeout(
+            f"{getattr(fn, '__name__', fn)}: нет ответа за {timeout:g} с")
+
+
+class CircuitBreaker:
+    """
+    Автомат отключения обращений к недоступному ресурсу.
+
+    Attributes
+    ----------
+    threshold : int
+        Число неудач подряд, после которого обращения приостанавливаются.
+    base_backoff : float
+        Первая пауза (с).
+    max_backoff : float
+        Наибольшая пауза (с).
+    """
+
+    def __init__(self, threshold: int = 3, base_backoff: float = 5.0,
+                 max_backoff: float = 300.0):
+        self.threshold = max(1, threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.opened = 0          # сколько раз подряд автомат срабатывал
+        self.open_until = 0.0    # time.monotonic(), до которого пауза
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True, пока идёт пауза."""
+        return time.monotonic() < self.open_until
+
+    def retry_in(self) -> float:
+        """Секунд до конца паузы (0, если обращаться можно)."""
+        return max(0.0, self.open_until - time.monotonic())
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к ресурсу."""
+        return not self.is_open
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = 0
+            self.open_until = 0.0
+
+    def record_failure(self) -> bool:
+        """
+        Учитывает неудачу.
+
+        Returns
+        -------
+        bool
+            True, если автомат сработал (началась пауза).
+        """
+        with self._lock:
+            self.failures += 1
+            if self.failures < self.threshold:
+                return False
+            self.opened += 1
+            backoff = min(self.base_backoff * 2 ** (self.opened - 1),
+                          self.max_backoff)
+            self.open_until = time.monotonic() + backoff
+            # После паузы — одна пробная попытка
+            self.failures = self.threshold - 1
+            return True
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш результатов разбора файлов данных (источники `readers.READERS`).
+
+Ключ записи — версия файла (путь, размер, mtime_ns и, по настройке,
+хэш содержимого) плюс функция-читатель и её аргументы. Пока файл не
+изменился, повторное открытие вкладки или перерисовка после смены
+настроек берут готовый результат из памяти.
+
+Записи вытесняются по принципу LRU при превышении бюджета памяти
+(секция [cache] в setting.ini). Счётчики попаданий и промахов
+доступны через `ParseCache.stats()`.
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from bin import constant as const_
+
+
+def file_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Потоково считает хэш содержимого файла (blake2b)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Оценивает объём памяти, занимаемый значением, в байтах.
+
+    DataFrame считается через `memory_usage(deep=True)`, объекты
+    с атрибутом `nbytes` — по нему, остальное — через `sys.getsizeof`.
+    """
+    memory_usage = getattr(value, 'memory_usage', None)
+    if callable(memory_usage):
+        try:
+            return int(memory_usage(deep=True).sum())
+        except (TypeError, ValueError):
+            pass
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+class ParseCache:
+    """
+    LRU-кэш результатов разбора файлов с ограничением по памяти.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Бюджет памяти. При превышении вытесняются самые давние записи.
+    use_content_hash : bool
+        Добавлять ли в ключ хэш содержимого файла (защита от подмены
+        файла с сохранением размера и mtime).
+    hits, misses, evictions : int
+        Счётчики обращений к кэшу.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024,
+                 use_content_hash: bool = False):
+        self.max_bytes = max_bytes
+        self.use_content_hash = use_content_hash
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        # Ключи, которые сейчас разбираются в других потоках
+        self._inflight = {}  # key -> threading.Event
+
+    def file_key(self, file_path: str) -> Tuple:
+        """Возвращает ключ версии файла: (путь, размер, mtime_ns[, хэш])."""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if self.use_content_hash:
+            key += (file_hash(file_path),)
+        return key
+
+    def get_or_load(self, file_path: str, loader: Callable, *args,
+                    extra_key: Tuple = (), **kwargs) -> Any:
+        """
+        Возвращает результат `loader(*args, **kwargs)` для текущей версии
+        файла, вызывая `loader` только при промахе.
+
+        Если тот же ключ уже разбирается в другом потоке (например,
+        `warm_loader`), вызов дожидается его результата.
+
+        Parameters
+        ----------
+        file_path : str
+            Файл, от версии которого зависит результат.
+        loader : Callable
+            Функция разбора.
+        extra_key : tuple, optional
+            Дополнительные значения ключа, от которых зависит результат,
+            но которых нет в аргументах (например, требуемый процент).
+        """
+        file_key = self.file_key(file_path)
+        call_key = (getattr(loader, '__module__', None),
+                    getattr(loader, '__qualname__', repr(loader)),
+                    args, tuple(sorted(kwargs.items())), extra_key)
+        key = (file_key, call_key)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                pending = self._inflight.get(key)
+                if pending is None:
+                    self.misses += 1
+                    pending = self._inflight[key] = threading.Event()
+                    break
+            # Тот же файл уже разбирается в другом потоке — ждём результат.
+            # Если разбор завершится ошибкой, следующий круг разберёт сам
+            pending.wait()
+
+        # Разбор выполняется без блокировки — он может быть долгим
+        try:
+            value = loader(*args, **kwargs)
+            self._store(key, value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+        return value
+
+    def _store(self, key: Tuple, value: Any):
+        """Кладёт значение в кэш, вытесняя устаревшие и давние записи."""
+        size = estimate_size(value)
+        file_key, _ = key
+        with self._lock:
+            # Прежние версии того же файла больше не понадобятся
+            stale = [k for k in self._entries
+                     if k[0][0] == file_key[0] and k[0] != file_key]
+            for stale_key in stale:
+                self._drop(stale_key)
+
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            self._evict()
+
+    def resize(self, value: Any):
+        """
+        Пересчитывает объём записей со значением `value` (например, снимок
+        построил новое представление) и вытесняет записи сверх бюджета.
+        """
+        with self._lock:
+            for key, (entry, size) in list(self._entries.items()):
+                if entry is value:
+                    new_size = estimate_size(value)
+                    self._entries[key] = (value, new_size)
+                    self._total_bytes += new_size - size
+            self._evict()
+
+    def _evict(self):
+        """Вытесняет самые давние записи, пока объём превышает бюджет."""
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: Tuple):
+        """Удаляет запись и уменьшает занятый объём."""
+        _, size = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def invalidate(self, file_path: Optional[str] = None):
+        """Сбрасывает записи файла (или весь кэш при file_path = None)."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self._total_bytes = 0
+                return
+            path = os.path.abspath(file_path)
+            for key in [k for k in self._entries if k[0][0] == path]:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счётчики кэша."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def report(self) -> str:
+        """Возвращает счётчики кэша одной строкой для журнала."""
+        s = self.stats()
+        total = s['hits'] + s['misses']
+        ratio = s['hits'] / total * 100 if total else 0.0
+        return (f"попаданий {s['hits']}, промахов {s['misses']} "
+                f"({ratio:.0f} %), записей {s['entries']}, "
+                f"{s['bytes'] / 1024:.0f} из {s['max_bytes'] / 1024:.0f} КБ")
+
+
+# Общий кэш приложения
+PARSE_CACHE = ParseCache(
+    max_bytes=int(const_.CACHE_MEMORY_BUDGET_MB * 1024 * 1024),
+    use_content_hash=const_.CACHE_CONTENT_HASH
+)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Расписание опроса сетевой папки по истории выгрузок 1С.
+
+Выгрузки приходят примерно по расписанию, поэтому вместо опроса
+каждые несколько секунд круглые сутки `PollScheduler` запоминает время
+появления каждой версии файла (mtime в сетевой папке) и по медиане
+интервалов между ними предсказывает следующую выгрузку:
+
+- в окне `lead_s` вокруг ожидаемой выгрузки — частый опрос (`poll_min_ms`);
+- между выгрузками — ожидание до начала окна (но не дольше `idle_ms`);
+- вне рабочего времени (будни, часы `work_start`–`work_end` по времени
+  `read_file_manager.TIMEZONE`) — раз в `idle_ms` или до начала рабочего дня;
+- пока истории мало — прежнее удвоение интервала до `poll_max_ms`.
+
+История хранится в JSON-файле и переживает перезапуск. Текущее
+расписание доступно через `schedule()` / `report()` и из командной строки:
+
+    python -m bin.poll_schedule
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Tuple
+from bin import constant as const_
+from bin.app_state import atomic_write
+from bin.read_file_manager import TIMEZONE
+
+# Сколько выгрузок каждого файла помнить
+HISTORY_SIZE = 20
+# Меньше трёх выгрузок — интервал не предсказывается
+MIN_ARRIVALS = 3
+# Изменения mtime ближе этого (с) — одна выгрузка (файл ещё пишется)
+MIN_GAP_S = 60
+
+
+def _fmt(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return '—'
+    return datetime.fromtimestamp(timestamp, TIMEZONE).strftime(
+        '%d.%m %H:%M:%S')
+
+
+class PollScheduler:
+    """
+    Планировщик интервала опроса.
+
+    Parameters
+    ----------
+    history_file : str, optional
+        JSON-файл истории выгрузок (None — не сохранять).
+    poll_min_ms, poll_max_ms, idle_ms : int
+        Частый опрос, предел удвоения без истории, редкий опрос (мс).
+    lead_s : float
+        Полуширина окна частого опроса вокруг ожидаемой выгрузки (с).
+    work_start, work_end : int
+        Рабочие часы (местное время), будни.
+    """
+
+    def __init__(self, history_file: Optional[str] = None,
+                 poll_min_ms: int = const_.WATCH_POLL_MIN_MS,
+                 poll_max_ms: int = const_.WATCH_POLL_MAX_MS,
+                 idle_ms: int = const_.WATCH_IDLE_MS,
+                 lead_s: float = const_.WATCH_LEAD_S,
+                 work_start: int = const_.WATCH_WORK_START,
+                 work_end: int = const_.WATCH_WORK_END):
+        self.history_file = history_file
+        self.poll_min_ms = poll_min_ms
+        self.poll_max_ms = poll_max_ms
+        self.idle_ms = max(idle_ms, poll_min_ms)
+        self.lead_s = lead_s
+        self.work_start = work_start
+        self.work_end = work_end
+        self.history: Dict[str, List[float]] = {}
+        self.last_interval = poll_min_ms
+        self.last_reason = 'запуск'
+        self.next_poll_at = None
+        self._lock = threading.Lock()
+        self._load()
+
+    # --- история ---------------------------------------------------------
+    def _load(self):
+        if not self.history_file or not os.path.exists(self.history_file):
+            return
+        try:
+            with open(self.history_file, encoding='utf-8') as f:
+                data = json.load(f)
+            self.history = {name: sorted(float(t) for t in times)
+                            [-HISTORY_SIZE:] for name, times in data.items()}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"[WATCH] История выгрузок не прочитана: {e}")
+
+    def _save(self):
+        if not self.history_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.history_file) or '.',
+                        exist_ok=True)
+            atomic_write(self.history_file,
+                         json.dumps(self.history, ensure_ascii=False))
+        except OSError as e:
+            print(f"[WATCH] История выгрузок не сохранена: {e}")
+
+    def record_arrival(self, file_rel: str, mtime: float) -> bool:
+        """
+        Запоминает появление версии файла с данным mtime.
+
+        Returns
+        -------
+        bool
+            True, если это новая выгрузка.
+        """
+        with self._lock:
+            times = self.history.setdefault(file_rel, [])
+            if times and mtime <= times[-1]:
+                return False
+            if times and mtime - times[-1] < MIN_GAP_S:
+                # Та же выгрузка, файл дописывался
+                times[-1] = mtime
+                changed = False
+            else:
+                times.append(mtime)
+                del times[:-HISTORY_SIZE]
+                changed = True
+            self._save()
+        return changed
+
+    def learn(self, old_state: Optional[dict], new_state: dict):
+        """Запоминает выгрузки по двум состояниям папки {файл: (mtime, размер)}."""
+        for file_rel, (mtime, _) in new_state.items():
+            if not old_state or old_state.get(file_rel) != new_state[file_rel]:
+                self.record_arrival(file_rel, mtime)
+
+    # --- предсказание ----------------------------------------------------
+    def interval(self, file_rel: str) -> Optional[float]:
+        """Медиана интервалов между выгрузками файла (с) или None."""
+        times = self.history.get(file_rel, [])
+        if len(times) < MIN_ARRIVALS:
+            return None
+        return median(b - a for a, b in zip(times, times[1:]))
+
+    def expected(self, file_rel: str, now: Optional[float] = None
+                 ) -> Optional[float]:
+        """
+        Ожидаемое время следующей выгрузки файла (или None).
+
+        Пропущенные выгрузки не копятся: прогноз сдвигается на следующий
+        интервал, как только окно текущего прошло.
+        """
+        interval = self.interval(file_rel)
+        if not interval:
+            return None
+        now = time.time() if now is None else now
+        expected = self.history[file_rel][-1] + interval
+        if expected + self.lead_s < now:
+            skipped = (now - self.lead_s - expected) // interval + 1
+            expected += skipped * interval
+        return expected
+
+    def is_work_time(self, now: Optional[float] = None) -> bool:
+        local = datetime.fromtimestamp(
+            time.time() if now is None else now, TIMEZONE)
+        return (local.weekday() < 5
+                and self.work_start <= local.hour < self.work_end)
+
+    def next_work_start(self, now: Optional[float] = None) -> float:
+        """Начало ближайшего рабочего дня (timestamp)."""
+        now = time.time() if now is None else now
+        day = datetime.fromtimestamp(now, TIMEZONE).date()
+        while True:
+            start = TIMEZONE.localize(
+                datetime.combine(day, dtime(self.work_start)))
+            if day.weekday() < 5 and start.timestamp() > now:
+                return start.timestamp()
+            day += timedelta(days=1)
+
+    def next_interval(self, files: Iterable[str], backoff_ms: int,
+                      now: Optional[float] = None) -> int:
+        """
+        Интервал до следующего опроса (мс).
+
+        Parameters
+        ----------
+        files : Iterable[str]
+            Файлы источников.
+        backoff_ms : int
+            Интервал без прогноза (удвоенный прежний, не больше
+            `poll_max_ms`).
+        """
+        now = time.time() if now is None else now
+        interval, reason = self._decide(list(files), backoff_ms, now)
+        interval = int(max(self.poll_min_ms, interval))
+        self.last_interval, self.last_reason = interval, reason
+        self.next_poll_at = now + interval / 1000
+        return interval
+
+    def _decide(self, files: List[str], backoff_ms: int,
+                now: float) -> Tuple[float, str]:
+        if not self.is_work_time(now):
+            until_work = (self.next_work_start(now) - now) * 1000
+            return min(self.idle_ms, until_work), 'вне рабочего времени'
+        expected = {name: self.expected(name, now) for name in files}
+        known = [t for t in expected.values() if t is not None]
+        if not known:
+            return backoff_ms, 'нет истории выгрузок'
+        wait_ms = (min(known) - self.lead_s - now) * 1000
+        if wait_ms <= 0:
+            return self.poll_min_ms, 'ожидается выгрузка'
+        if len(known) < len(expected):
+            # По части файлов прогноза нет — дольше обычного не ждём
+            return min(wait_ms, backoff_ms), 'до ожидаемой выгрузки'
+        return min(wait_ms, self.idle_ms), 'до ожидаемой выгрузки'
+
+    # --- просмотр --------------------------------------------------------
+    def schedule(self, files: Optional[Iterable[str]] = None,
+                 now: Optional[float] = None) -> dict:
+        """Расписание: последнее решение и прогноз по каждому файлу."""
+        now = time.time() if now is None else now
+        names = list(files) if files is not None else sorted(self.history)
+        return {
+            'work_time': self.is_work_time(now),
+            'interval_ms': self.last_interval,
+            'reason': self.last_reason,
+            'next_poll_at': self.next_poll_at,
+            'files': {
+                name: {
+                    'arrivals': len(self.history.get(name, [])),
+                    'last': (self.history[name][-1]
+                             if self.history.get(name) else None),
+                    'interval_s': self.interval(name),
+                    'expected': self.expected(name, now),
+                } for name in names
+            },
+        }
+
+    def report(self, files: Optional[Iterable[str]] = None) -> str:
+        """Расписание в виде текста."""
+        s = self.schedule(files)
+        lines = [f"опрос через {s['interval_ms'] / 1000:.0f} с "
+                 f"({s['reason']}), следующий {_fmt(s['next_poll_at'])}, "
+                 f"{'рабочее' if s['work_time'] else 'нерабочее'} время"]
+        for name, info in s['files'].items():
+            interval = ('—' if info['interval_s'] is None
+                        else f"{info['interval_s'] / 60:.0f} мин")
+            lines.append(f"  {name:<20} выгрузок {info['arrivals']:>2}, "
+                         f"последняя {_fmt(info['last'])}, интервал "
+                         f"{interval}, ожидается {_fmt(info['expected'])}")
+        return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    print(PollScheduler(const_.WATCH_HISTORY_FILE).report())
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Предзагрузка данных вкладок в простое интерфейса.
+
+Пока пользователь смотрит одну вкладку, данные вкладок, которые он
+вероятнее всего откроет следующими, загружаются в фоне с текущими
+фильтрами (вместе с производными представлениями: спецгруппы построчно
+и объединённые) и попадают в `PARSE_CACHE`, так что переключение берёт
+готовые данные.
+
+Кандидаты выбираются по истории переключений: сначала вкладки, на которые
+чаще всего переходили с текущей, затем недавно открытые, затем соседние.
+
+Предзагрузка идёт по одной вкладке за такт таймера простоя и отступает,
+если поток интерфейса занят: такт, пришедший с большим опозданием
+(очередь событий загружена), загрузка активной вкладки или недавнее
+действие пользователя удваивают интервал (до `MAX_INTERVAL_MS`).
+"""
+
+import os
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional
+from PySide6.QtCore import QElapsedTimer, QObject, QTimer
+from bin import readers
+from bin.get_data import Get_Data
+from bin.warm_loader import WARM_LOADER
+
+# Опоздание такта, после которого поток интерфейса считается занятым (мс)
+BUSY_LAG_MS = 100
+# Верхняя граница интервала при отступлении (мс)
+MAX_INTERVAL_MS = 30_000
+
+
+class TabPrefetcher(QObject):
+    """
+    Предзагрузчик данных вкладок.
+
+    Parameters
+    ----------
+    tab_names : Callable
+        Возвращает список названий вкладок.
+    view_params : Callable
+        `view_params(tab_index)` → параметры запроса данных вкладки
+        с текущими фильтрами.
+    is_busy : Callable, optional
+        Возвращает True, пока интерфейс занят (например, идёт загрузка
+        активной вкладки).
+    max_tabs : int
+        Сколько вкладок-кандидатов держать загруженными.
+    idle_ms : int
+        Интервал такта простоя (мс).
+    """
+
+    def __init__(self, tab_names: Callable[[], List[str]],
+                 view_params: Callable[[int], dict],
+                 is_busy: Optional[Callable[[], bool]] = None,
+                 max_tabs: int = 2, idle_ms: int = 1500, parent=None):
+        super().__init__(parent)
+        self.tab_names = tab_names
+        self.view_params = view_params
+        self.is_busy = is_busy or (lambda: False)
+        self.max_tabs = max_tabs
+        self.idle_ms = max(100, idle_ms)
+        self.current = 0
+        self.transitions: Dict[int, Counter] = {}
+        self.recent = deque(maxlen=8)
+        self._interval = self.idle_ms
+        self._done = set()     # (вкладка, параметры, версия файла)
+        self._future = None    # текущая фоновая загрузка
+        self._active = False   # пользователь действовал с прошлого такта
+        self._clock = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_idle)
+
+    def start(self, current: int = 0):
+        """Запускает такты простоя."""
+        self.current = current
+        self._schedule(self.idle_ms)
+
+    def stop(self):
+        self._timer.stop()
+
+    def record_switch(self, previous: int, current: int):
+        """Запоминает переключение вкладки и откладывает предзагрузку."""
+        if previous != current:
+            self.transitions.setdefault(previous, Counter())[current] += 1
+        self.current = current
+        if current in self.recent:
+            self.recent.remove(current)
+        self.recent.appendleft(current)
+        self.notify_activity()
+
+    def notify_activity(self):
+        """Отмечает действие пользователя: ближайший такт пропускается."""
+        self._active = True
+
+    def candidates(self, current: Optional[int] = None) -> List[int]:
+        """Вкладки с данными, которые вероятнее всего откроют следующими."""
+        current = self.current if current is None else current
+        names = self.tab_names()
+        ranked = [tab for tab, _ in
+                  self.transitions.get(current, Counter()).most_common()]
+        ranked += list(self.recent)
+        ranked += [current + 1, current - 1]
+        result = []
+        for tab in ranked:
+            if (tab != current and 0 <= tab < len(names)
+                    and tab not in result
+                    and readers.get_reader(names[tab]) is not None):
+                result.append(tab)
+        return result[:self.max_tabs]
+
+    def _schedule(self, interval: int):
+        self._interval = interval
+        self._clock.start()
+        self._timer.start(interval)
+
+    def _on_idle(self):
+        """Такт простоя: загружает одну вкладку или отступает."""
+        lag = self._clock.elapsed() - self._interval
+        busy = (lag > BUSY_LAG_MS or self._active or self.is_busy()
+                or (self._future is not None and not self._future.done()))
+        self._active = False
+        if busy:
+            self._schedule(min(self._interval * 2, MAX_INTERVAL_MS))
+            return
+        job = self._next_job()
+        if job is not None:
+            if len(self._done) > 64:
+                self._done.clear()
+            self._done.add(job[0])
+            self._future = WARM_LOADER.submit(self._load, *job[1:])
+        self._schedule(self.idle_ms)
+
+    def _next_job(self):
+        """Первая незагруженная вкладка-кандидат: (ключ, имя, параметры)."""
+        names = self.tab_names()
+        for tab in self.candidates():
+            spec = readers.get_reader(names[tab])
+            try:
+                version = os.stat(spec.file_path).st_mtime_ns
+            except OSError:
+                continue
+            params = self.view_params(tab)
+            key = (tab, tuple(sorted(params.items())), version)
+            if key not in self._done:
+                return key, names[tab], params
+        return None
+
+    @staticmethod
+    def _load(tab_name: str, params: dict):
+        """Загружает данные вкладки и её производные представления."""
+        try:
+            Get_Data.get_tab_data(tab_name, **params)
+            spec = readers.get_reader(tab_name)
+            if spec.special_groups:
+                Get_Data.get_tab_data(tab_name, sp_group=True)
+                Get_Data.get_tab_data(tab_name, sp_group=True, merge=True)
+        except Exception as e:
+            print(f"[CACHE] Предзагрузка {tab_name} не удалась: {e}")
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Индексированные запросы к разобранным данным вкладок.
+
+Для DataFrame из `PARSE_CACHE` (они не изменяются) индексы строятся один
+раз при первом запросе и хранятся, пока жив сам DataFrame:
+
+- хэш-индекс по одной или нескольким колонкам: значение → позиции строк
+  (выборка по cut_manager, менеджеру, спецгруппе, цвету);
+- сортированный индекс по числовой колонке: выборка диапазона через
+  `np.searchsorted` (например, все направления ниже требуемого процента).
+
+Запрос (`Query`) хранит позиции строк; условия пересекаются и
+объединяются как множества позиций, DataFrame собирается один раз
+в `frame()` с сохранением исходного порядка строк.
+"""
+
+import threading
+import weakref
+from typing import Dict, Hashable, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+
+# Строка итога по компании (во всех видах данных)
+COMPANY = 'Общее по компании'
+
+Columns = Union[str, Tuple[str, ...]]
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class FrameIndex:
+    """
+    Индексы одного DataFrame (строятся лениво, по колонкам).
+
+    Индекс не удерживает DataFrame в памяти (хранит слабую ссылку):
+    когда DataFrame вытесняется из кэша, вместе с ним удаляются и индексы.
+
+    Attributes
+    ----------
+    df : pd.DataFrame
+        Индексируемые данные; не должны изменяться.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = weakref.ref(df)
+        self._length = len(df)
+        self._hash: Dict[Columns, Dict[Hashable, np.ndarray]] = {}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._df()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def hash_index(self, columns: Columns) -> Dict[Hashable, np.ndarray]:
+        """Хэш-индекс: значение (кортеж для нескольких колонок) → позиции."""
+        with self._lock:
+            index = self._hash.get(columns)
+            if index is None:
+                keys = list(columns) if isinstance(columns, tuple) else columns
+                if self._length:
+                    index = self.df.groupby(keys, sort=False, dropna=False,
+                                            observed=True).indices
+                else:
+                    index = {}
+                self._hash[columns] = index
+            return index
+
+    def sorted_index(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Сортированный индекс: (значения по возрастанию, их позиции); без NaN."""
+        with self._lock:
+            index = self._sorted.get(column)
+            if index is None:
+                values = pd.to_numeric(self.df[column],
+                                       errors='coerce').to_numpy(float)
+                order = np.argsort(values, kind='stable')
+                order = order[~np.isnan(values[order])]
+                index = (values[order], order)
+                self._sorted[column] = index
+            return index
+
+    def positions(self, columns: Columns, value: Hashable) -> np.ndarray:
+        """Позиции строк с заданным значением колонки (колонок)."""
+        return self.hash_index(columns).get(value, _EMPTY)
+
+    def range_positions(self, column: str, low: Optional[float] = None,
+                        high: Optional[float] = None) -> np.ndarray:
+        """Позиции строк с low <= значение < high (границы необязательны)."""
+        values, order = self.sorted_index(column)
+        start = 0 if low is None else np.searchsorted(values, low, 'left')
+        stop = (len(values) if high is None
+                else np.searchsorted(values, high, 'left'))
+        return np.sort(order[start:stop])
+
+
+_INDEXES: Dict[int, Tuple[weakref.ref, FrameIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def index_for(df: pd.DataFrame) -> FrameIndex:
+    """Возвращает индексы DataFrame (общие для всех запросов к нему)."""
+    key = id(df)
+    with _INDEXES_LOCK:
+        entry = _INDEXES.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        index = FrameIndex(df)
+        _INDEXES[key] = (weakref.ref(df, _forget_callback(key)), index)
+        return index
+
+
+def _forget_callback(key: int):
+    """Удаляет индексы DataFrame, когда он собран сборщиком мусора."""
+    indexes = _INDEXES  # ссылка нужна и при завершении интерпретатора
+
+    def forget(ref):
+        entry = indexes.get(key)
+        if entry is not None and entry[0] is ref:
+            indexes.pop(key, None)
+    return forget
+
+
+class Query:
+    """
+    Выборка строк DataFrame по индексам.
+
+    Методы возвращают новый запрос, поэтому условия можно сцеплять:
+    `select(df).eq('cut_manager', name).frame()`.
+    """
+
+    def __init__(self, df: pd.DataFrame, index: FrameIndex,
+                 positions: Optional[np.ndarray] = None):
+        self.df = df  # удерживает DataFrame, пока жив запрос
+        self.index = index
+        self._positions = positions  # None — все строки
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Позиции выбранных строк по возрастанию."""
+        if self._positions is None:
+            return np.arange(len(self.df))
+        return self._positions
+
+    def _narrow(self, found: np.ndarray) -> 'Query':
+        if self._positions is None:
+            return Query(self.df, self.index, found)
+        return Query(self.df, self.index,
+                     np.intersect1d(self._positions, found,
+                                    assume_unique=True))
+
+    def eq(self, columns: Columns, *values: Hashable) -> 'Query':
+        """Строки, где колонка (кортеж колонок) равна одному из значений."""
+        found = [self.index.positions(columns, value) for value in values]
+        found = np.unique(np.concatenate(found)) if found else _EMPTY
+        return self._narrow(found)
+
+    def exclude(self, columns: Columns, *values: Hashable) -> 'Query':
+        """Строки, где колонка (кортеж колонок) не равна ни одному из значений."""
+        found = [self.index.positions(columns, value) for value in values]
+        if not found:
+            return self
+        return Query(self.df, self.index,
+                     np.setdiff1d(self.positions, np.concatenate(found)))
+
+    def between(self, column: str, low: Optional[float] = None,
+                high: Optional[float] = None) -> 'Query':
+        """Строки с low <= значение < high."""
+        return self._narrow(self.index.range_positions(column, low, high))
+
+    def below(self, column: str, value: float) -> 'Query':
+        """Строки со значением меньше `value`."""
+        return self.between(column, high=value)
+
+    def at_least(self, column: str, value: float) -> 'Query':
+        """Строки со значением не меньше `value`."""
+        return self.between(column, low=value)
+
+    def union(self, other: 'Query') -> 'Query':
+        """Строки, выбранные хотя бы одним из запросов."""
+        return Query(self.df, self.index,
+                     np.union1d(self.positions, other.positions))
+
+    def count(self) -> int:
+        return len(self.positions)
+
+    def frame(self) -> pd.DataFrame:
+        """Выбранные строки в исходном порядке (с attrs исходного DataFrame)."""
+        if self._positions is None:
+            return self.df
+        return self.df.iloc[self._positions]
+
+    def first(self) -> Optional[pd.Series]:
+        """Первая выбранная строка (или None)."""
+        positions = self.positions
+        return self.df.iloc[positions[0]] if len(positions) else None
+
+
+def select(df: pd.DataFrame) -> Query:
+    """Запрос ко всем строкам DataFrame."""
+    return Query(df, index_for(df))
+
+
+def by_cut_manager(df: pd.DataFrame, cut_manager: str,
+                   with_company: bool = True) -> Query:
+    """Строки менеджера (по `cut_manager`) и, по умолчанию, итог компании."""
+    query = select(df)
+    rows = query.eq('cut_manager', cut_manager)
+    return rows.union(query.eq('manager', COMPANY)) if with_company else rows
+
+
+def by_manager(df: pd.DataFrame, manager: str,
+               with_company: bool = True) -> Query:
+    """Строки менеджера (по колонке `manager`) и, по умолчанию, итог компании."""
+    return (select(df).eq('manager', manager, COMPANY) if with_company
+            else select(df).eq('manager', manager))
+
+
+def by_special_group(df: pd.DataFrame, special_group: str) -> Query:
+    """Строки спецгруппы."""
+    return select(df).eq('special_group', special_group)
+
+
+def by_color(df: pd.DataFrame, column: str, *colors: str) -> Query:
+    """Строки с заданным цветом (статусом) в колонке `column`."""
+    return select(df).eq(column, *colors)
+
+
+def below_target(df: pd.DataFrame, target_percent: float,
+                 column: str = 'money_percent',
+                 exclude: Sequence[str] = (COMPANY,)) -> Query:
+    """Строки с процентом ниже требуемого (без итоговых строк `exclude`)."""
+    return select(df).below(column, target_percent).exclude('manager',
+                                                            *exclude)
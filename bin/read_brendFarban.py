@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 from typing import Optional
+from bin import query, schema
 
 def read_files(
     file_path: str,
@@ -9,7 +11,19 @@ def read_files(
 ) -> pd.DataFrame:
     """
     Читает XML Brend_Farben.xml и возвращает DataFrame для отображения
-    на вкладке 'Бренд-менеджеры Farban'.
+    на вкладке 'Бренд-менеджеры Farban' (`read_frame` + `select_view`).
+    """
+    return select_view(read_frame(file_path), target_percent,
+                       filter_of_manager)
+
+
+def read_frame(file_path: str) -> pd.DataFrame:
+    """
+    Читает XML Brend_Farben.xml без учёта требуемого процента и фильтра.
+
+    Результат зависит только от содержимого файла, поэтому один на все
+    проценты и фильтры хранится в кэше и бинарной копии; цвета и фильтр
+    накладывает `select_view`.
 
     Структура колонок:
     - manager
@@ -20,18 +34,13 @@ def read_files(
     - group_plan_weight, group_fact_weight, group_percent_weight
     - color_cell (для основных продаж)
     - color_cell_weight (для веса)
-    """
-    try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-    except Exception as e:
-        print(f"[ERROR] Не удалось прочитать {file_path}: {e}")
-        return pd.DataFrame()
 
-    if filter_of_manager in ['Менеджер', 'Общее по компании']:
-        filter_of_manager = None
+    Файл читается потоково (iterparse): строки и итоги по компании
+    накапливаются по ходу разбора в колоночных буферах.
 
-    records = []
+    Показатели и проценты — float64 (`schema.BRAND_MANAGERS_FARBAN_SCHEMA`),
+    подписи колонок — в `df.attrs['header']`.
+    """
     row_head = {
         'manager': 'Менеджер',
         'manager_plan': 'План продаж, ₽',
@@ -51,108 +60,120 @@ def read_files(
         'color_cell_weight': 'yellow' # для веса
     }
 
-    for brand_manager in root.findall("Менеджер"):
-        name = brand_manager.attrib.get("Манагер", "Неизвестно")
-        plan = float(brand_manager.attrib.get("План", 0))
-        fact = float(brand_manager.attrib.get("Продажи", 0))
-        plan_weight = float(brand_manager.attrib.get("ПланВес", 0))
-        fact_weight = float(brand_manager.attrib.get("ПродажиВес", 0))
-
-        percent = (fact / plan * 100) if plan != 0 else 0.0
-        percent_weight = (fact_weight / plan_weight * 100) if plan_weight != 0 else 0.0
-
-        
-        # Строка менеджера (для обеих метрик)
-        records.append({
-            'manager': name,
-            'manager_plan': plan,
-            'manager_fact': fact,
-            'manager_percent': f'{round(percent, 1)} %',
-            'manager_plan_weight': plan_weight,
-            'manager_fact_weight': fact_weight,
-            'manager_percent_weight': f'{round(percent_weight, 1)} %',
-            'group': '',
-            'group_plan': 0.0,
-            'group_fact': 0.0,
-            'group_percent': 0.0,
-            'group_plan_weight': 0.0,
-            'group_fact_weight': 0.0,
-            'group_percent_weight': 0.0,
-            'color_cell': 'yellow',      # для продаж
-            'color_cell_weight': 'yellow' # для веса
-        })
-
-        # Группы товаров
-        for group_elem in brand_manager.findall("Группа"):
-            group_name = group_elem.attrib.get("ГруппаФарбен", "Неизвестно")
-            g_plan = float(group_elem.attrib.get("План", 0))
-            g_fact = float(group_elem.attrib.get("Продажи", 0))
-            g_plan_w = float(group_elem.attrib.get("ПланВес", 0))
-            g_fact_w = float(group_elem.attrib.get("ПродажиВес", 0))
-
-            g_percent = (g_fact / g_plan * 100) if g_plan != 0 else 0.0
-            g_percent_w = (g_fact_w / g_plan_w * 100) if g_plan_w != 0 else 0.0
-
-            color_sales = 'green' if g_percent >= target_percent else 'red'
-            color_weight = 'green' if g_percent_w >= target_percent else 'red'
-
-            records.append({
-                'manager': name,
-                'manager_plan': 0.0,
-                'manager_fact': 0.0,
-                'manager_percent': 0.0,
-                'manager_plan_weight': 0.0,
-                'manager_fact_weight': 0.0,
-                'manager_percent_weight': 0.0,
-                'group': group_name,
-                'group_plan': g_plan,
-                'group_fact': g_fact,
-                'group_percent': f'{round(g_percent, 1)} %',
-                'group_plan_weight': g_plan_w,
-                'group_fact_weight': g_fact_w,
-                'group_percent_weight': f'{round(g_percent_w, 1)} %',
-                'color_cell': color_sales,
-                'color_cell_weight': color_weight
-            })
-    
-    # "Считаем Общеепо компании"
-    df2 = pd.DataFrame(records).drop_duplicates(subset=['manager'])
-    total_plan = df2['manager_plan'].sum()
-    total_fact = df2['manager_fact'].sum()
+    # Колоночные буферы результата и итоги по компании,
+    # накапливаемые по ходу разбора
+    columns = {column: [] for column in row_head}
+    totals = [0.0, 0.0, 0.0, 0.0]  # план, факт, план (вес), факт (вес)
+    seen_managers = set()
+
+    def append_row(*values):
+        for column, value in zip(row_head, values):
+            columns[column].append(value)
+
+    try:
+        context = ET.iterparse(file_path, events=('start', 'end'))
+        _, root = next(context)
+        name = None
+        for event, elem in context:
+            if event == 'start' and elem.tag == "Менеджер":
+                attrib = elem.attrib
+                name = attrib.get("Манагер", "Неизвестно")
+                plan = float(attrib.get("План", 0))
+                fact = float(attrib.get("Продажи", 0))
+                plan_weight = float(attrib.get("ПланВес", 0))
+                fact_weight = float(attrib.get("ПродажиВес", 0))
+
+                # Менеджер с повторяющимся именем в итог не входит
+                if name not in seen_managers:
+                    seen_managers.add(name)
+                    totals[0] += plan
+                    totals[1] += fact
+                    totals[2] += plan_weight
+                    totals[3] += fact_weight
+
+                percent = (fact / plan * 100) if plan != 0 else 0.0
+                percent_weight = ((fact_weight / plan_weight * 100)
+                                  if plan_weight != 0 else 0.0)
+
+                # Строка менеджера (для обеих метрик)
+                append_row(name, plan, fact, round(percent, 1),
+                           plan_weight, fact_weight, round(percent_weight, 1),
+                           '', 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                           'yellow', 'yellow')
+
+            elif event == 'start' and elem.tag == "Группа":
+                # Группы товаров
+                attrib = elem.attrib
+                group_name = attrib.get("ГруппаФарбен", "Неизвестно")
+                g_plan = float(attrib.get("План", 0))
+                g_fact = float(attrib.get("Продажи", 0))
+                g_plan_w = float(attrib.get("ПланВес", 0))
+                g_fact_w = float(attrib.get("ПродажиВес", 0))
+
+                g_percent = (g_fact / g_plan * 100) if g_plan != 0 else 0.0
+                g_percent_w = ((g_fact_w / g_plan_w * 100)
+                               if g_plan_w != 0 else 0.0)
+
+                # Цвета зависят от требуемого процента (`select_view`)
+                append_row(name, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                           group_name, g_plan, g_fact, round(g_percent, 1),
+                           g_plan_w, g_fact_w, round(g_percent_w, 1),
+                           'green', 'green')
+
+            elif event == 'end' and elem.tag == "Менеджер":
+                # Разобранный менеджер больше не нужен
+                elem.clear()
+                root.clear()
+    except Exception as e:
+        print(f"[ERROR] Не удалось прочитать {file_path}: {e}")
+        return pd.DataFrame()
+
+    # "Общее по компании"
+    total_plan, total_fact, total_plan_weight, total_fact_weight = totals
     total_percent = round(
         (total_fact / total_plan * 100), 1) if total_plan != 0 else 0.0
-    
-    total_plan_weight = df2['manager_plan_weight'].sum()
-    total_fact_weight = df2['manager_fact_weight'].sum()
     total_percent_weight = round(
-                                 (total_fact_weight / total_plan_weight * 100),
-                                  1) if total_plan != 0 else 0.0
-    
-    records.append({
-                    'manager': 'Общее по компании',
-                    'manager_plan': total_plan,
-                    'manager_fact': total_fact,
-                    'manager_percent': f'{total_percent} %',
-                    'manager_plan_weight': total_plan_weight,
-                    'manager_fact_weight': total_fact_weight,
-                    'manager_percent_weight': f'{total_percent_weight} %',
-                    'group': '',
-                    'group_plan': '',
-                    'group_fact': '',
-                    'group_percent': '',
-                    'group_plan_weight': '',
-                    'group_fact_weight': '',
-                    'group_percent_weight': '',
-                    'color_cell': '',
-                    'color_cell_weight': color_weight
-    })
-    
-    
-    records.insert(0, row_head)
-    df = pd.DataFrame(records)
-    
+        (total_fact_weight / total_plan_weight * 100),
+        1) if total_plan_weight != 0 else 0.0
+
+    append_row('Общее по компании', total_plan, total_fact, total_percent,
+               total_plan_weight, total_fact_weight, total_percent_weight,
+               '', None, None, None, None, None, None,
+               'yellow', 'yellow')
+
+    df = pd.DataFrame(columns)
+
+    return schema.apply_schema(df, schema.BRAND_MANAGERS_FARBAN_SCHEMA,
+                               header=row_head)
+
+
+def select_view(df: pd.DataFrame, target_percent: float = 0,
+                filter_of_manager: Optional[str] = None) -> pd.DataFrame:
+    """
+    Раскрашивает данные `read_frame` по требуемому проценту и оставляет
+    строки выбранного менеджера (вместе с итогом по компании).
+
+    Исходный DataFrame не изменяется.
+    """
+    if 'manager' not in df.columns:
+        return df
+    if filter_of_manager in ['Менеджер', 'Общее по компании']:
+        filter_of_manager = None
     if filter_of_manager:
-        df = df[df['manager'].isin([filter_of_manager, 
-                                    'Менеджер', 'Общее по компании'])]
+        # Индексы общего DataFrame из кэша строятся один раз
+        rows = query.by_manager(df, filter_of_manager).frame()
+        df = schema.drop_unused_categories(rows.reset_index(drop=True))
+    else:
+        df = df.copy()
 
-    return df if not df.empty else pd.DataFrame()
\ No newline at end of file
+    target_percent = float(target_percent or 0)
+    # Цвет — только у строк групп; строки менеджеров и итог — жёлтые
+    groups = (df['group'].astype(str) != '').to_numpy()
+    for color_column, percent_column in (
+            ('color_cell', 'group_percent'),
+            ('color_cell_weight', 'group_percent_weight')):
+        colors = np.where(df[percent_column].to_numpy() >= target_percent,
+                          'green', 'red')
+        df[color_column] = pd.Categorical(
+            np.where(groups, colors, 'yellow'))
+    return df
@@ -5,10 +5,98 @@ Created on Sun Jun  9 23:33:39 2024
 @author: Professional
 """
 import os
+import numpy as np
 import pandas as pd
+from bin import schema
+from bin import query
+
+# Кодировка, определённая для каждой версии файла:
+# {(путь, размер, mtime_ns): кодировка}
+_ENCODINGS = {}
+# Размер фрагмента файла для определения кодировки
+_SAMPLE_SIZE = 64 * 1024
+# Пробелы-разделители разрядов (в т.ч. NBSP) убираем, запятую → точка
+_NUMBER_TABLE = str.maketrans({' ': None, '\xa0': None, '\u202f': None,
+                               ',': '.'})
+
+
+def detect_encoding(raw_data: bytes) -> str:
+    """
+    Определяет кодировку по начальному фрагменту файла.
+
+    Пробует utf-8, затем cp1251; latin1 — запасной вариант.
+    """
+    sample = raw_data[:_SAMPLE_SIZE]
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # Фрагмент мог оборвать многобайтовый символ на конце
+        if len(sample) == _SAMPLE_SIZE and e.start >= len(sample) - 3:
+            return 'utf-8'
+    try:
+        sample.decode('cp1251')
+        return 'cp1251'
+    except UnicodeDecodeError:
+        return 'latin1'
+
+
+def read_lines(file_path: str) -> list:
+    """
+    Читает файл и возвращает непустые строки с нормализованными пробелами.
+
+    Кодировка определяется по фрагменту один раз на версию файла
+    (новая выгрузка может прийти в другой кодировке).
+    """
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        raw_data = f.read()
+
+    version = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    encoding = _ENCODINGS.get(version) or detect_encoding(raw_data)
+    try:
+        content = raw_data.decode(encoding)
+    except UnicodeDecodeError:
+        encoding = 'cp1251' if encoding == 'utf-8' else 'latin1'
+        content = raw_data.decode(encoding, errors='replace')
+    if len(_ENCODINGS) > 64:
+        _ENCODINGS.clear()
+    _ENCODINGS[version] = encoding
+
+    # str.split() без аргументов режет по любым пробелам, включая NBSP
+    lines = (' '.join(line.split()) for line in content.splitlines())
+    return [line for line in lines if line]
+
+
+def to_numbers(values: list) -> np.ndarray:
+    """
+    Преобразует строки вида '25 815 713,13' в float64 одной операцией.
+
+    Нечисловые значения становятся 0.
+    """
+    if not values:
+        return np.zeros(0, dtype='float64')
+    series = pd.Series(values, dtype=object).str.translate(_NUMBER_TABLE)
+    return pd.to_numeric(series, errors='coerce').fillna(0.0).to_numpy(
+        dtype='float64')
+
+
+def _to_float(value) -> float:
+    """Возвращает число из float или строки в русском формате."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).translate(_NUMBER_TABLE))
+    except ValueError:
+        return 0.0
 
 
 def create_dataframe(data, filter_of_manager=None):
+    """
+    Собирает DataFrame вкладки "Бренд-менеджеры" (см.
+    `schema.BRAND_MANAGERS_SCHEMA`): показатели и проценты — float64,
+    подписи колонок — в `df.attrs['header']`.
+    """
     # Получаем общий целевой процент
     target_percent = float(data.get('По плану', 0))  # Например, 32%
     if filter_of_manager in ['Менеджер', 'Общее по компании']:
@@ -31,24 +119,15 @@ def create_dataframe(data, filter_of_manager=None):
         if manager == "По плану":
             continue
         
-        # Парсим общий план
-        try:
-            total_plan = float(manager_data['Общий план'].replace(
-                ' ', '').replace(',', '.'))
-        except:
-            total_plan = 0.0
+        # Общий план
+        total_plan = _to_float(manager_data.get('Общий план', 0))
 
         # Суммируем выполнение по группам
         total_fact = 0
         for group, group_data in manager_data.items():
             if group in ['Общий план', 'Общее выполнение']:
                 continue
-            try:
-                fact_val = float(group_data['Группа выполнение'].replace(
-                    ' ', '').replace(',', '.'))
-                total_fact += fact_val
-            except:
-                pass
+            total_fact += _to_float(group_data['Группа выполнение'])
 
         # Общий процент выполнения
         total_percent = round(
@@ -59,17 +138,8 @@ def create_dataframe(data, filter_of_manager=None):
             if group in ['Общий план', 'Общее выполнение']:
                 continue
 
-            try:
-                group_plan = float(group_data['Группа план'].replace(
-                    ' ', '').replace(',', '.'))
-            except:
-                group_plan = 0.0
-
-            try:
-                group_fact = float(group_data['Группа выполнение'].replace(
-                    ' ', '').replace(',', '.'))
-            except:
-                group_fact = 0.0
+            group_plan = _to_float(group_data['Группа план'])
+            group_fact = _to_float(group_data['Группа выполнение'])
 
             group_percent = round(
                 (group_fact / group_plan * 100), 1) if group_plan != 0 else 0
@@ -87,11 +157,11 @@ def create_dataframe(data, filter_of_manager=None):
                 'manager': manager,
                 'manager_plan': total_plan,
                 'manager_realization': total_fact,
-                'manager_percent': f'{total_percent} %',
+                'manager_percent': total_percent,
                 'group': group,
                 'group_plan': group_plan,
                 'group_realization': group_fact,
-                'group_percent': f'{group_percent} %',
+                'group_percent': group_percent,
                 'color_cell': color  # Добавляем колонку с цветом
             }
             rows.append(row)
@@ -119,77 +189,129 @@ def create_dataframe(data, filter_of_manager=None):
         'manager': 'Общее по компании',
         'manager_plan': total_plan,
         'manager_realization': total_fact,
-        'manager_percent': f'{total_percent} %',
+        'manager_percent': total_percent,
         'group': '',
-        'group_plan': '',
-        'group_realization': '',
-        'group_percent': '',
+        'group_plan': None,
+        'group_realization': None,
+        'group_percent': None,
         'color_cell': color
     })
-    rows.insert(0, row_head)
-    df = pd.DataFrame(rows)
-    df.to_excel('df.xlsx')
+    df = pd.DataFrame(rows, columns=list(row_head))
     if filter_of_manager:
-        df = df[df['manager'].isin([filter_of_manager, 
-                                    'Менеджер', 'Общее по компании'])]
+        df = df[df['manager'].isin([filter_of_manager, query.COMPANY])]
 
-    return df if not df.empty else pd.DataFrame()
+    return schema.apply_schema(df.reset_index(drop=True),
+                               schema.BRAND_MANAGERS_SCHEMA,
+                               header=row_head)
 
-def read_files(file, target_percent=0, filter_of_manager=None):
-    # # Получаем общий целевой процент
-    _file = file
-    dct = {'По плану': target_percent}
+def parse_lines(lines: list, target_percent=0) -> dict:
+    """
+    Разбирает строки файла бренд-менеджеров за один проход.
 
-    try:
-        with open(_file, 'rb') as f:
-            raw_data = f.read()
-
-        # Пробуем разные кодировки
-        try:
-            content = raw_data.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                content = raw_data.decode('cp1251')
-            except UnicodeDecodeError:
-                content = raw_data.decode('latin1')  # fallback
-
-        # Заменяем непечатаемые символы и разбиваем по строкам
-        import re
-        lines = re.split(r'[\r\n]+', content.strip())
-        lines = [re.sub(r'[^\S\n]+', ' ', line.strip()) for line in lines]
-        lines = [line for line in lines if line]
+    Числа собираются в общий буфер и преобразуются одной операцией
+    (`to_numbers`), в результат попадают уже float.
 
-    except Exception as e:
-        print('[read_brendOP][read_files] Ошибка чтения файла:', e)
-        # Возвращаем пустой DataFrame с нужными колонками
-        return pd.DataFrame([{"Ошибка": "Не удалось прочитать файл"}])
+    Returns
+    -------
+    dict
+        {'По плану': target_percent,
+         менеджер: {'Общий план': float, 'Общее выполнение': float,
+                    группа: {'Группа план': float,
+                             'Группа выполнение': float}}}
+    """
+    # Числа в виде строк и ссылки (словарь, ключ, позиция в буфере)
+    numbers = []
+    targets = []
+    dct = {'По плану': target_percent}
+    manager = None
+
+    def add_number(container, key, index):
+        value = lines[index] if index < len(lines) else '0'
+        targets.append((container, key, len(numbers)))
+        numbers.append(value)
 
     i = 0
-    while i < len(lines):
+    count = len(lines)
+    while i < count:
         line = lines[i]
-        if line == 'Менеджер' and i + 1 < len(lines):
+        if line == 'Менеджер' and i + 1 < count:
             manager = lines[i+1]
-            dct[manager] = {
-                'Общий план': lines[i+2] if i+2 < len(lines) else '0',
-                'Общее выполнение': lines[i+3] if i+3 < len(lines) else '0'
-            }
+            dct[manager] = {}
+            add_number(dct[manager], 'Общий план', i + 2)
+            add_number(dct[manager], 'Общее выполнение', i + 3)
             i += 4
-        elif line.lower().startswith('группа') and i + 3 < len(lines):
+        elif line[:6].lower() == 'группа' and i + 3 < count:
             group_name = lines[i+1]
-            group_plan = lines[i+2]
-            group_fact = lines[i+3]
             if manager not in dct:
                 manager = "Unknown"
                 dct[manager] = {}
-            dct[manager][group_name] = {
-                'Группа план': group_plan,
-                'Группа выполнение': group_fact
-            }
+            group = dct[manager][group_name] = {}
+            add_number(group, 'Группа план', i + 2)
+            add_number(group, 'Группа выполнение', i + 3)
             i += 4
         else:
             i += 1
 
-    return create_dataframe(dct, filter_of_manager=filter_of_manager)
+    values = to_numbers(numbers)
+    for container, key, index in targets:
+        container[key] = float(values[index])
+    return dct
+
+
+def read_frame(file):
+    """
+    Читает файл бренд-менеджеров без учёта требуемого процента и фильтра.
+
+    Результат зависит только от содержимого файла, поэтому один на все
+    проценты и фильтры хранится в кэше и бинарной копии; цвета и фильтр
+    накладывает `select_view`.
+    """
+    try:
+        lines = read_lines(file)
+    except Exception as e:
+        print('[read_brendOP][read_files] Ошибка чтения файла:', e)
+        # Возвращаем пустой DataFrame с нужными колонками
+        return pd.DataFrame([{"Ошибка": "Не удалось прочитать файл"}])
+
+    return create_dataframe(parse_lines(lines))
+
+
+def select_view(df, target_percent=0, filter_of_manager=None):
+    """
+    Раскрашивает данные `read_frame` по требуемому проценту и оставляет
+    строки выбранного менеджера (вместе с итогом по компании).
+
+    Исходный DataFrame не изменяется.
+    """
+    if 'manager' not in df.columns:
+        return df
+    if filter_of_manager in ['Менеджер', 'Общее по компании']:
+        filter_of_manager = None
+    if filter_of_manager:
+        # Индексы общего DataFrame из кэша строятся один раз
+        rows = query.by_manager(df, filter_of_manager).frame()
+        df = schema.drop_unused_categories(rows.reset_index(drop=True))
+    else:
+        df = df.copy()
+
+    target_percent = float(target_percent or 0)
+    # Строки групп — по проценту группы, итог по компании — по своему
+    percent = df['group_percent'].fillna(df['manager_percent']).to_numpy()
+    if target_percent == 0:
+        colors = np.full(len(df), 'gray', dtype=object)  # План не задан
+    else:
+        colors = np.where(percent >= target_percent, 'green', 'red')
+    df['by_plan'] = target_percent
+    df['color_cell'] = pd.Categorical(colors)
+    return df
+
+
+def read_files(file, target_percent=0, filter_of_manager=None):
+    """
+    Читает файл бренд-менеджеров (Brend_26BK.txt / BrendOX.txt)
+    и возвращает DataFrame для вкладки.
+    """
+    return select_view(read_frame(file), target_percent, filter_of_manager)
 
 
 if __name__ == '__main__':
@@ -16,11 +16,18 @@ Created on Sun Aug  3 22:18:05 2025
 
 
 # Настройка часового пояса GMT+7
+import os
+import threading
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 from datetime import datetime, date
 import pytz
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
+from bin import schema
+from bin.parse_cache import PARSE_CACHE, estimate_size
+from bin.app_state import TARGET_PERCENT
+from bin.sidecar import SIDECAR_STORE, call_tag
 TIMEZONE = pytz.timezone("Asia/Krasnoyarsk")
 
 
@@ -105,10 +112,219 @@ def name_format(name: str) -> tuple:
     return normal_manager, cut_manager
 
 
+class ManagerIndex:
+    """
+    Индекс менеджеров файла: сырое имя из 1С → целочисленный ID.
+
+    `name_format` вызывается один раз на уникальное сырое имя; одно и то же
+    имя из <Итоги> и из каждой <СпецГруппа> получает один ID. Сокращённые
+    имена (cut_manager) тоже получают свои ID, поэтому фильтрация и
+    группировка идут по целым числам.
+
+    Attributes
+    ----------
+    raw_names, normal_names, cut_names : list
+        Сырое, полное и сокращённое имя по ID менеджера.
+    cut_ids : list
+        ID сокращённого имени по ID менеджера.
+    cut_values : list
+        Сокращённые имена по ID сокращённого имени.
+    """
+
+    def __init__(self, raw_names: Iterable[str] = ()):
+        self._ids = {}
+        self._cut_index = {}
+        self.raw_names = []
+        self.normal_names = []
+        self.cut_names = []
+        self.cut_ids = []
+        self.cut_values = []
+        for raw_name in raw_names:
+            self.intern(raw_name)
+
+    def __len__(self) -> int:
+        return len(self.raw_names)
+
+    def intern(self, raw_name: str) -> int:
+        """Возвращает ID сырого имени, добавляя его при первой встрече."""
+        manager_id = self._ids.get(raw_name)
+        if manager_id is None:
+            normal_manager, cut_manager = name_format(raw_name)
+            manager_id = self._ids[raw_name] = len(self.raw_names)
+            self.raw_names.append(raw_name)
+            self.normal_names.append(normal_manager)
+            self.cut_names.append(cut_manager)
+            self.cut_ids.append(self.intern_cut(cut_manager))
+        return manager_id
+
+    def intern_cut(self, cut_manager: str) -> int:
+        """Возвращает ID сокращённого имени, добавляя его при первой встрече."""
+        cut_id = self._cut_index.get(cut_manager)
+        if cut_id is None:
+            cut_id = self._cut_index[cut_manager] = len(self.cut_values)
+            self.cut_values.append(cut_manager)
+        return cut_id
+
+    def intern_many(self, raw_names: Iterable[str]) -> np.ndarray:
+        """Возвращает массив ID для последовательности сырых имён."""
+        return np.fromiter((self.intern(name) for name in raw_names),
+                           dtype=np.int64)
+
+    def cut_id_of(self, cut_manager: str) -> int:
+        """ID сокращённого имени или -1, если такого нет."""
+        return self._cut_index.get(cut_manager, -1)
+
+    def normal(self, ids) -> np.ndarray:
+        """Полные имена по массиву ID менеджеров."""
+        return np.asarray(self.normal_names, dtype=object)[ids]
+
+    def cut(self, ids) -> np.ndarray:
+        """Сокращённые имена по массиву ID менеджеров."""
+        return np.asarray(self.cut_names, dtype=object)[ids]
+
+    def cut_codes(self, ids) -> np.ndarray:
+        """ID сокращённых имён по массиву ID менеджеров."""
+        return np.asarray(self.cut_ids, dtype=np.int64)[ids]
+
+
+# Атрибуты <Направление> внутри <Итоги> → колонки буфера направлений
+DIRECTION_ATTRS = {
+    'money_plan': 'тПланДеньги',
+    'money_fact': 'тДеньги',
+    'margin_plan': 'тПланМаржа',
+    'margin_fact': 'тМаржа',
+    'realization_plan': 'тПланПродажи',
+    'realization_fact': 'тПродажи',
+}
+
+
+def read_plan_columns(file_path: str) -> Dict[str, Any]:
+    """
+    Потоково (iterparse) читает XML плана продаж за один проход.
+
+    Элементы очищаются сразу после обработки, поэтому расход памяти
+    не зависит от количества <Направление> в файле. Данные складываются
+    в колоночные буферы (списки одинаковой длины).
+
+    Parameters
+    ----------
+    file_path : str
+        Путь к XML-файлу.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Словарь с ключами:
+        - 'plan_percent': str | None — атрибут «Проц» корневого элемента.
+        - 'totals': dict | None — атрибуты <Итоги>
+                    (ИтогПланПродажи, ИтогПродажи).
+        - 'directions': dict[str, list] — колонки 'name' и DIRECTION_ATTRS.
+        - 'special_groups': dict[str, list] — колонки 'group', 'name',
+                            'plan', 'fact'.
+        - 'group_names': list[str] — все объявленные <СпецГруппа>
+                         в порядке файла (в том числе без направлений).
+    """
+    directions = {'name': []}
+    directions.update({column: [] for column in DIRECTION_ATTRS})
+    special_groups = {'group': [], 'name': [], 'plan': [], 'fact': []}
+    group_names = []
+    totals = None
+    section = None
+    group_name = None
+    parent = None
+
+    context = ET.iterparse(file_path, events=('start', 'end'))
+    _, root = next(context)
+    plan_percent = root.attrib.get("Проц")
+
+    for event, elem in context:
+        tag = elem.tag
+        if event == 'start':
+            if tag == "Итоги":
+                section, parent = tag, elem
+                totals = dict(elem.attrib)
+            elif tag == "СпецГруппа":
+                section, parent = tag, elem
+                group_name = elem.attrib["Наименование"]
+                group_names.append(group_name)
+            continue
+
+        if tag == "Направление":
+            attrib = elem.attrib
+            if section == "Итоги":
+                directions['name'].append(attrib["Наименование"])
+                for column, attr_name in DIRECTION_ATTRS.items():
+                    directions[column].append(float(attrib[attr_name]))
+            elif section == "СпецГруппа":
+                special_groups['group'].append(group_name)
+                special_groups['name'].append(attrib["Наименование"])
+                special_groups['plan'].append(float(attrib["тПланПродажи"]))
+                special_groups['fact'].append(float(attrib["тПродажи"]))
+            # Обработанные направления больше не нужны
+            if parent is not None:
+                parent.clear()
+        elif tag in ("Итоги", "СпецГруппа"):
+            section, parent = None, None
+            root.clear()
+
+    return {
+        'plan_percent': plan_percent,
+        'totals': totals,
+        'directions': directions,
+        'special_groups': special_groups,
+        'group_names': group_names,
+    }
+
+
+# Тег бинарных копий `load_plan_columns` (формат `sidecar.call_tag`,
+# иначе копии прежних версий файла не распознаются и не удаляются)
+PLAN_COLUMNS_TAG = call_tag('read_file_manager', 'load_plan_columns')
+
+
+def load_plan_columns(file_path: str) -> Dict[str, Any]:
+    """
+    Возвращает колонки `read_plan_columns` из бинарной копии текущей
+    версии файла (см. `sidecar.SIDECAR_STORE`), разбирая XML только
+    при её отсутствии.
+
+    Колонки направлений и спецгрупп возвращаются DataFrame — при чтении
+    копии они собираются прямо из отображённой в память таблицы Arrow,
+    без промежуточных списков.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Ключи как у `read_plan_columns`; 'directions' и 'special_groups' —
+        pd.DataFrame.
+    """
+    def build():
+        columns = read_plan_columns(file_path)
+        frames = {'directions': pd.DataFrame(columns['directions']),
+                  'special_groups': pd.DataFrame(columns['special_groups'])}
+        meta = {'plan_percent': columns['plan_percent'],
+                'totals': columns['totals'],
+                'group_names': columns['group_names']}
+        return frames, meta
+
+    frames, meta = SIDECAR_STORE.load_or_build(file_path, PLAN_COLUMNS_TAG,
+                                               build)
+    return {
+        'plan_percent': meta['plan_percent'],
+        'totals': meta['totals'],
+        'directions': frames['directions'],
+        'special_groups': frames['special_groups'],
+        'group_names': meta['group_names'],
+    }
+
+
 def parse_xml_to_dict(file_path: str) -> Dict[str, Any]:
     """
     Парсит XML-файл с планом продаж и возвращает словарь с данными.
 
+    Файл читается за один проход функцией `read_plan_columns` (или берётся
+    из бинарной копии, см. `load_plan_columns`), после чего строки
+    собираются из колоночных буферов.
+
     Parameters
     ----------
     file_path : str
@@ -119,24 +335,32 @@ def parse_xml_to_dict(file_path: str) -> Dict[str, Any]:
     Dict[str, Any]
     Словарь с ключами:
     - 'company': dict с общими показателями (plan, fact, percent).
+    - 'header': dict — подписи колонок (в данные не входит).
     - 'managers': list[dict] — данные по менеджерам.
-    - 'special_groups': dict — ключи — названия спецгрупп,
-                        значения — списки записей.
+    - 'special_groups': dict — ключи — названия всех объявленных
+                        спецгрупп, значения — списки записей (пустой
+                        список для спецгруппы без направлений).
+    - 'columns': dict — исходные колонки (`load_plan_columns`).
+    - 'manager_index': ManagerIndex — ID менеджеров файла.
+    - 'direction_ids': np.ndarray — ID менеджера для каждой строки
+                       'managers' (без строки "Общее по компании").
     """
-    tree = ET.parse(file_path)
-    root = tree.getroot()
+    columns = load_plan_columns(file_path)
+    if columns['totals'] is None:
+        raise ValueError(f"В файле {file_path} нет элемента <Итоги>")
+
     colors = {'yellow': 'yellow', 'green': 'green', 'red': 'red'}
     def func(a, b, c): return ['green', 'red'][a < b] if c else 'yellow'
     
     if 'Plan_26BK' in file_path:
         # Общие данные по компании
-        total_plan_percent = float(root.attrib.get("Проц", "0"))
+        total_plan_percent = float(columns['plan_percent'] or "0")
     else:
         total_plan_percent = read_plan()
 
 
-    realization_plan = float(root.find("Итоги").attrib["ИтогПланПродажи"])
-    realization_fact = float(root.find("Итоги").attrib["ИтогПродажи"])
+    realization_plan = float(columns['totals']["ИтогПланПродажи"])
+    realization_fact = float(columns['totals']["ИтогПродажи"])
     realization_percent = calculate_percentage(
         realization_plan, realization_fact)
     realization_color = colors[func(realization_percent,
@@ -182,21 +406,29 @@ def parse_xml_to_dict(file_path: str) -> Dict[str, Any]:
     
     ###########################################################################
     managers_data = []
-    special_groups = {}
-    managers_data.append(company_head)
-    # Извлечение данных по менеджерам из < Итоги > <Направление >
-    for direction in root.find("Итоги"):
-        normal_manager, cut_manager = name_format(
-            direction.attrib["Наименование"])
-
-        money_plan = float(direction.attrib["тПланДеньги"])
-        money_fact = float(direction.attrib["тДеньги"])
+    # Спецгруппы без направлений тоже попадают в словарь (пустым списком)
+    special_groups = {group_name: []
+                      for group_name in columns['group_names']}
+    # Один и тот же менеджер встречается в <Итоги> и в каждой <СпецГруппа>:
+    # имена приводятся к виду один раз, дальше используются ID
+    index = ManagerIndex()
+    # Данные по менеджерам из < Итоги > <Направление >
+    directions = columns['directions']
+    direction_ids = index.intern_many(directions['name'])
+    for i, row in enumerate(directions[list(DIRECTION_ATTRS)].itertuples(
+            index=False)):
+        manager_id = direction_ids[i]
+        normal_manager = index.normal_names[manager_id]
+        cut_manager = index.cut_names[manager_id]
+
+        money_plan = row.money_plan
+        money_fact = row.money_fact
         money_percent = calculate_percentage(money_plan, money_fact)
-        margin_plan = float(direction.attrib["тПланМаржа"])
-        margin_fact = float(direction.attrib["тМаржа"])
+        margin_plan = row.margin_plan
+        margin_fact = row.margin_fact
         margin_percent = calculate_percentage(margin_plan, margin_fact)
-        realization_plan = float(direction.attrib["тПланПродажи"])
-        realization_fact = float(direction.attrib["тПродажи"])
+        realization_plan = row.realization_plan
+        realization_fact = row.realization_fact
         realization_percent = calculate_percentage(
             realization_plan, realization_fact)
 
@@ -229,23 +461,22 @@ def parse_xml_to_dict(file_path: str) -> Dict[str, Any]:
         margin_fact_total += margin_fact
 
     ###########################################################################
-    # Извлечение данных по спецгруппам
-    for sgroup in root.findall("СпецГруппа"):
-        group_name = sgroup.attrib["Наименование"]
-        special_groups[group_name] = []
-
-        for direction in sgroup:
-            normal_manager, cut_manager = name_format(
-                direction.attrib["Наименование"])
-
-            group_data = {
-                "manager": normal_manager,
-                "cut_manager": cut_manager,
-                "special_group": group_name,
-                "special_group_plan": float(direction.attrib["тПланПродажи"]),
-                "special_group_fact": float(direction.attrib["тПродажи"]),
-            }
-            special_groups[group_name].append(group_data)
+    # Данные по спецгруппам
+    sp_columns = columns['special_groups']
+    sp_ids = index.intern_many(sp_columns['name'])
+    for group_name, manager_id, plan, fact in zip(sp_columns['group'],
+                                                  sp_ids,
+                                                  sp_columns['plan'],
+                                                  sp_columns['fact']):
+        group_data = {
+            "manager_id": int(manager_id),
+            "manager": index.normal_names[manager_id],
+            "cut_manager": index.cut_names[manager_id],
+            "special_group": group_name,
+            "special_group_plan": plan,
+            "special_group_fact": fact,
+        }
+        special_groups.setdefault(group_name, []).append(group_data)
 
     ###########################################################################
     # Завершаем подведение итогов по компании
@@ -265,16 +496,122 @@ def parse_xml_to_dict(file_path: str) -> Dict[str, Any]:
                                                  total_plan_percent, True)]
     managers_data.append(company_totals)
     ###########################################################################
+    # Итоги по сокращённым именам менеджеров (для фильтра по менеджеру)
+    rollups, rollup_managers, cut_rows = build_rollups(
+        directions, direction_ids, index, total_plan_percent)
 
     return {
         "company": company_totals,
+        "header": company_head,
         "managers": managers_data,
         "special_groups": special_groups,
-        'total_plan_percent': total_plan_percent
+        'total_plan_percent': total_plan_percent,
+        'columns': columns,
+        'manager_index': index,
+        'direction_ids': direction_ids,
+        'rollups': rollups,
+        'rollup_managers': rollup_managers,
+        'cut_rows': cut_rows,
     }
 
 
-def parse_sp_group_to_df(data: dict, total_plan, merge=False) -> pd.DataFrame:
+# Колонки DataFrame спецгрупп
+SP_GROUP_COLUMNS = [
+    'manager', 'cut_manager', 'special_group',
+    'special_group_plan', 'special_group_fact',
+    'special_group_percent', 'special_group_color'
+]
+
+
+def percentage_array(plan, fact) -> np.ndarray:
+    """
+    Векторный аналог `calculate_percentage`: процент fact от plan.
+
+    Там, где plan равен нулю, возвращает 0.
+    """
+    plan = np.asarray(plan, dtype='float64')
+    fact = np.asarray(fact, dtype='float64')
+    ratio = np.divide(fact, plan, out=np.zeros_like(plan), where=plan != 0)
+    return ratio * 100
+
+
+# Суммируемые показатели направлений (проценты и цвета считаются по ним)
+ROLLUP_METRICS = ('money', 'margin', 'realization')
+
+
+def build_rollups(directions: Dict[str, list], direction_ids: np.ndarray,
+                  index: ManagerIndex, total_plan: float):
+    """
+    Считает строки "Итого по менеджеру" для всех сокращённых имён сразу.
+
+    Суммы по cut_manager — np.bincount по ID сокращённых имён, проценты
+    и цвета — векторно. Заодно запоминаются номера строк направлений
+    каждого сокращённого имени, так что фильтр по менеджеру — это поиск
+    в словаре.
+
+    Parameters
+    ----------
+    directions : pd.DataFrame
+        Колонки направлений (`load_plan_columns`).
+    direction_ids : np.ndarray
+        ID менеджера для каждого направления.
+    index : ManagerIndex
+        Индекс менеджеров файла.
+    total_plan : float
+        Требуемый процент выполнения (для цветов).
+
+    Returns
+    -------
+    tuple
+        ({cut_manager: строка итога},
+         {cut_manager: число разных менеджеров},
+         {cut_manager: номера строк направлений}).
+    """
+    if not len(direction_ids):
+        return {}, {}, {}
+    cut_codes = index.cut_codes(direction_ids)
+    n_cuts = len(index.cut_values)
+    # Число разных менеджеров (полных имён) на сокращённое имя
+    _, normal_codes = np.unique(index.normal(direction_ids).astype(str),
+                                return_inverse=True)
+    pairs = np.unique(np.stack([cut_codes, normal_codes.ravel()]), axis=1)
+    managers_count = np.bincount(pairs[0], minlength=n_cuts)
+
+    columns = {}
+    for metric in ROLLUP_METRICS:
+        plan = np.bincount(cut_codes, weights=directions[f'{metric}_plan'],
+                           minlength=n_cuts)
+        fact = np.bincount(cut_codes, weights=directions[f'{metric}_fact'],
+                           minlength=n_cuts)
+        percent = percentage_array(plan, fact)
+        columns[f'{metric}_plan'] = plan.tolist()
+        columns[f'{metric}_fact'] = fact.tolist()
+        columns[f'{metric}_percent'] = percent.tolist()
+        columns[f'{metric}_color'] = np.where(percent >= total_plan,
+                                              'green', 'red').tolist()
+
+    # Номера строк по сокращённому имени (в исходном порядке)
+    order = np.argsort(cut_codes, kind='stable')
+    cut_ids, starts = np.unique(cut_codes[order], return_index=True)
+    row_groups = np.split(order, starts[1:])
+
+    rollups, rollup_managers, cut_rows = {}, {}, {}
+    for cut_id, rows in zip(cut_ids.tolist(), row_groups):
+        cut_manager = index.cut_values[cut_id]
+        totals = {'manager': 'Итого по менеджеру',
+                  'cut_manager': cut_manager}
+        for metric in ROLLUP_METRICS:
+            for part in ('plan', 'fact', 'percent', 'color'):
+                column = f'{metric}_{part}'
+                totals[column] = columns[column][cut_id]
+        rollups[cut_manager] = totals
+        rollup_managers[cut_manager] = int(managers_count[cut_id])
+        cut_rows[cut_manager] = rows.tolist()
+    return rollups, rollup_managers, cut_rows
+
+
+def parse_sp_group_to_df(data: dict, total_plan, merge=False,
+                         index: Optional[ManagerIndex] = None) -> pd.DataFrame:
     """
     Преобразует вложенный словарь с данными по спецгруппам в плоский DataFrame.
 
@@ -284,6 +621,13 @@ def parse_sp_group_to_df(data: dict, total_plan, merge=False) -> pd.DataFrame:
                  'special_group', 'special_group_plan', 'special_group_fact',
                  'special_group_percent', 'special_group_color']
 
+    Проценты, цвета и итоги считаются векторно по целочисленным ключам
+    (ID менеджера, ID сокращённого имени, номер спецгруппы) через
+    np.bincount; имена подставляются только в результат.
+
+    Строка "Общее по компании" есть у каждой объявленной спецгруппы —
+    у спецгруппы без направлений она нулевая.
+
     Parameters
     ----------
     data : Dict[str, List[Dict[str, Any]]]
@@ -294,6 +638,9 @@ def parse_sp_group_to_df(data: dict, total_plan, merge=False) -> pd.DataFrame:
     merge : bool, optional
         Если True, данные группируются по 'cut_manager' и суммируются.
         По умолчанию False.
+    index : ManagerIndex, optional
+        Индекс менеджеров файла (записи содержат 'manager_id').
+        Если не задан, имена из записей приводятся к виду заново.
 
     Returns
     -------
@@ -302,121 +649,263 @@ def parse_sp_group_to_df(data: dict, total_plan, merge=False) -> pd.DataFrame:
         При merge=True — агрегированные данные.
 
     """
-    records = []
-    company_head = {'manager': 'Менеджер',}
-        
-    
-    for group_name, group_data in data.items():
-        for record in group_data:
-            normal_manager, cut_manager = name_format(
-                record.get('manager', ''))
-
-            plan = record.get('special_group_plan')
-            fact = record.get('special_group_fact')
-            percent = calculate_percentage(plan, fact)
-            if plan:
-                color = 'red' if percent < total_plan else 'green'
-            else:
-                color = 'yellow'
-            
-            
-            row = {
-                'manager': normal_manager,
-                'cut_manager': cut_manager,
-                'special_group': group_name,
-                'special_group_plan': plan,
-                'special_group_fact': fact,
-                'special_group_percent': percent,
-                'special_group_color': color
-            }
-            records.append(row)
-            
-    
-
-    df = pd.DataFrame(records)
-    
-    company_rows = []
-    for group_name in df['special_group'].dropna().unique():
-        if pd.isna(group_name):
-            continue
-        group_data = df[df['special_group'] == group_name]
-        plan = group_data['special_group_plan'].sum()
-        fact = group_data['special_group_fact'].sum()
-        percent = calculate_percentage(plan, fact)
-        color = 'green' if percent >= total_plan else 'red' if plan != 0 else 'yellow'
-        company_rows.append({
-            'manager': 'Общее по компании',
-            'cut_manager': 'Общее по компании',
-            'special_group': group_name,
-            'special_group_plan': plan,
-            'special_group_fact': fact,
-            'special_group_percent': percent,
-            'special_group_color': color
-        })
-        
-    # Добавляем итоги в конец
-    if company_rows:
-        company_df = pd.DataFrame(company_rows)
-        df = pd.concat([df, company_df], ignore_index=True)  
-        
-    
-    # === УДАЛЯЕМ ЛИШНИЕ КОЛОНКИ (если они случайно попали) ===
-    expected_columns = [
-        'manager', 'cut_manager', 'special_group',
-        'special_group_plan', 'special_group_fact',
-        'special_group_percent', 'special_group_color'
-    ]
-    df = df[expected_columns]
-    
-   
-    if merge:
-        if df.empty:
-            return pd.DataFrame(columns=expected_columns)
-
-        grouped = df.groupby(['cut_manager',
-                              'special_group'], as_index=False).agg({
-                                  'special_group_plan': 'sum',
-                                  'special_group_fact': 'sum'
-                              })
-        # Рассчитываем процент выполнения
-        grouped["special_group_percent"] = grouped.apply(
-            lambda row: calculate_percentage(row["special_group_plan"],
-                                             row["special_group_fact"])
-            if row["special_group_plan"] != 0 else 0.0, axis=1)
-
-        
+    records = [record for group_data in data.values() for record in group_data]
+    if not data:
+        return schema.apply_schema(pd.DataFrame(columns=SP_GROUP_COLUMNS),
+                                   schema.SPECIAL_GROUPS_SCHEMA)
+
+    group_names = np.asarray(list(data.keys()), dtype=object)
+    group_sizes = np.array([len(v) for v in data.values()])
+    group_ids = np.repeat(np.arange(len(group_names)), group_sizes)
+
+    if index is None:
+        index = ManagerIndex()
+        manager_ids = index.intern_many(record.get('manager') or ''
+                                        for record in records)
+    else:
+        manager_ids = np.fromiter((record['manager_id'] for record in records),
+                                  dtype=np.int64, count=len(records))
+    plan = np.fromiter((record['special_group_plan'] for record in records),
+                       dtype='float64', count=len(records))
+    fact = np.fromiter((record['special_group_fact'] for record in records),
+                       dtype='float64', count=len(records))
+
+    percent = percentage_array(plan, fact)
+    df = pd.DataFrame({
+        'manager': index.normal(manager_ids),
+        'cut_manager': index.cut(manager_ids),
+        'special_group': group_names[group_ids],
+        'special_group_plan': plan,
+        'special_group_fact': fact,
+        'special_group_percent': percent,
+        'special_group_color': np.select([plan == 0, percent < total_plan],
+                                         ['yellow', 'red'], default='green'),
+    })
+
+    # Итоги по компании для каждой спецгруппы (в порядке объявления),
+    # в том числе нулевые — для спецгрупп без направлений
+    company_plan = np.bincount(group_ids, weights=plan,
+                               minlength=len(group_names))
+    company_fact = np.bincount(group_ids, weights=fact,
+                               minlength=len(group_names))
+    company_percent = percentage_array(company_plan, company_fact)
+    company = pd.DataFrame({
+        'manager': 'Общее по компании',
+        'cut_manager': 'Общее по компании',
+        'special_group': group_names,
+        'special_group_plan': company_plan,
+        'special_group_fact': company_fact,
+        'special_group_percent': company_percent,
+        # Порядок проверок прежний: сначала выполнение плана, потом нулевой
+        # план. При нулевом плане прежний процент был inf (есть факт —
+        # 'green' при любом требуемом проценте) или NaN ('yellow')
+        'special_group_color': np.select(
+            [(company_plan == 0) & (company_fact > 0), company_plan == 0,
+             company_percent >= total_plan],
+            ['green', 'yellow', 'green'], default='red'),
+    })
+
+    if not merge:
+        # Добавляем итоги в конец
+        df = pd.concat([df, company], ignore_index=True)
+        return schema.apply_schema(df, schema.SPECIAL_GROUPS_SCHEMA)
+
+    # Объединение по cut_manager: ключ — (ранг сокращённого имени,
+    # ранг спецгруппы), ранги дают тот же порядок, что сортировка по именам
+    cut_values = np.asarray(index.cut_values + ['Общее по компании'],
+                            dtype=object)
+    row_cut = np.concatenate([
+        index.cut_codes(manager_ids),
+        np.full(len(group_names), len(cut_values) - 1)])
+    row_group = np.concatenate([group_ids, np.arange(len(group_names))])
+    row_plan = np.concatenate([plan, company_plan])
+    row_fact = np.concatenate([fact, company_fact])
+
+    cut_order = np.argsort(cut_values, kind='stable')
+    cut_rank = np.empty_like(cut_order)
+    cut_rank[cut_order] = np.arange(len(cut_order))
+    group_order = np.argsort(group_names, kind='stable')
+    group_rank = np.empty_like(group_order)
+    group_rank[group_order] = np.arange(len(group_order))
+
+    n_groups = len(group_names)
+    keys, inverse = np.unique(cut_rank[row_cut] * n_groups
+                              + group_rank[row_group], return_inverse=True)
+    grouped_plan = np.bincount(inverse, weights=row_plan)
+    grouped_fact = np.bincount(inverse, weights=row_fact)
+    grouped_percent = percentage_array(grouped_plan, grouped_fact)
+    grouped_cut = cut_values[cut_order][keys // n_groups]
+
+    grouped = pd.DataFrame({
+        # ✅ КЛЮЧЕВОЕ ИЗМЕНЕНИЕ: manager = cut_manager
+        'manager': grouped_cut,
+        'cut_manager': grouped_cut,
+        'special_group': group_names[group_order][keys % n_groups],
+        'special_group_plan': grouped_plan,
+        'special_group_fact': grouped_fact,
+        'special_group_percent': grouped_percent,
         # Определяем цветовую метку
-        def get_color(row: pd.Series) -> str:
-            plan = row["special_group_plan"]
-            percent = row["special_group_percent"]
+        'special_group_color': np.select(
+            [(grouped_plan == 0) | (not total_plan),
+             grouped_percent >= total_plan],
+            ['yellow', 'green'], default='red'),
+    })
 
-            if not plan:
-                return "yellow"
-            if not total_plan:
-                return "yellow"
-            return "green" if percent >= total_plan else "red"
+    # return merge DataFrame
+    return schema.apply_schema(grouped, schema.SPECIAL_GROUPS_SCHEMA)
 
-        grouped["special_group_color"] = grouped.apply(get_color, axis=1)
+def read_plan():
+    """Возвращает требуемый процент выполнения (из `app_state`)."""
+    return TARGET_PERCENT.get()
 
-        # ✅ КЛЮЧЕВОЕ ИЗМЕНЕНИЕ: manager = cut_manager
-        grouped['manager'] = grouped['cut_manager']
+def write_plan(total_plan):
+    """Запоминает требуемый процент; файл перезаписывается при изменении."""
+    TARGET_PERCENT.set(total_plan)
 
-        # return merge DataFrame
-        return grouped[expected_columns]
-    
-    # df.to_excel('df_sp.xlsx')
-    return df
 
-def read_plan():
-    _path = 'files/'
-    with open(_path+'total_plan.txt') as ff:
-        total_plan = float(ff.read().strip())
-        return total_plan
+def _records_nbytes(records) -> int:
+    """Объём памяти строк (список словарей или DataFrame)."""
+    if not isinstance(records, pd.DataFrame):
+        if not records:
+            return 0
+        records = pd.DataFrame(records)
+    return int(records.memory_usage(deep=True).sum())
 
-def write_plan(total_plan):
-    _path = 'files/'
-    with open(_path+'total_plan.txt', 'w+') as ff:
-        ff.write(str(total_plan))
+
+class PlanSnapshot:
+    """
+    Разобранный файл плана продаж с кэшированными представлениями.
+
+    XML читается один раз на версию файла: снимки хранятся в общем
+    кэше `parse_cache.PARSE_CACHE` (для Plan.xml в ключ входит ещё и
+    требуемый процент из `app_state.TARGET_PERCENT`). Все производные DataFrame
+    (все менеджеры, фильтр по cut_manager, спецгруппы построчно и
+    объединённые) строятся при первом запросе и далее отдаются из памяти.
+
+    Возвращаемые DataFrame общие для всех вызывающих —
+    изменять их нельзя, при необходимости делайте `.copy()`.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.data = parse_xml_to_dict(file_path)
+        self.total_plan = self.data['total_plan_percent']
+        self._views = {}
+        columns = self.data['columns']
+        self._data_bytes = (
+            _records_nbytes(self.data['managers'])
+            + sum(_records_nbytes(rows)
+                  for rows in self.data['special_groups'].values())
+            + _records_nbytes(columns['directions'])
+            + _records_nbytes(columns['special_groups']))
+        self._views_bytes = 0
+        # Снимок читают одновременно загрузчик, прогрев и предзагрузка;
+        # RLock — представления строятся из других представлений
+        self._views_lock = threading.RLock()
+
+    @classmethod
+    def load(cls, file_path: str) -> 'PlanSnapshot':
+        """Возвращает снимок файла, перечитывая XML только при его изменении."""
+        # Цвета Plan.xml зависят от процента, записанного Plan_26BK
+        extra_key = () if 'Plan_26BK' in file_path else (read_plan(),)
+        return PARSE_CACHE.get_or_load(file_path, cls._build, file_path,
+                                       extra_key=extra_key)
+
+    @classmethod
+    def _build(cls, file_path: str) -> 'PlanSnapshot':
+        """Разбирает файл; для Plan_26BK сохраняет требуемый процент."""
+        snapshot = cls(file_path)
+        if 'Plan_26BK' in file_path:
+            write_plan(snapshot.total_plan)
+        return snapshot
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Объём памяти снимка (для бюджета кэша): строки и колоночные
+        буферы разбора плюс все построенные представления.
+        """
+        return self._data_bytes + self._views_bytes
+
+    def _view(self, key: tuple, build) -> pd.DataFrame:
+        """
+        Возвращает представление из кэша, строя его при первом запросе.
+
+        Новое представление увеличивает объём снимка — он пересчитывается
+        и в `PARSE_CACHE`, чтобы соблюдался бюджет памяти. Представление
+        строится одним потоком; остальные ждут его и получают готовое.
+        """
+        with self._views_lock:
+            if key in self._views:
+                return self._views[key]
+            view = build()
+            self._views[key] = view
+            self._views_bytes += estimate_size(view)
+        PARSE_CACHE.resize(self)
+        return view
+
+    def managers(self, cut_manager: Optional[str] = None) -> pd.DataFrame:
+        """
+        Данные по менеджерам (типизированные, см. `schema.MANAGERS_SCHEMA`).
+
+        При cut_manager = None — все строки.
+        При cut_manager = "__HEADER__" — пустой DataFrame (только заголовки).
+        При cut_manager = "__COMPANY__" — строка "Общее по компании".
+        Иначе — строки менеджера + "Итого по менеджеру" + "Общее по компании".
+
+        Подписи колонок хранятся в `df.attrs['header']`.
+        """
+        if not cut_manager:
+            return self._view(('managers', None),
+                              lambda: self._managers_frame(
+                                  self.data["managers"]))
+        return self._view(('managers', cut_manager),
+                          lambda: self._filter_managers(cut_manager))
+
+    def special_groups(self, merge: bool = False) -> pd.DataFrame:
+        """Спецгруппы построчно или объединённые по cut_manager."""
+        return self._view(
+            ('special_groups', bool(merge)),
+            lambda: parse_sp_group_to_df(self.data["special_groups"],
+                                         self.total_plan, merge=merge,
+                                         index=self.data['manager_index']))
+
+    def managers_collapsed(self) -> pd.DataFrame:
+        """
+        Итоги по каждому менеджеру (одна строка на cut_manager)
+        и "Общее по компании".
+        """
+        def build():
+            rows = [dict(totals, manager=cut_manager)
+                    for cut_manager, totals in self.data['rollups'].items()]
+            return self._managers_frame(rows + [self.data['company']])
+        return self._view(('managers_collapsed',), build)
+
+    def _managers_frame(self, rows: list) -> pd.DataFrame:
+        """Собирает типизированный DataFrame из строк менеджеров."""
+        df = pd.DataFrame(rows, columns=list(self.data['header']))
+        return schema.apply_schema(df, schema.MANAGERS_SCHEMA,
+                                   header=self.data['header'])
+
+    def _filter_managers(self, manager: str) -> pd.DataFrame:
+        """Собирает DataFrame по одному менеджеру (по `cut_manager`)."""
+        data = self.data
+        if manager == '__HEADER__':
+            return self._managers_frame([])
+        if manager == '__COMPANY__':
+            return self._managers_frame([data["company"]])
+        # Строки менеджера по сокращённому имени
+        filtered_managers = [data["managers"][i]
+                             for i in data['cut_rows'].get(manager, [])]
+        # Итог по менеджеру (посчитан при разборе) — только если
+        # у сокращённого имени более одного уникального manager
+        if filtered_managers and data['rollup_managers'].get(manager, 0) > 1:
+            filtered_managers.append(data['rollups'][manager])
+
+        # Добавляем "Общее по компании"
+        filtered_managers.append(data["company"])
+
+        return self._managers_frame(filtered_managers)
 
 
 def parse_sales_plan(file_path: str,
@@ -432,6 +921,9 @@ def parse_sales_plan(file_path: str,
     При manager = "Иван Петров":
         только его данные + "Итого по менеджеру" + "Общее по компании".
 
+    Файл разбирается один раз на версию (см. `PlanSnapshot`),
+    повторные вызовы с другими фильтрами берут данные из памяти.
+
     Parameters
     ----------
     file_path : str
@@ -454,82 +946,24 @@ def parse_sales_plan(file_path: str,
     >>> df = parse_sales_plan("Plan_26BK.txt", manager="Алена Морозько",
                               merge_group=True)
     """
-    data = parse_xml_to_dict(file_path)
-        
-    if 'Plan_26BK' in file_path:
-        total_plan = data['total_plan_percent']
-        write_plan(total_plan)
-    else:
-        total_plan = read_plan()
-            
-    
+    snapshot = PlanSnapshot.load(file_path)
+
     if sp_group:
         # Возвращаем спецгруппы через parse_sp_group_to_df
-        df_sp = parse_sp_group_to_df(data["special_groups"], 
-                                     total_plan, merge=merge)
-        
+        return snapshot.special_groups(merge=merge)
 
-        return df_sp
-        
-        
-    
     # --- Фильтрация по менеджеру ---
-    if manager:
-        # Фильтруем менеджеров по cut_manager
-        filtered_managers = []
-        for m in data["managers"]:
-            if m.get('cut_manager') in [manager, '__HEADER__']:
-                filtered_managers.append(m)
-        # Проверяем: является ли запрошенный manager — служебным?
-        is_service_request = manager in ("__HEADER__", "__COMPANY__")
-        # Итог по менеджеру
-        # Итог по менеджеру — только если более одного уникального manager
-        if filtered_managers and not is_service_request:
-            unique_managers = {m['manager'] for m in filtered_managers if m['manager'] not in ('Направление', 'Общее по компании')}
-            if len(unique_managers) > 1:
-                totals = {
-                    'manager': 'Итого по менеджеру',
-                    'cut_manager': manager,
-                    'money_plan': sum(m['money_plan'] for m in filtered_managers if isinstance(m['money_plan'], (int, float))),
-                    'money_fact': sum(m['money_fact'] for m in filtered_managers if isinstance(m['money_fact'], (int, float))),
-                    'money_percent': 0,
-                    'money_color': 'yellow',
-                    'margin_plan': sum(m['margin_plan'] for m in filtered_managers if isinstance(m['margin_plan'], (int, float))),
-                    'margin_fact': sum(m['margin_fact'] for m in filtered_managers if isinstance(m['margin_fact'], (int, float))),
-                    'margin_percent': 0,
-                    'margin_color': 'yellow',
-                    'realization_plan': sum(m['realization_plan'] for m in filtered_managers if isinstance(m['realization_plan'], (int, float))),
-                    'realization_fact': sum(m['realization_fact'] for m in filtered_managers if isinstance(m['realization_fact'], (int, float))),
-                    'realization_percent': 0,
-                    'realization_color': 'yellow',
-                }
-                # Пересчитываем проценты
-                totals['money_percent'] = calculate_percentage(totals['money_plan'], totals['money_fact'])
-                totals['money_color'] = 'green' if totals['money_percent'] >= total_plan else 'red'
-                totals['margin_percent'] = calculate_percentage(totals['margin_plan'], totals['margin_fact'])
-                totals['margin_color'] = 'green' if totals['margin_percent'] >= total_plan else 'red'
-                totals['realization_percent'] = calculate_percentage(totals['realization_plan'], totals['realization_fact'])
-                totals['realization_color'] = 'green' if totals['realization_percent'] >= total_plan else 'red'
-                filtered_managers.append(totals)
-
-        # Добавляем "Общее по компании"
-        if manager == '__COMPANY__':
-            filtered_managers.insert(0, data['managers'][0])
-            
-        else:
-            filtered_managers.append(data["company"])
-
-        return pd.DataFrame(filtered_managers)
-    else:
-        # Без фильтрации — как раньше
-        return pd.DataFrame(data["managers"])
+    return snapshot.managers(manager)
 
 
 
 
 
 __all__ = ['parse_sales_plan',
+           'PlanSnapshot',
            'parse_xml_to_dict',
+           'read_plan_columns',
+           'load_plan_columns',
            'parse_sp_group_to_df'
            ]
 
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр источников данных вкладок.
+
+Каждая вкладка с данными описывается `ReaderSpec`: файл в files/,
+функция-читатель, схема результата и свойства, нужные загрузчику
+(кэшируемость, возможность параллельного чтения). Диспетчеризация по
+вкладкам (получение данных, отрисовка, экспорт, настройка колонок)
+идёт по виду источника `kind`, а не по индексам вкладок — новая вкладка
+добавляется одной записью в `READERS`.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from bin import constant as const_
+from bin import schema
+from bin import read_brendOP, read_brendFarban, read_file_manager
+from bin.parse_cache import PARSE_CACHE
+from bin.sidecar import load_frame
+
+# Виды источников (совпадают с типами вкладок ColumnLayout)
+KIND_MANAGERS = 'managers'
+KIND_BRAND_MANAGERS = 'brand_managers'
+KIND_BRAND_MANAGERS_FARBAN = 'brand_managers_farban'
+
+
+class ReaderSpec:
+    """
+    Описание источника данных вкладки.
+
+    Attributes
+    ----------
+    tab_name : str
+        Название вкладки.
+    file_name : str
+        Имя файла в каталоге files/ (и в сетевом каталоге).
+    kind : str
+        Вид источника: KIND_MANAGERS, KIND_BRAND_MANAGERS,
+        KIND_BRAND_MANAGERS_FARBAN.
+    reader : Callable
+        Функция `reader(file_path, **params)` → pd.DataFrame.
+    view : Callable, optional
+        Функция `view(df, **params)`, накладывающая параметры запроса на
+        данные читателя. Если задана, читатель вызывается без параметров:
+        разобранный файл общий для всех их значений (одна запись в кэше
+        и одна бинарная копия на версию файла).
+    schema : dict
+        Схема результата (см. `schema.py`).
+    params : tuple
+        Имена параметров запроса, которые принимает читатель
+        (manager, sp_group, merge, target_percent, filter_of_manager).
+    cacheable : bool
+        Результат можно хранить в `PARSE_CACHE` и бинарных копиях
+        (`sidecar.load_frame`). False — читатель кэширует сам.
+    parallel_safe : bool
+        Файл можно читать параллельно с другими. False — читатель
+        меняет общее состояние (требуемый процент) и читается первым.
+    special_groups : bool
+        Источник содержит спецгруппы.
+    uses_percent : bool, optional
+        Данные (цвета) зависят от требуемого процента. По умолчанию —
+        если читатель принимает `target_percent`.
+    """
+
+    def __init__(self, tab_name: str, file_name: str, kind: str,
+                 reader: Callable, schema: dict, params: Tuple[str, ...],
+                 cacheable: bool = True, parallel_safe: bool = True,
+                 special_groups: bool = False,
+                 view: Optional[Callable] = None,
+                 uses_percent: Optional[bool] = None):
+        self.tab_name = tab_name
+        self.file_name = file_name
+        self.kind = kind
+        self.reader = reader
+        self.schema = schema
+        self.params = params
+        self.cacheable = cacheable
+        self.parallel_safe = parallel_safe
+        self.special_groups = special_groups
+        self.view = view
+        self.uses_percent = ('target_percent' in params
+                             if uses_percent is None else uses_percent)
+
+    @property
+    def file_path(self) -> str:
+        """Путь к локальной копии файла."""
+        return f'files/{self.file_name}'
+
+    def load(self, file_path: Optional[str] = None, **params) -> pd.DataFrame:
+        """
+        Читает данные источника.
+
+        Parameters
+        ----------
+        file_path : str, optional
+            Файл (по умолчанию `self.file_path`).
+        **params
+            Параметры запроса; читателю передаются только те,
+            что перечислены в `self.params`.
+        """
+        file_path = file_path or self.file_path
+        kwargs = {name: params.get(name) for name in self.params}
+        if self.view is not None:
+            return self.view(self._read(file_path), **kwargs)
+        return self._read(file_path, **kwargs)
+
+    def _read(self, file_path: str, **kwargs) -> pd.DataFrame:
+        """Вызывает читатель (через кэш и бинарные копии, если можно)."""
+        if self.cacheable:
+            return PARSE_CACHE.get_or_load(file_path, load_frame,
+                                           self.reader, file_path, **kwargs)
+        return self.reader(file_path, **kwargs)
+
+    def __repr__(self):
+        return (f'ReaderSpec({self.tab_name!r}, {self.file_name!r}, '
+                f'kind={self.kind!r})')
+
+
+# Источники вкладок (вкладки без файла в реестр не входят)
+READERS: Dict[str, ReaderSpec] = {
+    spec.tab_name: spec for spec in [
+        # Plan_26BK задаёт требуемый процент для остальных вкладок
+        ReaderSpec('Менеджеры ОП', 'Plan_26BK.xml', KIND_MANAGERS,
+                   read_file_manager.parse_sales_plan,
+                   schema.MANAGERS_SCHEMA,
+                   params=('manager', 'sp_group', 'merge'),
+                   cacheable=False, parallel_safe=False,
+                   special_groups=True),
+        # Цвета Plan.xml — по проценту из Plan_26BK (`read_plan`)
+        ReaderSpec('Менеджеры Home', 'Plan.xml', KIND_MANAGERS,
+                   read_file_manager.parse_sales_plan,
+                   schema.MANAGERS_SCHEMA,
+                   params=('manager', 'sp_group', 'merge'),
+                   cacheable=False, special_groups=True,
+                   uses_percent=True),
+        ReaderSpec('Бренд-менеджеры ОП', 'Brend_26BK.txt',
+                   KIND_BRAND_MANAGERS, read_brendOP.read_frame,
+                   schema.BRAND_MANAGERS_SCHEMA,
+                   params=('target_percent', 'filter_of_manager'),
+                   view=read_brendOP.select_view),
+        ReaderSpec('Бренд-менеджеры Home', 'BrendOX.txt',
+                   KIND_BRAND_MANAGERS, read_brendOP.read_frame,
+                   schema.BRAND_MANAGERS_SCHEMA,
+                   params=('target_percent', 'filter_of_manager'),
+                   view=read_brendOP.select_view),
+        ReaderSpec('Бренд-менеджеры Farban', 'Brend_Farben.xml',
+                   KIND_BRAND_MANAGERS_FARBAN, read_brendFarban.read_frame,
+                   schema.BRAND_MANAGERS_FARBAN_SCHEMA,
+                   params=('target_percent', 'filter_of_manager'),
+                   view=read_brendFarban.select_view),
+    ]
+}
+
+
+# Файлы, соответствующие вкладкам
+DICT_TO_TABS = {name: spec.file_name for name, spec in READERS.items()}
+
+
+def get_reader(tab_name: str) -> Optional[ReaderSpec]:
+    """Возвращает описание источника вкладки (или None)."""
+    return READERS.get(tab_name)
+
+
+def reader_for_index(tab_index: int) -> Optional[ReaderSpec]:
+    """Возвращает описание источника вкладки по её индексу."""
+    if 0 <= tab_index < len(const_.LIST_NAME_TAB):
+        return READERS.get(const_.LIST_NAME_TAB[tab_index])
+    return None
+
+
+def kind_for_index(tab_index: int) -> Optional[str]:
+    """Возвращает вид источника вкладки по её индексу (или None)."""
+    spec = reader_for_index(tab_index)
+    return spec.kind if spec else None
+
+
+def dependent_tabs(files, tab_names: Optional[List[str]] = None) -> List[int]:
+    """
+    Индексы вкладок, данные которых читаются из файлов `files`
+    (карта «файл → вкладки» для обновления после синхронизации).
+    """
+    tab_names = const_.LIST_NAME_TAB if tab_names is None else tab_names
+    files = set(files)
+    return [index for index, name in enumerate(tab_names)
+            if name in READERS and READERS[name].file_name in files]
+
+
+def percent_dependent_tabs(tab_names: Optional[List[str]] = None
+                           ) -> List[int]:
+    """
+    Индексы вкладок, данные которых зависят от требуемого процента
+    (обновляются при его изменении, см. `app_state.TARGET_PERCENT`).
+    """
+    tab_names = const_.LIST_NAME_TAB if tab_names is None else tab_names
+    return [index for index, name in enumerate(tab_names)
+            if name in READERS and READERS[name].uses_percent]
+
+
+def source_files() -> List[str]:
+    """Имена файлов всех источников (без повторов)."""
+    return list(dict.fromkeys(spec.file_name for spec in READERS.values()))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Типизированные схемы DataFrame, которые возвращают читатели данных.
+
+Числовые показатели хранятся как float64, имена менеджеров, групп и
+цветовые метки — как category. Строка заголовков ('План по деньгам',
+'Менеджер', …) в данные не попадает: она хранится отдельно в
+`df.attrs['header']` и добавляется только при отрисовке
+(`iter_rows_with_header`). Проценты не форматируются в строки —
+для вывода используется `format_percent`.
+"""
+
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+
+# Ключ DataFrame.attrs со строкой заголовков
+HEADER_ATTR = 'header'
+
+# Вкладки "Менеджеры ОП / Home"
+MANAGERS_SCHEMA = {
+    'category': ['manager', 'cut_manager',
+                 'money_color', 'margin_color', 'realization_color'],
+    'float': ['money_plan', 'money_fact', 'money_percent',
+              'margin_plan', 'margin_fact', 'margin_percent',
+              'realization_plan', 'realization_fact', 'realization_percent'],
+}
+
+# Окно "Спецгруппы"
+SPECIAL_GROUPS_SCHEMA = {
+    'category': ['manager', 'cut_manager', 'special_group',
+                 'special_group_color'],
+    'float': ['special_group_plan', 'special_group_fact',
+              'special_group_percent'],
+}
+
+# Вкладки "Бренд-менеджеры ОП / Home"
+BRAND_MANAGERS_SCHEMA = {
+    'category': ['manager', 'group', 'color_cell'],
+    'float': ['by_plan', 'manager_plan', 'manager_realization',
+              'manager_percent', 'group_plan', 'group_realization',
+              'group_percent'],
+}
+
+# Вкладка "Бренд-менеджеры Farban"
+BRAND_MANAGERS_FARBAN_SCHEMA = {
+    'category': ['manager', 'group', 'color_cell', 'color_cell_weight'],
+    'float': ['manager_plan', 'manager_fact', 'manager_percent',
+              'manager_plan_weight', 'manager_fact_weight',
+              'manager_percent_weight',
+              'group_plan', 'group_fact', 'group_percent',
+              'group_plan_weight', 'group_fact_weight',
+              'group_percent_weight'],
+}
+
+
+def schema_columns(schema: Dict[str, List[str]]) -> List[str]:
+    """Возвращает все колонки схемы."""
+    return schema['category'] + schema['float']
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, List[str]],
+                 header: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Приводит колонки DataFrame к типам схемы и сохраняет заголовки.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Исходные данные (без строки заголовков).
+    schema : dict
+        Схема: {'category': [...], 'float': [...]}.
+    header : dict, optional
+        Строка заголовков для отображения.
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame с float64/category колонками и `attrs['header']`.
+    """
+    for column in schema['float']:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column],
+                                       errors='coerce').astype('float64')
+    for column in schema['category']:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    if header is not None:
+        df.attrs[HEADER_ATTR] = header
+    return df
+
+
+def drop_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Убирает из category-колонок значения, которых нет в строках."""
+    for column in df.select_dtypes('category').columns:
+        df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def get_header(df: pd.DataFrame) -> Optional[dict]:
+    """Возвращает строку заголовков DataFrame (или None)."""
+    return df.attrs.get(HEADER_ATTR)
+
+
+def iter_rows_with_header(df: pd.DataFrame) -> Iterator:
+    """
+    Итерирует строки для отрисовки: сначала заголовки, затем данные.
+
+    Строки — namedtuple, как у `DataFrame.itertuples()`.
+    """
+    header = get_header(df)
+    if header is not None:
+        header_df = pd.DataFrame([header]).reindex(columns=df.columns)
+        yield from header_df.itertuples()
+    yield from df.itertuples()
+
+
+def format_percent(value) -> str:
+    """Форматирует процент для вывода: 32.5 → '32.5 %'. Строки — как есть."""
+    if isinstance(value, str):
+        return value
+    if value is None or pd.isna(value):
+        return ''
+    return f'{value:.1f} %'
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Бинарные копии (sidecar) результатов разбора файлов из files/.
+
+После успешного разбора XML/TXT результат сохраняется рядом в формате
+Arrow IPC. Имя копии содержит хэш содержимого исходного файла и версию
+формата, поэтому при холодном старте или переключении вкладки вместо
+повторного разбора файл отображается в память (`pyarrow.memory_map`)
+и читается готовым. Без pyarrow копии не пишутся и не читаются — файлы
+просто разбираются заново.
+
+Копии хранят только то, что зависит от содержимого файла (параметры
+отображения — требуемый процент, фильтр — накладываются после загрузки,
+см. `readers.ReaderSpec.view`). При сохранении копии новой версии файла
+удаляются все копии прежних версий, с любым набором аргументов.
+Настройки — секция [cache] в setting.ini (sidecar, sidecar_dir).
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Callable, Dict, Optional, Tuple
+import pandas as pd
+from bin import constant as const_
+from bin.parse_cache import file_hash
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Версия формата копий: при изменении структуры данных увеличить
+SIDECAR_VERSION = 3
+
+
+def call_tag(*parts) -> str:
+    """Короткий стабильный идентификатор набора аргументов разбора."""
+    return hashlib.blake2b(repr(parts).encode('utf-8'),
+                           digest_size=8).hexdigest()
+
+
+class SidecarStore:
+    """
+    Хранилище бинарных копий разобранных файлов.
+
+    Копия — набор именованных DataFrame и словарь метаданных (JSON).
+
+    Attributes
+    ----------
+    directory : str
+        Каталог для копий.
+    enabled : bool
+        Если False (или не установлен pyarrow), `load` ничего не находит,
+        а `save` ничего не пишет.
+    """
+
+    def __init__(self, directory: str, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self._digests = {}  # (путь, размер, mtime_ns) -> хэш содержимого
+        self._lock = threading.Lock()
+
+    def digest(self, file_path: str) -> str:
+        """Хэш содержимого файла (пересчитывается только при изменении)."""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_hash(file_path)
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def _prefix(self, file_path: str, tag: str) -> str:
+        return f'{os.path.basename(file_path)}.{tag}.'
+
+    def _base_path(self, file_path: str, tag: str, digest: str) -> str:
+        name = f'{self._prefix(file_path, tag)}{digest}.v{SIDECAR_VERSION}'
+        return os.path.join(self.directory, name)
+
+    def load(self, file_path: str,
+             tag: str) -> Optional[Tuple[Dict[str, pd.DataFrame], dict]]:
+        """
+        Читает копию текущей версии файла.
+
+        Returns
+        -------
+        tuple or None
+            (frames, meta) или None, если копии нет или она повреждена.
+        """
+        if not self.enabled or pa is None:
+            return None
+        try:
+            base = self._base_path(file_path, tag, self.digest(file_path))
+            if os.path.exists(base + '.json'):
+                return self._load_arrow(base)
+        except Exception as e:
+            print(f"[CACHE] Не удалось прочитать копию {file_path}: {e}")
+        return None
+
+    def save(self, file_path: str, tag: str,
+             frames: Dict[str, pd.DataFrame], meta: dict):
+        """
+        Сохраняет копию текущей версии файла и удаляет копии прежних версий.
+
+        Запись атомарная: файлы пишутся во временные и переименовываются.
+        """
+        if not self.enabled or pa is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            digest = self.digest(file_path)
+            base = self._base_path(file_path, tag, digest)
+            self._save_arrow(base, frames, meta)
+            self._remove_stale(file_path, digest)
+        except Exception as e:
+            print(f"[CACHE] Не удалось сохранить копию {file_path}: {e}")
+
+    def load_or_build(self, file_path: str, tag: str,
+                      build: Callable) -> Tuple[Dict[str, pd.DataFrame], dict]:
+        """
+        Возвращает (frames, meta) из копии или строит их через `build()`
+        и сохраняет копию.
+        """
+        stored = self.load(file_path, tag)
+        if stored is not None:
+            return stored
+        frames, meta = build()
+        self.save(file_path, tag, frames, meta)
+        return frames, meta
+
+    def _save_arrow(self, base: str, frames: Dict[str, pd.DataFrame],
+                    meta: dict):
+        """Пишет каждый DataFrame в свой файл Arrow IPC, метаданные — в JSON."""
+        for name, df in frames.items():
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            tmp = f'{base}.{name}.arrow.tmp'
+            with pa.OSFile(tmp, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, f'{base}.{name}.arrow')
+        # JSON пишется последним: его наличие означает, что копия полная
+        tmp = base + '.json.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'frames': list(frames), 'meta': meta}, f,
+                      ensure_ascii=False)
+        os.replace(tmp, base + '.json')
+
+    def _load_arrow(self, base: str) -> Tuple[Dict[str, pd.DataFrame], dict]:
+        """Отображает файлы Arrow IPC в память и собирает DataFrame."""
+        with open(base + '.json', encoding='utf-8') as f:
+            index = json.load(f)
+        frames = {}
+        for name in index['frames']:
+            with pa.memory_map(f'{base}.{name}.arrow', 'r') as source:
+                frames[name] = pa.ipc.open_file(source).read_all().to_pandas()
+        return frames, index['meta']
+
+    def _remove_stale(self, file_path: str, digest: str):
+        """
+        Удаляет копии файла (с любым набором аргументов), сделанные
+        с другой версии содержимого или в другом формате.
+        """
+        prefix = f'{os.path.basename(file_path)}.'
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix):
+                continue
+            # Имя: <файл>.<тег>.<хэш>.v<версия>.<...>
+            parts = name[len(prefix):].split('.')
+            if len(parts) < 3 or len(parts[0]) != 16 or len(parts[1]) != 32:
+                continue  # копия другого файла с похожим именем
+            # Копии pickle прежних версий приложения тоже удаляются
+            if (parts[1] != digest or parts[2] != f'v{SIDECAR_VERSION}'
+                    or parts[-1] == 'pkl'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+# Общее хранилище копий приложения
+SIDECAR_STORE = SidecarStore(const_.CACHE_SIDECAR_DIR,
+                             enabled=const_.CACHE_SIDECAR)
+
+
+def load_frame(reader: Callable, file_path: str,
+               *args, **kwargs) -> pd.DataFrame:
+    """
+    Возвращает DataFrame `reader(file_path, *args, **kwargs)` из копии
+    текущей версии файла, разбирая файл только при её отсутствии.
+
+    Сохраняются только успешные результаты — с заголовками
+    в `attrs['header']` (см. `schema.apply_schema`).
+    """
+    tag = call_tag(getattr(reader, '__module__', None),
+                   getattr(reader, '__qualname__', repr(reader)),
+                   args, sorted(kwargs.items()))
+    stored = SIDECAR_STORE.load(file_path, tag)
+    if stored is not None:
+        frames, meta = stored
+        df = frames['data']
+        df.attrs.update(meta.get('attrs', {}))
+        return df
+
+    df = reader(file_path, *args, **kwargs)
+    if df.attrs.get('header') is not None:
+        SIDECAR_STORE.save(file_path, tag, {'data': df},
+                           {'attrs': df.attrs})
+    return df
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение снимков данных вкладок.
+
+После синхронизации нового Plan/Brend файла новый DataFrame сравнивается
+с ранее отображённым по содержимому. Если данные не изменились,
+перерисовка вкладки не нужна; иначе вкладка перерисовывается целиком.
+"""
+
+from typing import Hashable, Optional
+import pandas as pd
+
+
+def frames_equal(old: Optional[pd.DataFrame], new: pd.DataFrame) -> bool:
+    """
+    Проверяет, совпадают ли два снимка по содержимому.
+
+    Parameters
+    ----------
+    old : pd.DataFrame or None
+        Прежний снимок (None — снимка ещё не было).
+    new : pd.DataFrame
+        Новый снимок.
+
+    Returns
+    -------
+    bool
+        True, если колонки и значения совпадают (NaN считается равным NaN).
+    """
+    if old is None or list(old.columns) != list(new.columns):
+        return False
+    # Типы колонок (категории и т.п.) не важны — сравниваются значения
+    return (old.reset_index(drop=True).astype(object)
+            .equals(new.reset_index(drop=True).astype(object)))
+
+
+class SnapshotTracker:
+    """
+    Хранит последние отображённые снимки и сравнивает с ними новые.
+
+    Снимки хранятся по произвольному ключу (например, индекс вкладки
+    и фильтр).
+    """
+
+    def __init__(self):
+        self._frames = {}
+
+    def remember(self, key: Hashable, df: pd.DataFrame):
+        """Запоминает отображённый снимок."""
+        self._frames[key] = df
+
+    def changed(self, key: Hashable, df: pd.DataFrame) -> bool:
+        """Отличается ли новый снимок от запомненного (не запоминая его)."""
+        return not frames_equal(self._frames.get(key), df)
+
+    def forget(self, key: Optional[Hashable] = None):
+        """Забывает снимок (или все снимки при key = None)."""
+        if key is None:
+            self._frames.clear()
+        else:
+            self._frames.pop(key, None)
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+Синхронизация файлов источников из сетевой папки в локальную.
+
+`SyncEngine` — единая точка синхронизации для интерфейса
+(`FileWatcherHelper`), `file_sync.sync_files` и командной строки:
+
+    python -m bin.sync_engine [--network ПАПКА] [--local files] [файлы...]
+
+Файлы обрабатываются в ограниченном пуле потоков; каждое обращение
+к сетевой папке ограничено по времени, а автомат отключения
+(`net_io.CircuitBreaker`) приостанавливает обращения к недоступной папке.
+Само копирование (проверка завершённости выгрузки, сравнение содержимого,
+атомарная замена) — в `file_sync.sync_file`.
+
+По каждому файлу ведётся таблица состояния (`FileState`): mtime и размер
+в сетевой папке, хэш локальной копии, итог и длительность последней
+синхронизации, последняя ошибка. Пропускная способность и задержка
+синхронизаций доступны через `SyncEngine.stats()` / `report()`.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from bin import constant as const_
+from bin import file_sync, readers
+from bin.net_io import CircuitBreaker, run_with_timeout
+
+
+class FileState:
+    """
+    Состояние синхронизации одного файла.
+
+    Attributes
+    ----------
+    file_name : str
+        Имя файла (относительно сетевой и локальной папок).
+    mtime, size : float, int
+        Последние увиденные mtime и размер файла в сетевой папке.
+    hash : str
+        Хэш содержимого локальной копии (после копирования или сравнения).
+    status : str
+        Итог последней синхронизации (статусы `file_sync`) или 'error'.
+    last_error : str
+        Текст последней ошибки (None после успешной синхронизации).
+    last_duration : float
+        Длительность последней синхронизации файла (с).
+    last_sync : float
+        Время последней синхронизации (time.time()).
+    copies : int
+        Сколько раз файл был скопирован.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.mtime = None
+        self.size = None
+        self.hash = None
+        self.status = None
+        self.last_error = None
+        self.last_duration = 0.0
+        self.last_sync = None
+        self.copies = 0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class SyncReport:
+    """
+    Итог одной синхронизации.
+
+    Attributes
+    ----------
+    updated : list
+        Скопированные файлы.
+    incomplete : list
+        Файлы, выгрузка которых ещё не завершена.
+    errors : list
+        Тексты ошибок.
+    state : dict
+        {имя файла: (mtime, размер)} в сетевой папке без незавершённых
+        файлов; None — папка не ответила.
+    duration : float
+        Длительность синхронизации (с).
+    """
+
+    def __init__(self):
+        self.updated: List[str] = []
+        self.incomplete: List[str] = []
+        self.errors: List[str] = []
+        self.state: Optional[dict] = None
+        self.duration = 0.0
+
+
+class SyncEngine:
+    """
+    Синхронизатор файлов источников.
+
+    Parameters
+    ----------
+    local_dir : str or Path
+        Локальная папка с файлами программы.
+    network_dir : str or Path, optional
+        Сетевая папка с выгрузками 1С.
+    files : Iterable[str], optional
+        Имена файлов; по умолчанию — все источники `readers.READERS`.
+    workers : int
+        Число потоков копирования.
+    timeout, copy_timeout : float
+        Ограничение времени на stat и на копирование файла (с).
+    stable_s : float
+        Окно проверки завершённости выгрузки (с).
+    breaker : CircuitBreaker, optional
+        Автомат отключения; по умолчанию — по настройкам [sync].
+    """
+
+    def __init__(self, local_dir, network_dir=None,
+                 files: Optional[Iterable[str]] = None,
+                 workers: int = const_.SYNC_WORKERS,
+                 timeout: float = const_.SYNC_TIMEOUT_S,
+                 copy_timeout: float = const_.SYNC_COPY_TIMEOUT_S,
+                 stable_s: float = const_.SYNC_STABLE_S,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.local_dir = Path(local_dir).resolve()
+        self.network_dir = network_dir
+        self._files = list(files) if files is not None else None
+        self.timeout = timeout
+        self.copy_timeout = copy_timeout
+        self.stable_s = stable_s
+        self.breaker = breaker or CircuitBreaker(const_.SYNC_BREAKER_THRESHOLD,
+                                                 const_.SYNC_BACKOFF_BASE_S,
+                                                 const_.SYNC_BACKOFF_MAX_S)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers),
+                                        thread_name_prefix='sync-copy')
+        self._lock = threading.Lock()
+        # Файл -> отмена его копирования, пока оно выполняется (брошенное
+        # по таймауту копирование может продолжаться в фоне)
+        self._copying: Dict[str, file_sync.CancelToken] = {}
+        self.states: Dict[str, FileState] = {}
+        # Счётчики
+        self.runs = 0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self.copy_seconds = 0.0
+        self.failures = 0
+
+    @property
+    def network_dir(self) -> Optional[Path]:
+        """Сетевая папка (или None)."""
+        return self._network_dir
+
+    @network_dir.setter
+    def network_dir(self, value):
+        self._network_dir = Path(value) if value else None
+
+    def files(self) -> List[str]:
+        """Синхронизируемые файлы."""
+        return self._files if self._files is not None else readers.source_files()
+
+    def state(self, file_rel: str) -> FileState:
+        """Строка таблицы состояния файла (создаётся при первом обращении)."""
+        with self._lock:
+            state = self.states.get(file_rel)
+            if state is None:
+                state = self.states[file_rel] = FileState(file_rel)
+            return state
+
+    def read_network_state(self) -> Optional[dict]:
+        """
+        (mtime, размер) файлов в сетевой папке.
+
+        None — папка не ответила (или обращения приостановлены).
+        """
+        state = {}
+        if not self.network_dir:
+            return state
+        if not self.breaker.allow():
+            return None
+        for file_rel in self.files():
+            try:
+                stat = run_with_timeout(os.stat, self.network_dir / file_rel,
+                                        timeout=self.timeout)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                self.breaker.record_failure()
+                return None
+            state[file_rel] = (stat.st_mtime, stat.st_size)
+        self.breaker.record_success()
+        return state
+
+    def watch_paths(self) -> Optional[List[str]]:
+        """
+        Существующие в сетевой папке пути для наблюдения: сама папка
+        и файлы источников (пустой список — папки нет).
+
+        None — папка не ответила (или обращения приостановлены).
+        """
+        if not self.network_dir:
+            return []
+        if not self.breaker.allow():
+            return None
+        try:
+            if not run_with_timeout(os.path.isdir, self.network_dir,
+                                    timeout=self.timeout):
+                return []
+            paths = [str(self.network_dir)]
+            for file_rel in self.files():
+                path = self.network_dir / file_rel
+                if run_with_timeout(os.path.exists, path,
+                                    timeout=self.timeout):
+                    paths.append(str(path))
+        except OSError:
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success()
+        return paths
+
+    def sync(self, files: Optional[Iterable[str]] = None) -> SyncReport:
+        """
+        Копирует файлы, которые в сетевой папке новее и отличаются.
+
+        Выполняется в вызывающем потоке; файлы обрабатываются параллельно
+        в пуле движка.
+        """
+        report = SyncReport()
+        if not self.network_dir:
+            report.state = {}
+            return report
+        if not self.breaker.allow():
+            report.errors.append(f"Сетевая папка недоступна, повтор через "
+                                 f"{self.breaker.retry_in():.0f} с")
+            return report
+
+        started = time.perf_counter()
+        files = list(files) if files is not None else self.files()
+        state, errors = {}, []
+        for file_rel, stat, status, error in self._pool.map(self._sync_file,
+                                                            files):
+            if stat is not None:
+                state[file_rel] = stat
+            if status == file_sync.COPIED:
+                report.updated.append(file_rel)
+            elif status == file_sync.INCOMPLETE:
+                report.incomplete.append(file_rel)
+            if error is not None:
+                errors.append(f"{file_rel}: {error}")
+
+        if state or not errors:
+            self.breaker.record_success()
+            report.state = state
+        elif self.breaker.record_failure():
+            errors.append(f"обращения приостановлены на "
+                          f"{self.breaker.retry_in():.0f} с")
+        report.errors = errors
+        report.duration = time.perf_counter() - started
+        with self._lock:
+            self.runs += 1
+            self.run_seconds += report.duration
+            self.max_run_seconds = max(self.max_run_seconds, report.duration)
+            self.failures += bool(errors)
+        return report
+
+    def _sync_file(self, file_rel: str):
+        """
+        Синхронизирует один файл и обновляет его строку в таблице.
+
+        Returns
+        -------
+        tuple
+            (имя файла, (mtime, размер) в сетевой папке или None,
+             статус или None, ошибка или None).
+        """
+        entry = self.state(file_rel)
+        local_path = self.local_dir / file_rel
+        network_path = self.network_dir / file_rel
+        started = time.perf_counter()
+        try:
+            stat = run_with_timeout(os.stat, network_path,
+                                    timeout=self.timeout)
+        except FileNotFoundError:
+            self._finish(entry, started, file_sync.MISSING)
+            return file_rel, None, file_sync.MISSING, None
+        except OSError as e:
+            self._finish(entry, started, 'error', e)
+            return file_rel, None, None, e
+        network_state = (stat.st_mtime, stat.st_size)
+        entry.mtime, entry.size = network_state
+
+        cancel = file_sync.CancelToken()
+        with self._lock:
+            busy = file_rel in self._copying
+            if not busy:
+                self._copying[file_rel] = cancel
+        if busy:
+            # Прежняя попытка ещё не вернулась: две копии одного файла
+            # одновременно не выполняются
+            error = OSError("предыдущее копирование ещё не завершено")
+            self._finish(entry, started, 'error', error)
+            return file_rel, None, None, error
+
+        def copy():
+            try:
+                return file_sync.sync_file(network_path, local_path, stat,
+                                           self.stable_s, cancel)
+            finally:
+                with self._lock:
+                    self._copying.pop(file_rel, None)
+
+        try:
+            status = run_with_timeout(copy, timeout=self.copy_timeout
+                                      + self.stable_s)
+        except OSError as e:
+            # По таймауту копирование продолжается в фоне — запрещаем
+            # ему подменять локальный файл
+            cancel.cancel()
+            print(f"[ERROR] Не удалось синхронизировать {local_path}: {e}")
+            self._finish(entry, started, 'error', e)
+            return file_rel, network_state, None, e
+
+        if status in (file_sync.COPIED, file_sync.IDENTICAL):
+            try:
+                entry.hash = file_sync.fingerprint(local_path)[1]
+            except OSError:
+                entry.hash = None
+        duration = self._finish(entry, started, status)
+        if status == file_sync.MISSING:
+            return file_rel, None, status, None
+        if status == file_sync.INCOMPLETE:
+            # Состояние не сообщаем, чтобы следующий опрос заметил отличие
+            # и запустил синхронизацию снова
+            print(f"[SYNC] Файл ещё выгружается, повтор позже: {network_path}")
+            return file_rel, None, status, None
+        if status == file_sync.IDENTICAL:
+            # Выгрузка с тем же содержимым — ни копирования, ни перерисовки
+            print(f"[SYNC] Содержимое не изменилось: {local_path}")
+        elif status == file_sync.COPIED:
+            entry.copies += 1
+            with self._lock:
+                self.files_copied += 1
+                self.bytes_copied += stat.st_size
+                self.copy_seconds += duration
+            print(f"[SYNC] Обновлён файл: {local_path}")
+        return file_rel, network_state, status, None
+
+    @staticmethod
+    def _finish(entry: FileState, started: float, status: str,
+                error=None) -> float:
+        """Записывает итог синхронизации файла в его строку таблицы."""
+        entry.last_duration = time.perf_counter() - started
+        entry.last_sync = time.time()
+        entry.status = status
+        entry.last_error = str(error) if error is not None else None
+        return entry.last_duration
+
+    def stats(self) -> dict:
+        """Счётчики: синхронизации, их задержка, скопированные данные."""
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'failures': self.failures,
+                'avg_run_s': self.run_seconds / self.runs if self.runs else 0.0,
+                'max_run_s': self.max_run_seconds,
+                'files_copied': self.files_copied,
+                'bytes_copied': self.bytes_copied,
+                'throughput_mb_s': (self.bytes_copied / 1024 / 1024
+                                    / self.copy_seconds
+                                    if self.copy_seconds else 0.0),
+            }
+
+    def report(self) -> str:
+        """Возвращает счётчики одной строкой для журнала."""
+        s = self.stats()
+        return (f"синхронизаций {s['runs']} (с ошибками {s['failures']}), "
+                f"в среднем {s['avg_run_s']:.2f} с, макс. "
+                f"{s['max_run_s']:.2f} с; скопировано {s['files_copied']} "
+                f"файлов, {s['bytes_copied'] / 1024:.0f} КБ, "
+                f"{s['throughput_mb_s']:.1f} МБ/с")
+
+    def table(self) -> str:
+        """Таблица состояния файлов (для командной строки)."""
+        lines = [f"{'файл':<20} {'статус':<11} {'размер':>10} "
+                 f"{'время, с':>8}  хэш / ошибка"]
+        for file_rel in sorted(self.states):
+            entry = self.states[file_rel]
+            size = '' if entry.size is None else f"{entry.size}"
+            tail = entry.last_error or entry.hash or ''
+            lines.append(f"{file_rel:<20} {entry.status or '':<11} "
+                         f"{size:>10} {entry.last_duration:>8.2f}  {tail}")
+        return "\n".join(lines)
+
+    def shutdown(self):
+        """
+        Останавливает пул потоков, не дожидаясь выполняемых задач
+        (ожидающие в очереди отменяются).
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Синхронизация из командной строки; код возврата 1 при ошибках."""
+    parser = argparse.ArgumentParser(
+        prog='python -m bin.sync_engine',
+        description="Синхронизация файлов источников из сетевой папки.")
+    parser.add_argument('files', nargs='*',
+                        help="имена файлов (по умолчанию — все источники)")
+    parser.add_argument('--network', default=const_.cfg_.get(
+        'setting', 'w_disk', fallback=None),
+                        help="сетевая папка (по умолчанию — w_disk)")
+    parser.add_argument('--local', default='files', help="локальная папка")
+    parser.add_argument('--stable', type=float, default=const_.SYNC_STABLE_S,
+                        help="окно проверки завершённости выгрузки, с")
+    parser.add_argument('--workers', type=int, default=const_.SYNC_WORKERS,
+                        help="число потоков копирования")
+    args = parser.parse_args(argv)
+
+    engine = SyncEngine(args.local, args.network, files=args.files or None,
+                        workers=args.workers, stable_s=args.stable)
+    try:
+        report = engine.sync()
+    finally:
+        engine.shutdown()
+    print(engine.table())
+    print(f"[SYNC] {engine.report()}")
+    for error in report.errors:
+        print(f"[ERROR] {error}")
+    return 1 if report.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
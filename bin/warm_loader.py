@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Фоновый параллельный разбор файлов вкладок (прогрев кэша).
+
+При запуске и после синхронизации изменившиеся источники из реестра
+`readers.READERS` разбираются одновременно в пуле потоков; результаты
+попадают в общий `PARSE_CACHE` (и бинарные копии), поэтому открытие
+вкладки или экспорт берут готовые данные. Если вкладка запрашивает файл,
+который ещё разбирается, `PARSE_CACHE` дожидается этого разбора.
+
+Источники с parallel_safe = False (Plan_26BK задаёт требуемый процент,
+от которого зависят остальные) разбираются первыми, последовательно.
+Пул потоков, а не процессов: результат должен оказаться в памяти
+приложения, а передача DataFrame между процессами дороже разбора.
+"""
+
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Iterable, List, Optional
+from bin import constant as const_
+from bin import readers
+from bin.app_state import TARGET_PERCENT
+
+
+class WarmLoader:
+    """
+    Параллельный прогрев кэша разбора.
+
+    Attributes
+    ----------
+    max_workers : int
+        Число потоков пула.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='warm')
+            return self._executor
+
+    def _specs(self, file_names: Optional[Iterable[str]]) -> List:
+        """Источники для прогрева (по одному на вкладку)."""
+        names = set(file_names) if file_names is not None else None
+        return [spec for spec in readers.READERS.values()
+                if names is None or spec.file_name in names]
+
+    @staticmethod
+    def warm_spec(spec):
+        """Разбирает источник с параметрами вкладки без фильтров."""
+        try:
+            target_percent = TARGET_PERCENT.get()
+            spec.load(target_percent=target_percent)
+            if spec.special_groups:
+                spec.load(sp_group=True)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Не удалось разобрать {spec.file_name}: {e}")
+
+    def warm(self, file_names: Optional[Iterable[str]] = None,
+             block: bool = False) -> threading.Thread:
+        """
+        Запускает прогрев источников.
+
+        Parameters
+        ----------
+        file_names : iterable of str, optional
+            Имена изменившихся файлов. По умолчанию — все источники.
+        block : bool, optional
+            Дождаться завершения (по умолчанию прогрев идёт в фоне).
+
+        Returns
+        -------
+        threading.Thread
+            Поток, координирующий прогрев.
+        """
+        specs = self._specs(file_names)
+        if any(not spec.parallel_safe for spec in specs):
+            # Изменился источник общего состояния — зависят все остальные
+            specs = self._specs(None)
+        thread = threading.Thread(target=self._run, args=(specs,),
+                                  name='warm-loader', daemon=True)
+        thread.start()
+        if block:
+            thread.join()
+        return thread
+
+    def _run(self, specs: List):
+        """Последовательно — зависимые источники, затем остальные в пуле."""
+        started = time.perf_counter()
+        for spec in specs:
+            if not spec.parallel_safe:
+                self.warm_spec(spec)
+        futures = [self._pool().submit(self.warm_spec, spec)
+                   for spec in specs if spec.parallel_safe]
+        wait(futures)
+        if specs:
+            elapsed = time.perf_counter() - started
+            print(f"[CACHE] Прогрев: {len(specs)} источн. "
+                  f"за {elapsed:.2f} с")
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Выполняет `fn` в пуле потоков прогрева (для предзагрузки)."""
+        return self._pool().submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        """Останавливает пул потоков."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Общий загрузчик приложения
+WARM_LOADER = WarmLoader(max_workers=const_.CACHE_WARM_WORKERS)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Фоновая загрузка данных вкладок (QThreadPool / QRunnable).
+
+Разбор XML/TXT выполняется в пуле потоков Qt, готовый DataFrame
+возвращается в поток интерфейса через сигнал. Каждый запрос получает
+номер поколения: новый запрос делает все предыдущие устаревшими — ещё
+не начатые снимаются с очереди, а результаты уже запущенных
+отбрасываются. Пока новые данные не готовы, на экране остаются прежние.
+"""
+
+from typing import Any, Callable, Hashable
+from PySide6.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool
+from PySide6.QtCore import Signal as QtSignal
+
+
+class WorkerSignals(QObject):
+    """Сигналы задачи загрузки (QRunnable не может иметь своих сигналов)."""
+    finished = QtSignal(int, object)  # поколение, результат
+    failed = QtSignal(int, str)       # поколение, текст ошибки
+
+
+class LoadWorker(QRunnable):
+    """
+    Задача загрузки данных для пула потоков.
+
+    Parameters
+    ----------
+    generation : int
+        Номер поколения запроса.
+    load : Callable
+        Функция без аргументов, возвращающая данные.
+    is_current : Callable
+        Возвращает False, если запрос уже устарел.
+    """
+
+    def __init__(self, generation: int, load: Callable,
+                 is_current: Callable[[int], bool]):
+        super().__init__()
+        self.generation = generation
+        self.load = load
+        self.is_current = is_current
+        self.signals = WorkerSignals()
+        self.setAutoDelete(False)
+
+    def run(self):
+        # Устаревший запрос не начинаем
+        if not self.is_current(self.generation):
+            self.signals.finished.emit(self.generation, None)
+            return
+        try:
+            result = self.load()
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, result)
+
+
+class DataLoader(QObject):
+    """
+    Загрузчик данных с отменой устаревших запросов.
+
+    Signals
+    -------
+    loaded(request, result)
+        Данные актуального запроса готовы.
+    """
+    loaded = QtSignal(object, object)
+
+    def __init__(self, parent=None, max_threads: int = 2):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._generation = 0
+        self._requests = {}  # поколение -> (запрос, задача)
+
+    @property
+    def generation(self) -> int:
+        """Номер последнего запроса."""
+        return self._generation
+
+    @property
+    def busy(self) -> bool:
+        """True, пока есть незавершённые загрузки."""
+        return bool(self._requests)
+
+    def is_current(self, generation: int) -> bool:
+        """True, если запрос с этим номером — последний."""
+        return generation == self._generation
+
+    def request(self, request: Hashable, load: Callable[[], Any]) -> int:
+        """
+        Запускает загрузку, отменяя все предыдущие запросы.
+
+        Parameters
+        ----------
+        request : Hashable
+            Описание запроса; возвращается в сигнале `loaded`.
+        load : Callable
+            Функция без аргументов, выполняемая в пуле потоков.
+            Не должна обращаться к виджетам.
+
+        Returns
+        -------
+        int
+            Номер поколения запроса.
+        """
+        self.cancel()
+        generation = self._generation
+        worker = LoadWorker(generation, load, self.is_current)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.failed.connect(self._on_failed)
+        self._requests[generation] = (request, worker)
+        self._pool.start(worker)
+        return generation
+
+    def cancel(self):
+        """Делает устаревшими все запросы; не начатые снимает с очереди."""
+        self._generation += 1
+        for generation, (_, worker) in list(self._requests.items()):
+            if self._pool.tryTake(worker):
+                del self._requests[generation]
+
+    def _on_finished(self, generation: int, result):
+        request, _ = self._requests.pop(generation, (None, None))
+        if self.is_current(generation):
+            self.loaded.emit(request, result)
+
+    def _on_failed(self, generation: int, message: str):
+        self._requests.pop(generation, None)
+        if self.is_current(generation):
+            print(f"[ERROR] Не удалось загрузить данные: {message}")
+
+    def wait(self, msecs: int = -1) -> bool:
+        """
+        Дожидается завершения загрузок и доставляет их сигналы
+        (для печати, экспорта и закрытия приложения).
+        """
+        done = self._pool.waitForDone(msecs)
+        QCoreApplication.processEvents()
+        return done
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты разбора файла плана продаж (`read_file_manager`).
+
+    python -m pytest -q
+"""
+
+import shutil
+import threading
+
+import pytest
+
+from bin.parse_cache import estimate_size
+from bin.read_file_manager import PlanSnapshot, parse_sp_group_to_df
+from bin.sidecar import SIDECAR_STORE
+
+
+@pytest.fixture
+def plan_file(tmp_path, monkeypatch):
+    """Копия files/Plan_26BK.xml; бинарные копии — во временной папке."""
+    monkeypatch.setattr(SIDECAR_STORE, 'directory', str(tmp_path / 'cache'))
+    path = tmp_path / 'Plan_26BK.xml'
+    shutil.copy('files/Plan_26BK.xml', path)
+    return str(path)
+
+
+def test_views_built_once_under_concurrency(plan_file):
+    snapshot = PlanSnapshot(plan_file)
+    built = []
+    barrier = threading.Barrier(8)
+
+    def build():
+        built.append(threading.get_ident())
+        return snapshot.managers()
+
+    def read():
+        barrier.wait()
+        snapshot._view(('test',), build)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+    # Объём представлений учтён по одному разу
+    assert snapshot._views_bytes == sum(estimate_size(view)
+                                        for view in snapshot._views.values())
+
+
+def _write_plan(path, groups):
+    """Пишет XML плана продаж со спецгруппами {название: [(имя, план, факт)]}."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<ПланПродаж Проц="36">\n')
+        for name, rows in groups.items():
+            f.write(f'<СпецГруппа Наименование="{name}">\n')
+            for manager, plan, fact in rows:
+                f.write(f'<Направление Наименование="o/п {manager} (напр)" '
+                        f'тПланПродажи="{plan}" тПродажи="{fact}"/>\n')
+            f.write('</СпецГруппа>\n')
+        f.write('<Итоги ИтогПланПродажи="0" ИтогПродажи="0">\n</Итоги>\n'
+                '</ПланПродаж>\n')
+
+
+@pytest.mark.parametrize('merge', [False, True])
+def test_empty_special_group_keeps_zero_row(tmp_path, monkeypatch, merge):
+    monkeypatch.setattr(SIDECAR_STORE, 'directory', str(tmp_path / 'cache'))
+    path = str(tmp_path / 'Plan_26BK.xml')
+    _write_plan(path, {'Обои': [('Иван Петров', 100, 50)],
+                       'Пустая': []})
+    # Второй снимок читается из бинарной копии
+    for _ in range(2):
+        df = PlanSnapshot(path).special_groups(merge=merge)
+        empty = df[df['special_group'] == 'Пустая']
+        assert len(empty) == 1
+        row = empty.iloc[0]
+        assert row['cut_manager'] == 'Общее по компании'
+        assert row['special_group_plan'] == 0
+        assert row['special_group_color'] == 'yellow'
+        assert set(df['special_group']) == {'Обои', 'Пустая'}
+
+
+def test_only_empty_special_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(SIDECAR_STORE, 'directory', str(tmp_path / 'cache'))
+    path = str(tmp_path / 'Plan_26BK.xml')
+    _write_plan(path, {'Пустая': [], 'Вторая': []})
+    df = PlanSnapshot(path).special_groups()
+    assert list(df['special_group']) == ['Пустая', 'Вторая']
+    assert (df['special_group_fact'] == 0).all()
+
+
+@pytest.mark.parametrize('total_plan', [36, 0, -5])
+@pytest.mark.parametrize('fact, color', [(0.0, 'yellow'), (5.0, 'green')])
+def test_zero_plan_company_color(total_plan, fact, color):
+    data = {'Обои': [{'manager': 'o/п Иван Петров (напр)',
+                      'special_group_plan': 0.0,
+                      'special_group_fact': fact}]}
+    df = parse_sp_group_to_df(data, total_plan)
+    company = df[df['manager'] == 'Общее по компании'].iloc[0]
+    assert company['special_group_color'] == color
+    assert company['special_group_percent'] == 0
+    # Строка менеджера с нулевым планом — всегда 'yellow'
+    assert df.iloc[0]['special_group_color'] == 'yellow'
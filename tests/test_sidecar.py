@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты бинарных копий разобранных файлов (`sidecar`).
+
+    python -m pytest -q
+"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from bin import sidecar
+from bin.read_file_manager import load_plan_columns, read_plan_columns
+from bin.sidecar import SIDECAR_STORE
+
+pytest.importorskip('pyarrow')
+
+
+def _write_plan(path, groups=10, rows=300):
+    """Пишет XML плана продаж: groups спецгрупп по rows направлений."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<ПланПродаж Проц="36">\n')
+        for g in range(groups):
+            f.write(f'<СпецГруппа Наименование="Группа {g}" '
+                    f'ПланПродажи="1" Продажи="1">\n')
+            for i in range(rows):
+                f.write(f'<Направление Наименование="o/п Менеджер {i} '
+                        f'(напр) тел. 8" тПродажи="{i}.5" '
+                        f'тПланПродажи="{i * 3}.25"/>\n')
+            f.write('</СпецГруппа>\n')
+        f.write('<Итоги ИтогПланПродажи="10" ИтогПродажи="5">\n')
+        for i in range(groups * rows):
+            f.write(f'<Направление Наименование="o/п Менеджер {i % rows} '
+                    f'(напр {i}) тел. 8" тПланДеньги="{i}.1" тДеньги="{i}.2" '
+                    f'тПланМаржа="1" тМаржа="2" тПланПродажи="3" '
+                    f'тПродажи="4"/>\n')
+        f.write('</Итоги>\n</ПланПродаж>\n')
+
+
+@pytest.fixture
+def big_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(SIDECAR_STORE, 'directory', str(tmp_path / 'cache'))
+    path = str(tmp_path / 'Plan.xml')
+    _write_plan(path)
+    return path
+
+
+def _best_time(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def test_sidecar_load_faster_than_parse(big_plan):
+    parsed = load_plan_columns(big_plan)  # разбор XML и запись копии
+    assert any(name.endswith('.arrow')
+               for name in os.listdir(SIDECAR_STORE.directory))
+
+    parse_time = _best_time(lambda: read_plan_columns(big_plan))
+    load_time = _best_time(lambda: load_plan_columns(big_plan))
+    # Чтение копии в разы быстрее повторного разбора
+    assert load_time * 3 < parse_time, (load_time, parse_time)
+
+    loaded = load_plan_columns(big_plan)
+    for name in ('directions', 'special_groups'):
+        pd.testing.assert_frame_equal(loaded[name], parsed[name])
+    assert loaded['totals'] == parsed['totals']
+
+
+def test_no_sidecar_without_pyarrow(big_plan, monkeypatch):
+    monkeypatch.setattr(sidecar, 'pa', None)
+    columns = load_plan_columns(big_plan)
+    assert not os.path.exists(SIDECAR_STORE.directory)
+    assert len(columns['directions']) == 3000
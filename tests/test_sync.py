@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты синхронизации с сетевой папкой (без Qt).
+
+`file_sync.sync_file` и `SyncEngine.sync` на временных папках,
+`CircuitBreaker` и решения `PollScheduler._decide` при заданном времени.
+
+    python -m pytest -q
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+
+import pytest
+
+from bin import file_sync, net_io
+from bin.net_io import CircuitBreaker
+from bin.poll_schedule import PollScheduler
+from bin.read_file_manager import TIMEZONE
+from bin.sync_engine import SyncEngine
+
+XML = '<?xml version="1.0" encoding="utf-8"?>\n<root>\n  <row a="{}"/>\n</root>\n'
+
+
+def write(path, text, mtime=None):
+    """Пишет файл и, если задано, выставляет ему mtime."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    """(локальная папка, сетевая папка)."""
+    return tmp_path / 'local', tmp_path / 'network'
+
+
+# --- file_sync.sync_file ---------------------------------------------------
+
+def test_missing(dirs):
+    local, network = dirs
+    assert (file_sync.sync_file(network / 'Plan.xml', local / 'Plan.xml')
+            == file_sync.MISSING)
+    assert not (local / 'Plan.xml').exists()
+
+
+def test_up_to_date(dirs):
+    local, network = dirs
+    src = write(network / 'Plan.xml', XML.format(2), mtime=1_000_000)
+    dst = write(local / 'Plan.xml', XML.format(1), mtime=2_000_000)
+    assert file_sync.sync_file(src, dst) == file_sync.UP_TO_DATE
+    assert dst.read_text(encoding='utf-8') == XML.format(1)
+
+
+def test_copied(dirs):
+    local, network = dirs
+    src = write(network / 'Plan.xml', XML.format(2), mtime=2_000_000)
+    dst = write(local / 'Plan.xml', XML.format(1), mtime=1_000_000)
+    assert file_sync.sync_file(src, dst) == file_sync.COPIED
+    assert dst.read_text(encoding='utf-8') == XML.format(2)
+    assert dst.stat().st_mtime == src.stat().st_mtime
+    assert os.listdir(local) == ['Plan.xml']  # временный файл не остался
+    # Повторно — локальная копия уже не старше сетевой
+    assert file_sync.sync_file(src, dst) == file_sync.UP_TO_DATE
+
+
+def test_identical(dirs):
+    local, network = dirs
+    src = write(network / 'Plan.xml', XML.format(1), mtime=2_000_000)
+    dst = write(local / 'Plan.xml', XML.format(1), mtime=1_000_000)
+    assert file_sync.sync_file(src, dst) == file_sync.IDENTICAL
+    # Локальный файл не тронут, совпадение запомнено
+    assert dst.stat().st_mtime == 1_000_000
+    assert file_sync.sync_file(src, dst) == file_sync.IDENTICAL
+    assert os.listdir(local) == ['Plan.xml']
+
+
+@pytest.mark.parametrize('name, text', [
+    ('Plan.xml', '<?xml version="1.0"?>\n<root>\n  <row a="1"/>\n'),
+    ('BrendOX.txt', 'Менеджер\t100\t90'),
+])
+def test_incomplete(dirs, name, text):
+    local, network = dirs
+    src = write(network / name, text, mtime=2_000_000)
+    dst = local / name
+    assert file_sync.sync_file(src, dst) == file_sync.INCOMPLETE
+    assert not local.exists() or os.listdir(local) == []
+
+
+def test_incomplete_while_written(dirs):
+    local, network = dirs
+    src = write(network / 'Plan.xml', XML.format(1), mtime=2_000_000)
+    stat = os.stat(src)
+    write(src, XML.format(22))  # файл изменился после stat
+    assert (file_sync.sync_file(src, local / 'Plan.xml', stat, stable_s=0.05)
+            == file_sync.INCOMPLETE)
+    assert not (local / 'Plan.xml').exists()
+
+
+def test_atomic_replace(dirs, monkeypatch):
+    local, network = dirs
+    src = write(network / 'Plan.xml', XML.format(2), mtime=2_000_000)
+    dst = write(local / 'Plan.xml', XML.format(1), mtime=1_000_000)
+    replaced = []
+    real_replace = os.replace
+
+    def replace(tmp, target):
+        # До подмены локальный файл прежний, новый — рядом во временном
+        assert dst.read_text(encoding='utf-8') == XML.format(1)
+        assert os.path.dirname(tmp) == str(local)
+        assert str(tmp).endswith('.part')
+        replaced.append(target)
+        real_replace(tmp, target)
+
+    monkeypatch.setattr(file_sync.os, 'replace', replace)
+    assert file_sync.sync_file(src, dst) == file_sync.COPIED
+    assert replaced == [dst]
+
+
+def test_failed_copy_keeps_local(dirs, monkeypatch):
+    local, network = dirs
+    src = write(network / 'Plan.xml', XML.format(2), mtime=2_000_000)
+    dst = write(local / 'Plan.xml', XML.format(1), mtime=1_000_000)
+
+    def fail(*args, **kwargs):
+        raise OSError('обрыв связи')
+
+    monkeypatch.setattr(file_sync.shutil, 'copystat', fail)
+    with pytest.raises(OSError):
+        file_sync.sync_file(src, dst)
+    assert dst.read_text(encoding='utf-8') == XML.format(1)
+    assert os.listdir(local) == ['Plan.xml']
+
+
+def test_is_stable_ignores_server_clock(tmp_path):
+    # mtime далеко в прошлом: раньше файл сразу считался стабильным
+    path = write(tmp_path / 'Plan.xml', XML.format(1), mtime=1_000_000)
+    stat = os.stat(path)
+    write(path, XML.format(22))
+    os.utime(path, (1_000_001, 1_000_001))
+    assert not file_sync.is_stable(path, 0.05, stat)
+    assert file_sync.is_stable(path, 0.05)
+    # Версия уже выдержала окно — повторно не ждём
+    started = time.monotonic()
+    assert file_sync.is_stable(path, 0.05)
+    assert time.monotonic() - started < 0.05
+
+
+# --- SyncEngine ------------------------------------------------------------
+
+def make_engine(local, network, files, **kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(threshold=1,
+                                                base_backoff=60))
+    return SyncEngine(local, network, files=files, workers=2, timeout=5,
+                      copy_timeout=5, stable_s=0, **kwargs)
+
+
+def test_engine_sync(dirs):
+    local, network = dirs
+    write(network / 'Plan.xml', XML.format(2), mtime=2_000_000)
+    write(local / 'Plan.xml', XML.format(1), mtime=1_000_000)
+    write(network / 'Plan_26BK.xml', XML.format(1), mtime=2_000_000)
+    write(local / 'Plan_26BK.xml', XML.format(1), mtime=1_000_000)
+    write(network / 'BrendOX.txt', 'Менеджер\t1', mtime=2_000_000)
+    write(network / 'Brend_26BK.txt', 'Менеджер\t1\n', mtime=1_000_000)
+    write(local / 'Brend_26BK.txt', 'Менеджер\t1\n', mtime=1_000_000)
+    files = ['Plan.xml', 'Plan_26BK.xml', 'BrendOX.txt', 'Brend_26BK.txt',
+             'Brend_Farben.xml']
+    engine = make_engine(local, network, files)
+    try:
+        report = engine.sync()
+        assert report.updated == ['Plan.xml']
+        assert report.incomplete == ['BrendOX.txt']
+        assert report.errors == []
+        statuses = {name: engine.states[name].status for name in files}
+        assert statuses == {
+            'Plan.xml': file_sync.COPIED,
+            'Plan_26BK.xml': file_sync.IDENTICAL,
+            'BrendOX.txt': file_sync.INCOMPLETE,
+            'Brend_26BK.txt': file_sync.UP_TO_DATE,
+            'Brend_Farben.xml': file_sync.MISSING,
+        }
+        # Незавершённые и отсутствующие файлы в состояние папки не входят
+        assert sorted(report.state) == ['Brend_26BK.txt', 'Plan.xml',
+                                        'Plan_26BK.xml']
+        assert engine.states['Plan.xml'].hash is not None
+        assert (local / 'Plan.xml').read_text(encoding='utf-8') == XML.format(2)
+        assert not (local / 'BrendOX.txt').exists()
+
+        # Выгрузка закончена — файл берётся при следующей синхронизации
+        write(network / 'BrendOX.txt', 'Менеджер\t1\n', mtime=2_000_001)
+        report = engine.sync()
+        assert report.updated == ['BrendOX.txt']
+        assert engine.states['Plan.xml'].status == file_sync.UP_TO_DATE
+        assert engine.stats()['files_copied'] == 2
+    finally:
+        engine.shutdown()
+
+
+def test_engine_without_network_dir(dirs):
+    local, _ = dirs
+    engine = make_engine(local, None, ['Plan.xml'])
+    try:
+        report = engine.sync()
+        assert report.updated == [] and report.errors == []
+        assert report.state == {}
+    finally:
+        engine.shutdown()
+
+
+def test_engine_breaker(dirs, monkeypatch):
+    local, network = dirs
+    write(network / 'Plan.xml', XML.format(2), mtime=2_000_000)
+    engine = make_engine(local, network, ['Plan.xml'])
+
+    def unreachable(*args, **kwargs):
+        raise net_io.NetworkTimeout('stat: нет ответа')
+
+    try:
+        monkeypatch.setattr('bin.sync_engine.run_with_timeout', unreachable)
+        report = engine.sync()
+        assert report.state is None
+        assert engine.breaker.is_open
+        monkeypatch.undo()
+        # Пока идёт пауза, к папке не обращаемся
+        report = engine.sync()
+        assert report.updated == [] and len(report.errors) == 1
+        assert not (local / 'Plan.xml').exists()
+    finally:
+        engine.shutdown()
+
+
+def test_engine_timed_out_copy_keeps_local(dirs, monkeypatch):
+    local, network = dirs
+    write(network / 'Plan.xml', XML.format(2), mtime=2_000_000)
+    write(local / 'Plan.xml', XML.format(1), mtime=1_000_000)
+    release = threading.Event()
+    real_copystat = file_sync.shutil.copystat
+
+    def stuck(*args, **kwargs):
+        release.wait(5)  # сетевая папка «зависла» в конце копирования
+        real_copystat(*args, **kwargs)
+
+    monkeypatch.setattr(file_sync.shutil, 'copystat', stuck)
+    engine = make_engine(local, network, ['Plan.xml'],
+                         breaker=CircuitBreaker(threshold=10))
+    engine.copy_timeout = 0.2
+    try:
+        report = engine.sync()
+        assert report.updated == [] and len(report.errors) == 1
+        # Пока брошенная попытка не вернулась, файл не копируется повторно
+        report = engine.sync()
+        assert 'ещё не завершено' in report.errors[0]
+        release.set()
+        deadline = time.monotonic() + 5
+        while engine._copying and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Отменённое копирование не подменило файл и убрало временный
+        assert (local / 'Plan.xml').read_text(encoding='utf-8') == XML.format(1)
+        assert os.listdir(local) == ['Plan.xml']
+    finally:
+        engine.shutdown()
+
+
+# --- CircuitBreaker --------------------------------------------------------
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемые часы для `net_io.time.monotonic`."""
+    now = [1000.0]
+    monkeypatch.setattr(net_io.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_breaker_trips_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=2, base_backoff=10, max_backoff=15)
+    assert not breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+    clock[0] += 10
+    assert breaker.allow()
+    # Пробная попытка не удалась — пауза удваивается (до max_backoff)
+    assert breaker.record_failure()
+    assert breaker.retry_in() == 15
+
+
+def test_breaker_resets_on_success(clock):
+    breaker = CircuitBreaker(threshold=1, base_backoff=10, max_backoff=300)
+    assert breaker.record_failure()
+    clock[0] += 10
+    assert breaker.record_failure()
+    assert breaker.retry_in() == 20
+    clock[0] += 20
+    breaker.record_success()
+    assert breaker.allow()
+    assert (breaker.failures, breaker.opened) == (0, 0)
+    assert breaker.record_failure()
+    assert breaker.retry_in() == 10
+
+
+# --- PollScheduler._decide -------------------------------------------------
+
+def at(*args) -> float:
+    """Timestamp местного времени `read_file_manager.TIMEZONE`."""
+    return TIMEZONE.localize(datetime(*args)).timestamp()
+
+
+# Среда, 10:00
+NOW = at(2025, 10, 22, 10, 0)
+HOUR = 3600
+
+
+@pytest.fixture
+def scheduler():
+    return PollScheduler(history_file=None, poll_min_ms=1_000,
+                         poll_max_ms=60_000, idle_ms=600_000, lead_s=120,
+                         work_start=8, work_end=20)
+
+
+def hourly(last: float):
+    """Три выгрузки с интервалом в час, последняя — в `last`."""
+    return [last - 2 * HOUR, last - HOUR, last]
+
+
+def test_decide_off_hours(scheduler):
+    # Суббота — раз в idle_ms
+    assert scheduler._decide([], 5_000, at(2025, 10, 25, 12, 0)) == (
+        600_000, 'вне рабочего времени')
+    # Утро буднего дня — до начала рабочего дня
+    assert scheduler._decide([], 5_000, at(2025, 10, 22, 7, 59)) == (
+        60_000, 'вне рабочего времени')
+
+
+def test_decide_without_history(scheduler):
+    assert scheduler._decide(['Plan.xml'], 5_000, NOW) == (
+        5_000, 'нет истории выгрузок')
+
+
+def test_decide_waits_for_expected_upload(scheduler):
+    scheduler.history = {'Plan.xml': hourly(NOW - 3_000)}
+    # Ожидается через 600 с, окно частого опроса начнётся через 480 с
+    assert scheduler._decide(['Plan.xml'], 5_000, NOW) == (
+        480_000, 'до ожидаемой выгрузки')
+
+
+def test_decide_caps_wait_by_idle(scheduler):
+    scheduler.history = {'Plan.xml': hourly(NOW - 60)}
+    assert scheduler._decide(['Plan.xml'], 5_000, NOW) == (
+        600_000, 'до ожидаемой выгрузки')
+
+
+def test_decide_inside_window(scheduler):
+    scheduler.history = {'Plan.xml': hourly(NOW - HOUR + 60)}
+    assert scheduler._decide(['Plan.xml'], 5_000, NOW) == (
+        1_000, 'ожидается выгрузка')
+
+
+def test_decide_skips_missed_uploads(scheduler):
+    # Две выгрузки пропущены: прогноз — следующая по расписанию
+    scheduler.history = {'Plan.xml': hourly(NOW - 3 * HOUR + 600)}
+    assert scheduler.expected('Plan.xml', NOW) == NOW + 600
+    assert scheduler._decide(['Plan.xml'], 5_000, NOW) == (
+        480_000, 'до ожидаемой выгрузки')
+
+
+def test_decide_partial_history(scheduler):
+    scheduler.history = {'Plan.xml': hourly(NOW - 3_000)}
+    assert scheduler._decide(['Plan.xml', 'BrendOX.txt'], 5_000, NOW) == (
+        5_000, 'до ожидаемой выгрузки')